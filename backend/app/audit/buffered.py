@@ -0,0 +1,359 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import IO, Any
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.audit.models import StepCounters
+from app.audit.writer import AuditWriter
+from app.utils.json_safe import to_json_safe
+from app.utils.logging import get_logger
+from app.utils.timezone import now_brasilia
+
+STEP_ID_BLOCK = 64
+
+
+def _try_lock(handle: IO[str]) -> bool:
+    # The OS drops the lock when the owning process dies, so a lock that can be taken means
+    # nobody is writing that run any more.
+    try:
+        if os.name == "nt":
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+class BufferedAuditWriter(AuditWriter):
+    # Step and metadata events are journaled locally and written in batches by a
+    # background thread; start_run/finish_run stay synchronous so the run row exists
+    # before its steps and the final status is only set after everything is flushed.
+
+    def __init__(self, engine: Engine, journal_dir: Path, flush_interval_seconds: float = 5.0):
+        super().__init__(engine)
+        self.journal_dir = journal_dir
+        self.flush_interval_seconds = flush_interval_seconds
+        self.logger = get_logger()
+        self._events: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._step_ids: list[int] = []
+        self._step_runs: dict[int, str] = {}
+        self._owner_locks: dict[str, IO[str]] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._replayed = False
+
+    def _journal_path(self, run_id: str) -> Path:
+        return self.journal_dir / f"audit_{run_id}.jsonl"
+
+    def _owner_path(self, run_id: str) -> Path:
+        return self.journal_dir / f"audit_{run_id}.lock"
+
+    def _claim_run(self, run_id: str) -> None:
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        handle = self._owner_path(run_id).open("a+", encoding="utf-8")
+        _try_lock(handle)
+        self._owner_locks[run_id] = handle
+
+    def _release_run(self, run_id: str) -> None:
+        handle = self._owner_locks.pop(run_id, None)
+        if handle is not None:
+            handle.close()
+            self._owner_path(run_id).unlink(missing_ok=True)
+
+    def _append_journal(self, run_id: str, event: dict[str, Any]) -> None:
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        with self._journal_path(run_id).open("a", encoding="utf-8") as handle:
+            handle.write(json.dumps(event, ensure_ascii=True) + "\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def _enqueue(self, run_id: str, event: dict[str, Any]) -> None:
+        with self._lock:
+            self._append_journal(run_id, event)
+            self._events.append(event)
+
+    def _next_step_id(self) -> int:
+        with self._lock:
+            if not self._step_ids:
+                with self.engine.begin() as conn:
+                    rows = conn.execute(
+                        text(
+                            """
+                            select nextval(pg_get_serial_sequence('audit.run_steps', 'step_id'))
+                            from generate_series(1, :block)
+                            """
+                        ),
+                        {"block": STEP_ID_BLOCK},
+                    ).fetchall()
+                self._step_ids = [int(row[0]) for row in rows]
+            return self._step_ids.pop(0)
+
+    def _ensure_worker(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._worker, name="audit-flush", daemon=True)
+        self._thread.start()
+
+    def _worker(self) -> None:
+        while not self._stop.wait(self.flush_interval_seconds):
+            try:
+                self.flush()
+            except Exception:
+                # Events stay queued and journaled; the next flush retries them.
+                self.logger.exception("buffered audit flush failed")
+
+    def start_run(
+        self,
+        app_version: str,
+        machine_id: str,
+        config_hash: str,
+        notes: str | None = None,
+        triggered_by: str | None = None,
+    ) -> str:
+        if not self._replayed:
+            self.replay_journals()
+            self._replayed = True
+        run_id = super().start_run(app_version, machine_id, config_hash, notes=notes, triggered_by=triggered_by)
+        self._claim_run(run_id)
+        self._ensure_worker()
+        return run_id
+
+    def finish_run(self, run_id: str, status: str, notes: str | None = None) -> None:
+        self.flush()
+        super().finish_run(run_id, status, notes=notes)
+        with self._lock:
+            if not any(event["run_id"] == run_id for event in self._events):
+                self._journal_path(run_id).unlink(missing_ok=True)
+                self._release_run(run_id)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval_seconds)
+        self.flush()
+
+    def _start_step(self, run_id: str, step_name: str, table_name: str | None) -> int:
+        step_id = self._next_step_id()
+        self._step_runs[step_id] = run_id
+        self._enqueue(
+            run_id,
+            {
+                "kind": "step_start",
+                "run_id": run_id,
+                "step_id": step_id,
+                "step_name": step_name,
+                "table_name": table_name,
+                "started_at": now_brasilia().isoformat(),
+            },
+        )
+        return step_id
+
+    def _finish_step(
+        self,
+        step_id: int,
+        status: str,
+        counters: StepCounters,
+        error_message: str | None = None,
+    ) -> None:
+        run_id = self._step_runs.pop(step_id)
+        self._enqueue(
+            run_id,
+            {
+                "kind": "step_finish",
+                "run_id": run_id,
+                "step_id": step_id,
+                "status": status,
+                "finished_at": now_brasilia().isoformat(),
+                "rows_in": counters.rows_in,
+                "rows_out": counters.rows_out,
+                "rows_rejected": counters.rows_rejected,
+                "rows_inserted": counters.rows_inserted,
+                "rows_updated": counters.rows_updated,
+                "rows_deleted": counters.rows_deleted,
+                "rows_unchanged": counters.rows_unchanged,
+                "error_message": error_message,
+                "details": json.dumps(to_json_safe(counters.details or {}), ensure_ascii=True),
+            },
+        )
+
+    def write_metadata(self, run_id: str, table_name: str, meta_key: str, meta_value: dict) -> None:
+        self._enqueue(
+            run_id,
+            {
+                "kind": "metadata",
+                "run_id": run_id,
+                "table_name": table_name,
+                "meta_key": meta_key,
+                "meta_value": json.dumps(to_json_safe(meta_value), ensure_ascii=True),
+                "created_at": now_brasilia().isoformat(),
+            },
+        )
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                events = list(self._events)
+            if not events:
+                return 0
+            with self.engine.begin() as conn:
+                _apply_events(conn, events)
+            with self._lock:
+                del self._events[: len(events)]
+            return len(events)
+
+    def _running_runs(self, run_ids: list[str]) -> set[str]:
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text(
+                    """
+                    select run_id::text
+                    from audit.runs
+                    where status = 'running'
+                      and run_id::text = any(cast(:run_ids as text[]))
+                    """
+                ),
+                {"run_ids": run_ids},
+            ).fetchall()
+        return {str(row[0]) for row in rows}
+
+    def replay_journals(self) -> int:
+        # Journals left behind by a crashed process; every statement is idempotent. Another
+        # runner sharing the directory may still be writing its runs, so a journal is only
+        # replayed once its owner lock is free, or, without an owner file, once its run is
+        # no longer "running".
+        if not self.journal_dir.exists():
+            return 0
+        journals = {
+            journal.stem[len("audit_") :]: journal
+            for journal in sorted(self.journal_dir.glob("audit_*.jsonl"))
+        }
+        if not journals:
+            return 0
+        running = self._running_runs(list(journals))
+        replayed = 0
+        for run_id, journal in journals.items():
+            if run_id in self._owner_locks:
+                continue
+            owner_path = self._owner_path(run_id)
+            owner: IO[str] | None = None
+            if owner_path.exists():
+                owner = owner_path.open("a+", encoding="utf-8")
+                if not _try_lock(owner):
+                    owner.close()
+                    continue
+            elif run_id in running:
+                continue
+            try:
+                events = [
+                    json.loads(line)
+                    for line in journal.read_text(encoding="utf-8").splitlines()
+                    if line.strip()
+                ]
+                # A free owner lock means the process died mid-run: the run can never finish itself.
+                orphaned = owner is not None and run_id in running
+                if events or orphaned:
+                    with self.engine.begin() as conn:
+                        _apply_events(conn, events)
+                        if orphaned:
+                            _fail_orphaned_run(conn, run_id)
+                journal.unlink(missing_ok=True)
+                replayed += len(events)
+            finally:
+                if owner is not None:
+                    owner.close()
+                    owner_path.unlink(missing_ok=True)
+        return replayed
+
+
+def _fail_orphaned_run(conn: Connection, run_id: str) -> None:
+    conn.execute(
+        text(
+            """
+            update audit.runs
+            set finished_at = now(),
+                status = 'failed',
+                notes = concat_ws('; ', notes, 'recovered from audit journal: owner process exited before finish_run')
+            where run_id = :run_id
+              and status = 'running'
+            """
+        ),
+        {"run_id": run_id},
+    )
+
+
+def _apply_events(conn: Connection, events: list[dict[str, Any]]) -> None:
+    starts = [event for event in events if event["kind"] == "step_start"]
+    finishes = [event for event in events if event["kind"] == "step_finish"]
+    # One multi-row upsert cannot touch the same key twice; the latest value wins.
+    metadata = list(
+        {
+            (event["run_id"], event["table_name"], event["meta_key"]): event
+            for event in events
+            if event["kind"] == "metadata"
+        }.values()
+    )
+
+    # Starts go first so finishes in the same batch always find their row.
+    if starts:
+        conn.execute(
+            text(
+                """
+                insert into audit.run_steps (step_id, run_id, step_name, table_name, started_at, status)
+                values (:step_id, :run_id, :step_name, :table_name, cast(:started_at as timestamptz), 'running')
+                on conflict do nothing
+                """
+            ),
+            starts,
+        )
+    if finishes:
+        conn.execute(
+            text(
+                """
+                update audit.run_steps
+                set finished_at = cast(:finished_at as timestamptz),
+                    status = :status,
+                    rows_in = :rows_in,
+                    rows_out = :rows_out,
+                    rows_rejected = :rows_rejected,
+                    rows_inserted = :rows_inserted,
+                    rows_updated = :rows_updated,
+                    rows_deleted = :rows_deleted,
+                    rows_unchanged = :rows_unchanged,
+                    error_message = :error_message,
+                    details = cast(:details as jsonb)
+                where step_id = :step_id
+                  and run_id = :run_id
+                """
+            ),
+            finishes,
+        )
+    if metadata:
+        conn.execute(
+            text(
+                """
+                insert into audit.runs_metadata (run_id, table_name, meta_key, meta_value, created_at)
+                values (:run_id, :table_name, :meta_key, cast(:meta_value as jsonb), cast(:created_at as timestamptz))
+                on conflict (run_id, table_name, meta_key)
+                do update set
+                  meta_value = excluded.meta_value,
+                  created_at = excluded.created_at
+                """
+            ),
+            metadata,
+        )
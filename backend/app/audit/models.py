@@ -4,7 +4,7 @@ from dataclasses import dataclass
 from typing import Literal
 
 RunStatus = Literal["running", "success", "failed", "partial"]
-StepName = Literal["refresh", "load_staging", "validate", "promote", "cleanup"]
+StepName = Literal["refresh", "load_staging", "validate", "promote", "cleanup", "maintenance"]
 
 
 @dataclass
@@ -12,4 +12,8 @@ class StepCounters:
     rows_in: int | None = None
     rows_out: int | None = None
     rows_rejected: int | None = None
+    rows_inserted: int | None = None
+    rows_updated: int | None = None
+    rows_deleted: int | None = None
+    rows_unchanged: int | None = None
     details: dict | None = None
\ No newline at end of file
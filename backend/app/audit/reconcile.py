@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+import hashlib
+import re
+import time
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+IDENTIFIER_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+NULL_TOKEN = "\\N"
+SEPARATOR = "\x1f"
+ROOT_DEPTH = 2
+MAX_DEPTH = 8
+LEAF_ROWS = 512
+MAX_SAMPLES = 20
+# Modes where the app table mirrors the source file; upsert/insert_new/incremental keep
+# rows the current file no longer has, so every bucket would differ.
+RECONCILABLE_MODES = ("full_replace", "full_replace_delta", "upsert_sweep", "partition_exchange")
+
+INTEGER_TYPES = {"int", "integer", "bigint", "smallint"}
+NUMERIC_TYPES = {"float", "double", "numeric", "decimal"}
+TIMESTAMP_TYPES = {"timestamp", "timestamptz", "datetime"}
+BOOLEAN_TYPES = {"bool", "boolean"}
+
+
+def _validate_identifier(value: str) -> None:
+    if not IDENTIFIER_RE.match(value):
+        raise ValueError(f"Invalid SQL identifier: {value}")
+
+
+@dataclass(frozen=True)
+class BucketDigest:
+    rows: int
+    digest: int
+
+
+# Both sides render every value to the same text before hashing: integers as digits,
+# numerics without trailing zeros, dates as ISO, timestamps as epoch seconds (so the
+# session time zone does not matter) and nulls as \N.
+def canonical_sql(alias: str, column: str, sql_type: str | None) -> str:
+    ref = f'{alias}."{column}"'
+    lowered = (sql_type or "text").lower()
+    if lowered in NUMERIC_TYPES:
+        expr = f"trim_scale({ref}::numeric)::text"
+    elif lowered == "date":
+        expr = f"to_char({ref}, 'YYYY-MM-DD')"
+    elif lowered in TIMESTAMP_TYPES:
+        expr = f"trim_scale(extract(epoch from {ref}))::text"
+    elif lowered in BOOLEAN_TYPES:
+        expr = f"case when {ref} then 't' else 'f' end"
+    else:
+        expr = f"{ref}::text"
+    return f"coalesce({expr}, '{NULL_TOKEN}')"
+
+
+def _decimal_text(value: Decimal) -> str:
+    if value == 0:
+        return "0"
+    return format(value.normalize(), "f")
+
+
+def _canonical_value(value: object, lowered: str) -> str:
+    if lowered in INTEGER_TYPES:
+        return str(int(value))
+    if lowered in NUMERIC_TYPES:
+        return _decimal_text(Decimal(repr(float(value))) if isinstance(value, float) else Decimal(str(value)))
+    if lowered == "date":
+        if isinstance(value, datetime):
+            value = value.date()
+        return value.isoformat() if isinstance(value, date) else str(value)
+    if lowered in TIMESTAMP_TYPES:
+        timestamp = pd.Timestamp(value)
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.tz_localize("UTC")
+        return _decimal_text(Decimal(timestamp.value) / Decimal(1_000_000_000))
+    if lowered in BOOLEAN_TYPES:
+        return "t" if bool(value) else "f"
+    return str(value)
+
+
+def canonical_values(series: pd.Series, sql_type: str | None) -> list[str]:
+    lowered = (sql_type or "text").lower()
+    return [NULL_TOKEN if pd.isna(value) else _canonical_value(value, lowered) for value in series]
+
+
+def _signed_prefix(row_hash: str) -> int:
+    # Same value as ('x' || left(row_hash, 16))::bit(64)::bigint on the server.
+    value = int(row_hash[:16], 16)
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def local_hashes(
+    frame: pd.DataFrame,
+    key_columns: list[str],
+    business_columns: list[str],
+    sql_types: dict[str, str],
+) -> pd.DataFrame:
+    # Columns absent from the file are loaded as nulls, so they hash as nulls here too.
+    rendered = {
+        col: canonical_values(frame[col], sql_types.get(col)) if col in frame.columns else [NULL_TOKEN] * len(frame)
+        for col in business_columns
+    }
+    key_text = [SEPARATOR.join(values) for values in zip(*(rendered[col] for col in key_columns))]
+    row_text = [SEPARATOR.join(values) for values in zip(*(rendered[col] for col in business_columns))]
+    return pd.DataFrame(
+        {
+            "key_hash": [hashlib.md5(value.encode("utf-8")).hexdigest() for value in key_text],
+            "row_hash": [hashlib.md5(value.encode("utf-8")).hexdigest() for value in row_text],
+            "key_text": key_text,
+        }
+    )
+
+
+def local_buckets(hashes: pd.DataFrame, depth: int, prefixes: list[str] | None = None) -> dict[str, BucketDigest]:
+    selected = hashes
+    if prefixes is not None:
+        selected = hashes.loc[hashes["key_hash"].str[: depth - 1].isin(prefixes)]
+    buckets: dict[str, list[int]] = {}
+    for key_hash, row_hash in zip(selected["key_hash"], selected["row_hash"]):
+        bucket = buckets.setdefault(key_hash[:depth], [0, 0])
+        bucket[0] += 1
+        bucket[1] += _signed_prefix(row_hash)
+    return {prefix: BucketDigest(rows, digest) for prefix, (rows, digest) in buckets.items()}
+
+
+def hashed_rows_sql(
+    table_name: str,
+    key_columns: list[str],
+    business_columns: list[str],
+    sql_types: dict[str, str],
+    scope_filter_sql: str = "",
+) -> str:
+    key_expr = ", ".join(canonical_sql("a", col, sql_types.get(col)) for col in key_columns)
+    row_expr = ", ".join(canonical_sql("a", col, sql_types.get(col)) for col in business_columns)
+    where_sql = f"where {scope_filter_sql}" if scope_filter_sql else ""
+    return f"""
+        select
+            md5(concat_ws(chr(31), {key_expr})) as key_hash,
+            md5(concat_ws(chr(31), {row_expr})) as row_hash,
+            concat_ws(chr(31), {key_expr}) as key_text
+        from app."{table_name}" a
+        {where_sql}
+    """
+
+
+def remote_buckets(
+    conn: Connection,
+    hashed_sql: str,
+    depth: int,
+    prefixes: list[str] | None,
+    params: dict[str, object],
+) -> dict[str, BucketDigest]:
+    # Plain count/sum per group: parallel-safe, so large tables get a parallel aggregate.
+    prefix_filter = "where left(h.key_hash, :parent_depth) = any(cast(:prefixes as text[]))" if prefixes is not None else ""
+    rows = conn.execute(
+        text(
+            f"""
+            select
+                left(h.key_hash, :depth) as bucket,
+                count(*) as row_count,
+                sum(('x' || left(h.row_hash, 16))::bit(64)::bigint::numeric) as digest
+            from ({hashed_sql}) h
+            {prefix_filter}
+            group by 1
+            """
+        ),
+        {**params, "depth": depth, "parent_depth": depth - 1, "prefixes": prefixes},
+    ).fetchall()
+    return {str(row[0]): BucketDigest(int(row[1]), int(row[2])) for row in rows}
+
+
+def _fetch_leaves(
+    conn: Connection,
+    hashed_sql: str,
+    depth: int,
+    prefixes: list[str],
+    params: dict[str, object],
+) -> pd.DataFrame:
+    rows = conn.execute(
+        text(
+            f"""
+            select h.key_hash, h.row_hash, h.key_text
+            from ({hashed_sql}) h
+            where left(h.key_hash, :depth) = any(cast(:prefixes as text[]))
+            """
+        ),
+        {**params, "depth": depth, "prefixes": prefixes},
+    ).fetchall()
+    return pd.DataFrame(rows, columns=["key_hash", "row_hash", "key_text"])
+
+
+def diff_leaves(local: pd.DataFrame, remote: pd.DataFrame) -> dict[str, object]:
+    local_rows = Counter(zip(local["key_hash"], local["row_hash"]))
+    remote_rows = Counter(zip(remote["key_hash"], remote["row_hash"]))
+    missing = local_rows - remote_rows
+    extra = remote_rows - local_rows
+    changed_keys = {key for key, _ in missing} & {key for key, _ in extra}
+
+    key_text = dict(zip(remote["key_hash"], remote["key_text"]))
+    key_text.update(zip(local["key_hash"], local["key_text"]))
+
+    def sample(keys: set[str]) -> list[str]:
+        return [key_text[key].replace(SEPARATOR, "|") for key in sorted(keys)[:MAX_SAMPLES]]
+
+    missing_keys = {key for key, _ in missing} - changed_keys
+    extra_keys = {key for key, _ in extra} - changed_keys
+    return {
+        "rows_missing": sum(count for (key, _), count in missing.items() if key not in changed_keys),
+        "rows_extra": sum(count for (key, _), count in extra.items() if key not in changed_keys),
+        "keys_changed": len(changed_keys),
+        "missing_sample": sample(missing_keys),
+        "extra_sample": sample(extra_keys),
+        "changed_sample": sample(changed_keys),
+    }
+
+
+def reconcile_table(
+    engine: Engine,
+    table_name: str,
+    frame: pd.DataFrame,
+    business_columns: list[str],
+    key_columns: list[str],
+    sql_types: dict[str, str],
+    scope_filter_sql: str = "",
+    scope_params: dict[str, object] | None = None,
+) -> dict[str, object]:
+    _validate_identifier(table_name)
+    for col in business_columns:
+        _validate_identifier(col)
+
+    started = time.perf_counter()
+    params = dict(scope_params or {})
+    hashes = local_hashes(frame, key_columns, business_columns, sql_types)
+    hashed_sql = hashed_rows_sql(table_name, key_columns, business_columns, sql_types, scope_filter_sql)
+
+    depth = ROOT_DEPTH
+    prefixes: list[str] | None = None
+    levels = 0
+    buckets_compared = 0
+    rows_fetched = 0
+    app_rows = 0
+    leaves: list[tuple[int, list[str]]] = []
+
+    with engine.begin() as conn:
+        # Compare one level of buckets at a time; only mismatched buckets are split further,
+        # and buckets small enough (or at MAX_DEPTH) are fetched row-hash by row-hash.
+        while True:
+            local = local_buckets(hashes, depth, prefixes)
+            remote = remote_buckets(conn, hashed_sql, depth, prefixes, params)
+            levels += 1
+            buckets_compared += len(set(local) | set(remote))
+            if prefixes is None:
+                app_rows = sum(bucket.rows for bucket in remote.values())
+
+            mismatched = sorted(
+                prefix for prefix in set(local) | set(remote) if local.get(prefix) != remote.get(prefix)
+            )
+            split = [
+                prefix
+                for prefix in mismatched
+                if depth < MAX_DEPTH
+                and max(
+                    local.get(prefix, BucketDigest(0, 0)).rows,
+                    remote.get(prefix, BucketDigest(0, 0)).rows,
+                ) > LEAF_ROWS
+            ]
+            fetch = [prefix for prefix in mismatched if prefix not in split]
+            if fetch:
+                leaves.append((depth, fetch))
+            if not split:
+                break
+            prefixes = split
+            depth += 1
+
+        diff = {"rows_missing": 0, "rows_extra": 0, "keys_changed": 0}
+        samples: dict[str, list[str]] = {"missing_sample": [], "extra_sample": [], "changed_sample": []}
+        for leaf_depth, leaf_prefixes in leaves:
+            remote_rows = _fetch_leaves(conn, hashed_sql, leaf_depth, leaf_prefixes, params)
+            rows_fetched += len(remote_rows)
+            local_rows = hashes.loc[hashes["key_hash"].str[:leaf_depth].isin(leaf_prefixes)]
+            leaf_diff = diff_leaves(local_rows, remote_rows)
+            for key in diff:
+                diff[key] += int(leaf_diff[key])
+            for key in samples:
+                samples[key] = (samples[key] + list(leaf_diff[key]))[:MAX_SAMPLES]
+
+    matched = not leaves
+    return {
+        "status": "match" if matched else "mismatch",
+        "source_rows": len(hashes),
+        "app_rows": app_rows,
+        "levels": levels,
+        "buckets_compared": buckets_compared,
+        "rows_fetched": rows_fetched,
+        **diff,
+        **samples,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
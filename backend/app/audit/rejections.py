@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import hashlib
+from io import StringIO
+import json
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.utils.json_safe import to_json_safe
+from app.utils.logging import get_logger
+from app.utils.timezone import now_brasilia
+
+REJECTION_COLUMNS = ["run_id", "source_row_number", "reason_code", "reason_detail", "payload", "fingerprint"]
+GROUP_COLUMNS = ["reason_code", "column_name"]
+# Row position and load metadata change between runs without the row itself changing.
+FINGERPRINT_IGNORED_KEYS = {"source_row_number", "source_file", "run_id", "ingested_at"}
+
+
+@dataclass
+class PreparedRejections:
+    rows: pd.DataFrame
+    groups: list[dict[str, object]] = field(default_factory=list)
+
+
+def _payload_json(value: object) -> str:
+    payload = to_json_safe(value) if isinstance(value, dict) else {"raw": str(value)}
+    return json.dumps(payload, ensure_ascii=True)
+
+
+def prepare_rejections(rejections: pd.DataFrame, run_id: str, payload_sample: int | None) -> PreparedRejections:
+    # Every rejected row keeps its row number, reason and detail; the payload is only
+    # serialized for the first `payload_sample` rows of each (reason_code, column) group.
+    normalized = rejections.copy()
+    for column in ["source_row_number", "reason_code", "reason_detail", "payload", "column_name", "fingerprint"]:
+        if column not in normalized.columns:
+            normalized[column] = None
+
+    normalized["run_id"] = run_id
+    normalized["source_row_number"] = normalized["source_row_number"].fillna(0).astype(int)
+    group_keys = normalized[GROUP_COLUMNS].fillna("").astype(str)
+    position = group_keys.groupby(GROUP_COLUMNS, sort=False).cumcount()
+    sampled = position < payload_sample if payload_sample is not None else pd.Series(True, index=normalized.index)
+
+    normalized["payload"] = [
+        _payload_json(value) if keep else None
+        for value, keep in zip(normalized["payload"], sampled)
+    ]
+
+    stats = (
+        group_keys.assign(sampled=sampled)
+        .groupby(GROUP_COLUMNS, sort=False)["sampled"]
+        .agg(["size", "sum"])
+    )
+    groups = [
+        {
+            "reason_code": reason_code,
+            "column": column_name or None,
+            "rows": int(row["size"]),
+            "payloads": int(row["sum"]),
+        }
+        for (reason_code, column_name), row in stats.iterrows()
+    ]
+    return PreparedRejections(rows=normalized[REJECTION_COLUMNS], groups=groups)
+
+
+def rejection_fingerprints(table_name: str, rejections: pd.DataFrame) -> pd.Series:
+    def fingerprint(reason_code: object, column_name: object, payload: object) -> str:
+        if isinstance(payload, dict):
+            payload = {key: value for key, value in payload.items() if key not in FINGERPRINT_IGNORED_KEYS}
+        body = json.dumps(to_json_safe(payload), ensure_ascii=True, sort_keys=True, default=str)
+        return hashlib.md5(f"{table_name}|{reason_code}|{column_name or ''}|{body}".encode("utf-8")).hexdigest()
+
+    column_names = rejections["column_name"] if "column_name" in rejections.columns else [None] * len(rejections)
+    payloads = rejections["payload"] if "payload" in rejections.columns else [None] * len(rejections)
+    return pd.Series(
+        [
+            fingerprint(reason_code, column_name, payload)
+            for reason_code, column_name, payload in zip(rejections["reason_code"], column_names, payloads)
+        ],
+        index=rejections.index,
+        dtype="object",
+    )
+
+
+def register_fingerprints(
+    conn: Connection,
+    table_name: str,
+    run_id: str,
+    fingerprints: pd.DataFrame,
+) -> set[str]:
+    # Repeats only bump last_seen/occurrences; the returned set holds fingerprints seen for
+    # the first time, which are the only rows whose detail gets written.
+    buffer = StringIO()
+    fingerprints[["fingerprint", "reason_code"]].to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    with conn.connection.cursor() as cursor:
+        cursor.execute(
+            "create temp table if not exists _rejection_seen (fingerprint text, reason_code text) on commit drop"
+        )
+        cursor.copy_expert("COPY _rejection_seen (fingerprint, reason_code) FROM STDIN WITH (FORMAT CSV)", buffer)
+
+    rows = conn.execute(
+        text(
+            """
+            insert into audit.rejection_fingerprints as f (
+                table_name,
+                fingerprint,
+                reason_code,
+                first_run_id,
+                last_run_id,
+                occurrences
+            )
+            select :table_name, s.fingerprint, min(s.reason_code), :run_id, :run_id, count(*)
+            from _rejection_seen s
+            group by s.fingerprint
+            on conflict (table_name, fingerprint)
+            do update set
+                last_seen_at = now(),
+                last_run_id = excluded.last_run_id,
+                occurrences = f.occurrences + excluded.occurrences
+            returning f.fingerprint, (f.xmax = 0) as inserted
+            """
+        ),
+        {"table_name": table_name, "run_id": run_id},
+    ).fetchall()
+    return {str(row[0]) for row in rows if row[1]}
+
+
+def unseen_fingerprints(conn: Connection, table_name: str, fingerprints: pd.DataFrame) -> set[str]:
+    # Read-only counterpart of register_fingerprints for validate/dry-run runs.
+    candidates = sorted(set(fingerprints["fingerprint"]))
+    rows = conn.execute(
+        text(
+            """
+            select fingerprint
+            from audit.rejection_fingerprints
+            where table_name = :table_name
+              and fingerprint = any(cast(:fingerprints as text[]))
+            """
+        ),
+        {"table_name": table_name, "fingerprints": candidates},
+    ).fetchall()
+    return set(candidates) - {str(row[0]) for row in rows}
+
+
+def copy_rejections(conn: Connection, table_name: str, rows: pd.DataFrame) -> None:
+    buffer = StringIO()
+    rows.to_csv(buffer, index=False, header=False, na_rep="\\N")
+    buffer.seek(0)
+    quoted_cols = ", ".join(f'"{col}"' for col in REJECTION_COLUMNS)
+    copy_sql = (
+        f'COPY audit."rejections_{table_name}" ({quoted_cols}) '
+        "FROM STDIN WITH (FORMAT CSV, NULL '\\N')"
+    )
+    with conn.connection.cursor() as cursor:
+        cursor.copy_expert(copy_sql, buffer)
+
+
+def prune_rejections_exports(rejections_dir: Path, retention_days: int) -> None:
+    if retention_days <= 0 or not rejections_dir.exists():
+        return
+
+    cutoff = now_brasilia() - timedelta(days=retention_days)
+    for export_path in rejections_dir.glob("rejections_*.csv*"):
+        try:
+            modified_at = datetime.fromtimestamp(export_path.stat().st_mtime, cutoff.tzinfo)
+            if modified_at < cutoff:
+                export_path.unlink(missing_ok=True)
+        except OSError:
+            # Ignore filesystem races/locks; cleanup is best-effort.
+            continue
+
+
+class RejectionExporter:
+    # CSV exports run on a single background thread, so the sync never waits on disk
+    # (the executor's worker is joined at interpreter exit); pruning the export
+    # directory happens once per process instead of once per table.
+
+    def __init__(self) -> None:
+        self.logger = get_logger()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rejections-export")
+        self._pruned: set[Path] = set()
+
+    def submit(
+        self,
+        rows: pd.DataFrame,
+        table_name: str,
+        run_id: str,
+        rejections_dir: Path,
+        retention_days: int,
+    ) -> None:
+        prune = rejections_dir not in self._pruned
+        if rows.empty and not prune:
+            return
+        self._pruned.add(rejections_dir)
+        timestamp = now_brasilia().strftime("%Y%m%dT%H%M%S%z")
+        export_path = rejections_dir / f"rejections_{table_name}_{run_id}_{timestamp}.csv.gz"
+        future = self._executor.submit(self._export, rows, export_path, rejections_dir, retention_days, prune)
+        future.add_done_callback(self._log_failure)
+
+    def _export(self, rows: pd.DataFrame, export_path: Path, rejections_dir: Path, retention_days: int, prune: bool) -> None:
+        rejections_dir.mkdir(parents=True, exist_ok=True)
+        if prune:
+            prune_rejections_exports(rejections_dir, retention_days)
+        if not rows.empty:
+            rows.to_csv(export_path, index=False, encoding="utf-8", compression="gzip")
+
+    def _log_failure(self, future: Future) -> None:
+        exc = future.exception()
+        if exc is not None:
+            self.logger.error(f"rejections export failed: {exc}")
+
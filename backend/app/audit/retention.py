@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+import os
+import re
+import time
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+PARTITION_RE = re.compile(r"^(?P<table>[a-z_][a-z0-9_]*)_p(?P<month>\d{6})$")
+# Months kept ahead of the clock so no run ever lands in the default partition.
+MONTHS_AHEAD = 1
+REJECTIONS_PREFIX = "rejections_"
+
+
+def new_run_id(now_ms: int | None = None) -> str:
+    # UUIDv7: 48-bit unix ms timestamp first, so run ids sort by start time and the
+    # audit tables can be range-partitioned by run_id.
+    timestamp_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    value = (timestamp_ms & ((1 << 48) - 1)) << 80
+    value |= int.from_bytes(os.urandom(10), "big") & ((1 << 80) - 1)
+    value = (value & ~(0xF << 76)) | (0x7 << 76)
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)
+    return str(uuid.UUID(int=value))
+
+
+def run_id_started_at(run_id: str) -> datetime | None:
+    # Only UUIDv7 run ids carry their start time; older uuid4 ids return None.
+    value = uuid.UUID(run_id)
+    if value.version != 7:
+        return None
+    return datetime.fromtimestamp((value.int >> 80) / 1000, tz=timezone.utc)
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def run_id_floor(month: date) -> str:
+    # Same value as audit.run_id_floor(): the smallest run id generated in that UTC month.
+    start = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+    return str(uuid.UUID(int=int(start.timestamp() * 1000) << 80))
+
+
+def retention_days_for(table_name: str, default_days: int, tables: dict[str, int]) -> int:
+    # "rejections" covers every rejections_<table> unless that table has its own entry.
+    if table_name in tables:
+        return tables[table_name]
+    if table_name.startswith(REJECTIONS_PREFIX) and "rejections" in tables:
+        return tables["rejections"]
+    return default_days
+
+
+def expired_partitions(
+    partitions: dict[str, date],
+    retention_days: int,
+    today: date,
+) -> list[str]:
+    # A month partition goes only once its last run is older than the retention window.
+    if retention_days <= 0:
+        return []
+    return sorted(
+        name
+        for name, month in partitions.items()
+        if (today - add_months(month, 1)).days >= retention_days
+    )
+
+
+def runs_retention_days(default_days: int, tables: dict[str, int], audit_tables: list[str]) -> int:
+    # audit.runs is not partitioned: its rows are deleted and cascade into the partitioned
+    # tables, so a run is kept for as long as any of them keeps its month.
+    days = [retention_days_for(name, default_days, tables) for name in ["runs", *audit_tables]]
+    return 0 if 0 in days else max(days)
+
+
+def runs_cutoff(retention_days: int, today: date) -> datetime | None:
+    # Runs started before this instant only live in month partitions that were already dropped
+    # (or in the default partition, for legacy uuid4 run ids).
+    if retention_days <= 0:
+        return None
+    start = month_start(today - timedelta(days=retention_days))
+    return datetime(start.year, start.month, 1, tzinfo=timezone.utc)
+
+
+def _partitioned_tables(conn: Connection) -> list[str]:
+    rows = conn.execute(
+        text(
+            """
+            select c.relname
+            from pg_partitioned_table p
+            join pg_class c on c.oid = p.partrelid
+            join pg_namespace n on n.oid = c.relnamespace
+            where n.nspname = 'audit'
+            order by c.relname
+            """
+        )
+    ).fetchall()
+    return [str(row[0]) for row in rows]
+
+
+def _month_partitions(conn: Connection, table_name: str) -> dict[str, date]:
+    rows = conn.execute(
+        text(
+            """
+            select c.relname
+            from pg_inherits i
+            join pg_class c on c.oid = i.inhrelid
+            where i.inhparent = cast(:parent as regclass)
+            """
+        ),
+        {"parent": f'audit."{table_name}"'},
+    ).fetchall()
+    partitions: dict[str, date] = {}
+    for row in rows:
+        match = PARTITION_RE.match(str(row[0]))
+        if match and match.group("table") == table_name:
+            month = match.group("month")
+            partitions[str(row[0])] = date(int(month[:4]), int(month[4:]), 1)
+    return partitions
+
+
+def maintain_audit_partitions(
+    engine: Engine,
+    default_days: int,
+    tables: dict[str, int],
+    today: date | None = None,
+) -> dict[str, object]:
+    # Creates the coming month partitions and detaches/drops months past retention; old
+    # audit data leaves as whole partitions. Only audit.runs rows are deleted, once their
+    # months are gone, and the cascade clears legacy rows from the default partitions.
+    started = time.perf_counter()
+    today = today or datetime.now(timezone.utc).date()
+    wanted = [add_months(month_start(today), offset) for offset in range(MONTHS_AHEAD + 1)]
+    created: list[str] = []
+    dropped: list[str] = []
+
+    with engine.begin() as conn:
+        audit_tables = _partitioned_tables(conn)
+
+    for table_name in audit_tables:
+        with engine.begin() as conn:
+            conn.execute(text("set local lock_timeout = '5s'"))
+            partitions = _month_partitions(conn, table_name)
+            existing = set(partitions.values())
+            for month in wanted:
+                if month not in existing:
+                    created.append(
+                        str(
+                            conn.execute(
+                                text("select audit.create_run_partition(:table_name, :month)"),
+                                {"table_name": table_name, "month": month},
+                            ).scalar_one()
+                        )
+                    )
+
+            days = retention_days_for(table_name, default_days, tables)
+            for partition in expired_partitions(partitions, days, today):
+                conn.execute(text(f'alter table audit."{table_name}" detach partition audit."{partition}"'))
+                conn.execute(text(f'drop table audit."{partition}"'))
+                dropped.append(partition)
+
+    runs_deleted = 0
+    cutoff = runs_cutoff(runs_retention_days(default_days, tables, audit_tables), today)
+    if cutoff is not None:
+        with engine.begin() as conn:
+            conn.execute(text("set local lock_timeout = '5s'"))
+            runs_deleted = conn.execute(
+                text("delete from audit.runs where started_at < :cutoff"),
+                {"cutoff": cutoff},
+            ).rowcount
+
+    return {
+        "tables": len(audit_tables),
+        "partitions_created": created,
+        "partitions_dropped": dropped,
+        "runs_deleted": runs_deleted,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.etl.promote.counts import PromoteCounts
+from app.etl.promote.row_hash import row_hash_sql
+
+
+@dataclass(frozen=True)
+class PreviousSnapshot:
+    row_count: int
+    checksum: str | None
+    reconciled_at: datetime | None
+
+
+@dataclass(frozen=True)
+class SnapshotPlan:
+    method: str
+    row_count: int = 0
+    checksum: str | None = None
+    reconciled_at: datetime | None = None
+
+
+def plan_snapshot(
+    previous: PreviousSnapshot | None,
+    counts: PromoteCounts | None,
+    now: datetime,
+    reconcile_interval_hours: int,
+) -> SnapshotPlan:
+    if previous is None or counts is None or previous.reconciled_at is None:
+        return SnapshotPlan("exact")
+    if counts.details.get("staging_skipped"):
+        # The direct COPY FREEZE swap does not count the rows it replaced; recount the new table.
+        return SnapshotPlan("exact")
+    if reconcile_interval_hours <= 0 or previous.reconciled_at < now - timedelta(hours=reconcile_interval_hours):
+        return SnapshotPlan("exact")
+
+    row_count = previous.row_count + counts.inserted - counts.deleted
+    if row_count < 0:
+        # The deltas no longer add up (table changed outside the sync); recount.
+        return SnapshotPlan("exact")
+    # Unchanged content keeps its fingerprint; otherwise it is unknown until the next exact pass.
+    checksum = previous.checksum if counts.rows_written == 0 else None
+    return SnapshotPlan("delta", row_count=row_count, checksum=checksum, reconciled_at=previous.reconciled_at)
+
+
+def read_previous_snapshot(conn: Connection, table_name: str) -> PreviousSnapshot | None:
+    row = conn.execute(
+        text(
+            """
+            select row_count, checksum, reconciled_at
+            from audit.table_snapshots
+            where table_name = :table_name
+            order by captured_at desc
+            limit 1
+            """
+        ),
+        {"table_name": table_name},
+    ).first()
+    if row is None:
+        return None
+    return PreviousSnapshot(int(row.row_count), row.checksum, row.reconciled_at)
+
+
+def exact_snapshot_sql(table_name: str, business_columns: list[str] | None) -> str:
+    # Order-independent: the sum of the first 64 bits of each row hash needs no sort,
+    # so the periodic exact pass is a single sequential scan.
+    content = row_hash_sql("a", business_columns) if business_columns else "md5(a::text)"
+    return f"""
+        select
+            count(*)::bigint as row_count,
+            md5(coalesce(sum(('x' || left({content}, 16))::bit(64)::bigint::numeric), 0)::text) as checksum
+        from app."{table_name}" a
+    """
+
+
+def save_table_state(
+    conn: Connection,
+    table_name: str,
+    run_id: str,
+    row_count: int,
+    source_fingerprint: str | None,
+) -> None:
+    # Written in the snapshot transaction, so the registry never points at a fingerprint
+    # whose promote did not finish; a null fingerprint keeps the previous one.
+    conn.execute(
+        text(
+            """
+            insert into audit.table_state (
+                table_name,
+                source_fingerprint,
+                source_fingerprint_at,
+                row_count,
+                row_count_at,
+                last_run_id,
+                updated_at
+            )
+            values (
+                :table_name,
+                cast(:source_fingerprint as jsonb),
+                case when :source_fingerprint is not null then now() end,
+                :row_count,
+                now(),
+                :run_id,
+                now()
+            )
+            on conflict (table_name) do update set
+                source_fingerprint = coalesce(excluded.source_fingerprint, audit.table_state.source_fingerprint),
+                source_fingerprint_at = coalesce(excluded.source_fingerprint_at, audit.table_state.source_fingerprint_at),
+                row_count = excluded.row_count,
+                row_count_at = excluded.row_count_at,
+                last_run_id = excluded.last_run_id,
+                updated_at = excluded.updated_at
+            """
+        ),
+        {
+            "table_name": table_name,
+            "source_fingerprint": source_fingerprint,
+            "row_count": row_count,
+            "run_id": run_id,
+        },
+    )
+
+
+def load_source_fingerprints(conn: Connection) -> dict[str, dict[str, object]]:
+    rows = conn.execute(
+        text(
+            """
+            select table_name, source_fingerprint
+            from audit.table_state
+            where source_fingerprint is not null
+            """
+        )
+    ).mappings().all()
+    return {
+        str(row["table_name"]): row["source_fingerprint"]
+        for row in rows
+        if isinstance(row["source_fingerprint"], dict)
+    }
@@ -1,9 +1,7 @@
 from __future__ import annotations
 
 import json
-import uuid
 from contextlib import contextmanager
-from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Iterator
 
@@ -12,28 +10,31 @@ from sqlalchemy import text
 from sqlalchemy.engine import Engine
 
 from app.audit.models import StepCounters
+from app.audit.rejections import (
+    RejectionExporter,
+    copy_rejections,
+    prepare_rejections,
+    register_fingerprints,
+    rejection_fingerprints,
+    unseen_fingerprints,
+)
+from app.audit.retention import new_run_id
+from app.audit.snapshots import (
+    SnapshotPlan,
+    exact_snapshot_sql,
+    plan_snapshot,
+    read_previous_snapshot,
+    save_table_state,
+)
+from app.etl.promote.counts import PromoteCounts
 from app.utils.json_safe import to_json_safe
 from app.utils.timezone import now_brasilia
 
 
-def _prune_rejections_exports(rejections_dir: Path, retention_days: int) -> None:
-    if retention_days <= 0 or not rejections_dir.exists():
-        return
-
-    cutoff = now_brasilia() - timedelta(days=retention_days)
-    for csv_path in rejections_dir.glob("rejections_*.csv"):
-        try:
-            modified_at = datetime.fromtimestamp(csv_path.stat().st_mtime, cutoff.tzinfo)
-            if modified_at < cutoff:
-                csv_path.unlink(missing_ok=True)
-        except OSError:
-            # Ignore filesystem races/locks; cleanup is best-effort.
-            continue
-
-
 class AuditWriter:
     def __init__(self, engine: Engine):
         self.engine = engine
+        self.rejection_exports = RejectionExporter()
 
     def start_run(
         self,
@@ -43,7 +44,7 @@ class AuditWriter:
         notes: str | None = None,
         triggered_by: str | None = None,
     ) -> str:
-        run_id = str(uuid.uuid4())
+        run_id = new_run_id()
         with self.engine.begin() as conn:
             conn.execute(
                 text(
@@ -147,6 +148,10 @@ class AuditWriter:
                         rows_in = :rows_in,
                         rows_out = :rows_out,
                         rows_rejected = :rows_rejected,
+                        rows_inserted = :rows_inserted,
+                        rows_updated = :rows_updated,
+                        rows_deleted = :rows_deleted,
+                        rows_unchanged = :rows_unchanged,
                         error_message = :error_message,
                         details = cast(:details as jsonb)
                     where step_id = :step_id
@@ -158,6 +163,10 @@ class AuditWriter:
                     "rows_in": counters.rows_in,
                     "rows_out": counters.rows_out,
                     "rows_rejected": counters.rows_rejected,
+                    "rows_inserted": counters.rows_inserted,
+                    "rows_updated": counters.rows_updated,
+                    "rows_deleted": counters.rows_deleted,
+                    "rows_unchanged": counters.rows_unchanged,
                     "error_message": error_message,
                     "details": json.dumps(to_json_safe(counters.details or {}), ensure_ascii=True),
                 },
@@ -212,18 +221,29 @@ class AuditWriter:
                 },
             )
 
-    def write_snapshot(self, run_id: str, table_name: str) -> None:
+    def write_snapshot(
+        self,
+        run_id: str,
+        table_name: str,
+        counts: PromoteCounts | None = None,
+        business_columns: list[str] | None = None,
+        reconcile_interval_hours: int = 24,
+        source_fingerprint: dict | None = None,
+    ) -> SnapshotPlan:
         with self.engine.begin() as conn:
-            row = conn.execute(
-                text(
-                    f"""
-                    select
-                        count(*)::bigint as row_count,
-                        md5(count(*)::text || ':' || coalesce(max(updated_at)::text, '')) as checksum
-                    from app."{table_name}"
-                    """
+            plan = plan_snapshot(
+                read_previous_snapshot(conn, table_name),
+                counts,
+                now_brasilia(),
+                reconcile_interval_hours,
+            )
+            if plan.method == "exact":
+                row = conn.execute(text(exact_snapshot_sql(table_name, business_columns))).first()
+                plan = SnapshotPlan(
+                    "exact",
+                    row_count=int(row.row_count if row else 0),
+                    checksum=str(row.checksum if row else ""),
                 )
-            ).first()
 
             conn.execute(
                 text(
@@ -233,6 +253,8 @@ class AuditWriter:
                         table_name,
                         row_count,
                         checksum,
+                        method,
+                        reconciled_at,
                         captured_at
                     )
                     values (
@@ -240,22 +262,36 @@ class AuditWriter:
                         :table_name,
                         :row_count,
                         :checksum,
+                        :method,
+                        coalesce(cast(:reconciled_at as timestamptz), now()),
                         now()
                     )
                     on conflict (run_id, table_name)
                     do update set
                         row_count = excluded.row_count,
                         checksum = excluded.checksum,
+                        method = excluded.method,
+                        reconciled_at = excluded.reconciled_at,
                         captured_at = excluded.captured_at
                     """
                 ),
                 {
                     "run_id": run_id,
                     "table_name": table_name,
-                    "row_count": int(row.row_count if row else 0),
-                    "checksum": str(row.checksum if row else ""),
+                    "row_count": plan.row_count,
+                    "checksum": plan.checksum,
+                    "method": plan.method,
+                    "reconciled_at": plan.reconciled_at,
                 },
             )
+            save_table_state(
+                conn,
+                table_name,
+                run_id,
+                plan.row_count,
+                json.dumps(to_json_safe(source_fingerprint), ensure_ascii=True) if source_fingerprint else None,
+            )
+        return plan
 
     def write_rejections(
         self,
@@ -264,68 +300,35 @@ class AuditWriter:
         rejections: pd.DataFrame,
         rejections_dir: Path,
         retention_days: int = 14,
+        payload_sample: int | None = None,
+        dedupe: bool = False,
+        details: dict[str, object] | None = None,
+        record_fingerprints: bool = True,
     ) -> int:
-        rejections_dir.mkdir(parents=True, exist_ok=True)
-        _prune_rejections_exports(rejections_dir, retention_days)
         if rejections.empty:
+            self.rejection_exports.submit(rejections, table_name, run_id, rejections_dir, retention_days)
             return 0
 
-        normalized = rejections.copy()
-        for column in ["source_row_number", "reason_code", "reason_detail", "payload"]:
-            if column not in normalized.columns:
-                if column == "payload":
-                    normalized[column] = [{} for _ in range(len(normalized))]
-                else:
-                    normalized[column] = None
-
-        normalized["run_id"] = run_id
-        normalized["source_row_number"] = normalized["source_row_number"].fillna(0).astype(int)
-        normalized["payload"] = normalized["payload"].map(
-            lambda value: to_json_safe(value) if isinstance(value, dict) else {"raw": str(value)}
-        )
-
-        db_rows = [
-            {
-                "run_id": row["run_id"],
-                "source_row_number": int(row["source_row_number"]),
-                "reason_code": row["reason_code"],
-                "reason_detail": row["reason_detail"],
-                "payload": json.dumps(to_json_safe(row["payload"]), ensure_ascii=True),
-            }
-            for _, row in normalized.iterrows()
-        ]
-
+        fresh = rejections
         with self.engine.begin() as conn:
-            conn.execute(
-                text(
-                    f"""
-                    insert into audit."rejections_{table_name}" (
-                        run_id,
-                        source_row_number,
-                        reason_code,
-                        reason_detail,
-                        payload,
-                        created_at
-                    )
-                    values (
-                        :run_id,
-                        :source_row_number,
-                        :reason_code,
-                        :reason_detail,
-                        cast(:payload as jsonb),
-                        now()
-                    )
-                    """
-                ),
-                db_rows,
-            )
+            if dedupe:
+                fresh = rejections.assign(fingerprint=rejection_fingerprints(table_name, rejections))
+                new_fingerprints = (
+                    register_fingerprints(conn, table_name, run_id, fresh)
+                    if record_fingerprints
+                    else unseen_fingerprints(conn, table_name, fresh)
+                )
+                fresh = fresh.loc[fresh["fingerprint"].isin(new_fingerprints)]
+            prepared = prepare_rejections(fresh, run_id, payload_sample) if not fresh.empty else None
+            if prepared is not None:
+                copy_rejections(conn, table_name, prepared.rows)
 
-        timestamp = now_brasilia().strftime("%Y%m%dT%H%M%S%z")
-        csv_path = rejections_dir / f"rejections_{table_name}_{run_id}_{timestamp}.csv"
-        export = normalized.copy()
-        export["payload"] = export["payload"].map(
-            lambda value: json.dumps(to_json_safe(value), ensure_ascii=True)
-        )
-        export.to_csv(csv_path, index=False, encoding="utf-8")
+        if prepared is not None:
+            self.rejection_exports.submit(prepared.rows, table_name, run_id, rejections_dir, retention_days)
+        if details is not None:
+            details["rejection_groups"] = prepared.groups if prepared is not None else []
+            if dedupe:
+                details["rejections_new"] = len(fresh)
+                details["rejections_repeated"] = len(rejections) - len(fresh)
 
-        return len(normalized)
+        return len(rejections)
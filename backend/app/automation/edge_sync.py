@@ -23,6 +23,12 @@ from app.utils.logging import get_logger
 EDGE_TRANSPORT_VALUES = {"edge", "edge_function", "http"}
 DEFAULT_EDGE_TIMEOUT_SECONDS = 120
 DEFAULT_EDGE_CHUNK_SIZE = 1000
+# Modes the edge function does not know are sent with equivalent table semantics.
+EDGE_MODE_ALIASES = {
+    "full_replace_delta": "full_replace",
+    "partition_exchange": "full_replace",
+    "upsert_sweep": "full_replace",
+}
 
 
 @dataclass(frozen=True)
@@ -148,10 +154,18 @@ def _prepare_rows_for_table(
     ]
 
     sync_mode = table_cfg.mode or runtime.app.default_sync_mode
+    sync_mode = EDGE_MODE_ALIASES.get(sync_mode, sync_mode)
     replace_filter_column = required[0] if required else (business_columns[0] if business_columns else None)
     return rows, sync_mode, unique_keys, replace_filter_column
 
 
+def _scope_cds(runtime: RuntimeConfig, table_name: str, rows: list[dict[str, Any]]) -> list[int] | None:
+    table_cfg = runtime.tables.get(table_name)
+    if table_cfg is None or not table_cfg.cd_scope:
+        return None
+    return sorted({int(row["cd"]) for row in rows if row.get("cd") is not None})
+
+
 def _post_edge_json(settings: EdgeSyncSettings, payload: dict[str, Any]) -> dict[str, Any]:
     body_bytes = json.dumps(payload, ensure_ascii=True).encode("utf-8")
     headers = {
@@ -227,6 +241,7 @@ def sync_tables_via_edge(
     for table_name in table_names:
         try:
             rows, sync_mode, unique_keys, replace_filter_column = _prepare_rows_for_table(runtime, table_name)
+            scope_cds = _scope_cds(runtime, table_name, rows)
             chunks = _chunk_rows(rows, settings.chunk_size)
             total_chunks = len(chunks)
 
@@ -238,11 +253,13 @@ def sync_tables_via_edge(
                     "mode": sync_mode,
                     "unique_keys": unique_keys,
                     "replace_filter_column": replace_filter_column,
+                    "scope_cds": scope_cds,
                     "rows": chunk_rows,
                     "dry_run": dry_run,
                     "batch_index": chunk_index,
                     "batch_total": total_chunks,
-                    "reset_table": bool(sync_mode == "full_replace" and chunk_index == 0),
+                    # cd_scope with no CD staged replaces nothing.
+                    "reset_table": bool(sync_mode == "full_replace" and chunk_index == 0 and scope_cds != []),
                 }
                 response = _post_edge_json(settings, payload)
                 if response.get("ok") is False:
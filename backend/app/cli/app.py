@@ -160,6 +160,20 @@ def sync_command(
         _exit_with_error(exc)
 
 
+@cli.command("reconcile")
+def reconcile_command(
+    config: str = typer.Option("config.yml", "--config", help="Path to config.yml"),
+    env_file: str = typer.Option(".env", "--env-file", help="Path to .env"),
+    table: list[str] | None = typer.Option(None, "--table", help="Restrict execution to table(s)"),
+) -> None:
+    try:
+        service = _build_service(config, env_file)
+        result = service.reconcile(table_filter=table)
+        _echo_sync_result(result)
+    except Exception as exc:
+        _exit_with_error(exc)
+
+
 @cli.command("dry-run")
 def dry_run_command(
     config: str = typer.Option("config.yml", "--config", help="Path to config.yml"),
@@ -58,14 +58,6 @@ def load_runtime_config(config_path: str | Path, env_path: str | Path = ".env")
     raw_cfg = _read_yaml(config_file)
     model = ConfigModel.model_validate(raw_cfg)
 
-    for table_name, table_cfg in model.tables.items():
-        if table_cfg.mode is None:
-            table_cfg.mode = model.app.default_sync_mode
-        if table_cfg.mode == "incremental" and table_cfg.incremental is None:
-            raise ValueError(
-                f"Table '{table_name}' is incremental but incremental config is missing"
-            )
-
     db = _read_db_credentials()
 
     return RuntimeConfig(
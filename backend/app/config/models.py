@@ -5,13 +5,28 @@ from typing import Literal
 
 from pydantic import BaseModel, Field, field_validator, model_validator
 
+from app.etl.table_specs import TABLE_SPECS
 
-SyncMode = Literal["full_replace", "upsert", "incremental", "insert_new"]
+
+# Connections a sync holds at once besides one per prepare thread: load/promote, the
+# table_lock session, the audit flush thread and the maintenance thread.
+SYNC_FIXED_CONNECTIONS = 4
+
+SyncMode = Literal[
+    "full_replace",
+    "full_replace_delta",
+    "upsert",
+    "upsert_sweep",
+    "incremental",
+    "insert_new",
+    "partition_exchange",
+]
 
 
 class IncrementalConfig(BaseModel):
     watermark_column: str
     lookback_days: int = 7
+    reconcile_interval_hours: int = 24
 
     @field_validator("lookback_days")
     @classmethod
@@ -20,6 +35,13 @@ class IncrementalConfig(BaseModel):
             raise ValueError("lookback_days must be >= 0")
         return value
 
+    @field_validator("reconcile_interval_hours")
+    @classmethod
+    def validate_reconcile_interval_hours(cls, value: int) -> int:
+        if value < 0:
+            raise ValueError("reconcile_interval_hours must be >= 0")
+        return value
+
 
 class TableConfig(BaseModel):
     file: str
@@ -31,24 +53,124 @@ class TableConfig(BaseModel):
     incremental: IncrementalConfig | None = None
     types: dict[str, str] = Field(default_factory=dict)
     dedupe_order_by: list[str] = Field(default_factory=list)
+    copy_freeze: bool = False
+    row_hash: bool = False
+    promote_batch_rows: int | None = None
+    partition_column: str | None = None
+    cd_scope: bool = False
+    cd_scope_lock: bool = False
+
+    @field_validator("promote_batch_rows")
+    @classmethod
+    def validate_promote_batch_rows(cls, value: int | None) -> int | None:
+        if value is not None and value <= 0:
+            raise ValueError("promote_batch_rows must be > 0")
+        return value
+
+    @model_validator(mode="after")
+    def validate_cd_scope_contract(self) -> "TableConfig":
+        if self.cd_scope_lock and not self.cd_scope:
+            raise ValueError("cd_scope_lock requires cd_scope")
+        if self.cd_scope and (self.copy_freeze or self.promote_batch_rows):
+            raise ValueError("cd_scope cannot be combined with copy_freeze or promote_batch_rows")
+        return self
 
     @model_validator(mode="after")
-    def validate_incremental_contract(self) -> "TableConfig":
-        if self.mode == "incremental" and self.incremental is None:
-            raise ValueError("incremental mode requires incremental configuration")
+    def validate_mode_contract(self) -> "TableConfig":
+        # mode: null is checked by ConfigModel once app.default_sync_mode is known.
+        if self.mode is not None:
+            check_mode_contract(self, self.mode)
         return self
 
 
+def check_mode_contract(table_cfg: TableConfig, mode: SyncMode) -> None:
+    # Every option that depends on the sync mode is checked here, against the effective mode.
+    if mode == "incremental" and table_cfg.incremental is None:
+        raise ValueError("incremental mode requires incremental configuration")
+    if mode == "partition_exchange" and not table_cfg.partition_column:
+        raise ValueError("partition_exchange mode requires partition_column")
+    if mode == "upsert_sweep" and not table_cfg.unique_keys:
+        raise ValueError("upsert_sweep mode requires unique_keys")
+    if table_cfg.copy_freeze and mode != "full_replace":
+        raise ValueError("copy_freeze is only supported with full_replace mode")
+    if table_cfg.row_hash and mode in ("full_replace", "partition_exchange"):
+        raise ValueError(f"row_hash is not supported with {mode} mode: the swap cannot maintain it")
+    if table_cfg.cd_scope and mode in ("incremental", "partition_exchange"):
+        raise ValueError(f"cd_scope is not supported with {mode} mode")
+    if table_cfg.promote_batch_rows and mode not in ("upsert", "upsert_sweep", "insert_new"):
+        raise ValueError("promote_batch_rows is only supported with upsert, upsert_sweep and insert_new modes")
+
+
 class AppConfig(BaseModel):
     data_dir: str = "./DATA"
     stop_on_error: bool = False
     default_sync_mode: SyncMode = "full_replace"
     rejections_dir: str = "./logs/rejections"
     rejections_retention_days: int = 14
+    rejections_payload_sample: int | None = 100
+    rejections_dedupe: bool = True
+    snapshot_reconcile_hours: int = 24
+    audit_mode: Literal["sync", "buffered"] = "sync"
+    audit_journal_dir: str = "./logs/audit_journal"
+    audit_flush_seconds: float = 5.0
+    audit_retention_days: int = 0
+    audit_retention_tables: dict[str, int] = Field(default_factory=dict)
+    prepare_ahead: int = 1
+    prepare_workers: int = 1
     refresh_timeout_seconds: int = 300
     refresh_poll_seconds: int = 2
     log_level: str = "INFO"
 
+    @field_validator("snapshot_reconcile_hours")
+    @classmethod
+    def validate_snapshot_reconcile_hours(cls, value: int) -> int:
+        if value < 0:
+            raise ValueError("snapshot_reconcile_hours must be >= 0")
+        return value
+
+    @field_validator("audit_flush_seconds")
+    @classmethod
+    def validate_audit_flush_seconds(cls, value: float) -> float:
+        if value <= 0:
+            raise ValueError("audit_flush_seconds must be > 0")
+        return value
+
+    @field_validator("prepare_ahead")
+    @classmethod
+    def validate_prepare_ahead(cls, value: int) -> int:
+        if value < 0:
+            raise ValueError("prepare_ahead must be >= 0")
+        return value
+
+    @field_validator("prepare_workers")
+    @classmethod
+    def validate_prepare_workers(cls, value: int) -> int:
+        if value < 1:
+            raise ValueError("prepare_workers must be >= 1")
+        return value
+
+    @field_validator("audit_retention_days")
+    @classmethod
+    def validate_audit_retention_days(cls, value: int) -> int:
+        if value < 0:
+            raise ValueError("audit_retention_days must be >= 0")
+        return value
+
+    @field_validator("audit_retention_tables")
+    @classmethod
+    def validate_audit_retention_tables(cls, value: dict[str, int]) -> dict[str, int]:
+        for table_name, days in value.items():
+            if days < 0:
+                raise ValueError(f"audit_retention_tables.{table_name} must be >= 0")
+        return value
+
+    @field_validator("rejections_payload_sample")
+    @classmethod
+    def validate_rejections_payload_sample(cls, value: int | None) -> int | None:
+        if value is not None and value < 0:
+            raise ValueError("rejections_payload_sample must be >= 0")
+        return value
+
     @field_validator("rejections_retention_days")
     @classmethod
     def validate_rejections_retention_days(cls, value: int) -> int:
@@ -91,6 +213,31 @@ class ConfigModel(BaseModel):
     supabase: SupabaseConfig
     tables: dict[str, TableConfig]
 
+    @model_validator(mode="after")
+    def resolve_table_modes(self) -> "ConfigModel":
+        for table_name, table_cfg in self.tables.items():
+            mode = table_cfg.mode or self.app.default_sync_mode
+            try:
+                check_mode_contract(table_cfg, mode)
+            except ValueError as exc:
+                raise ValueError(f"Table '{table_name}': {exc}") from exc
+            if table_cfg.row_hash and table_name not in TABLE_SPECS:
+                # The row_hash trigger is generated from the table spec at bootstrap.
+                raise ValueError(f"Table '{table_name}': row_hash requires a table spec")
+            table_cfg.mode = mode
+        return self
+
+    @model_validator(mode="after")
+    def validate_pool_capacity(self) -> "ConfigModel":
+        needed = SYNC_FIXED_CONNECTIONS + self.app.prepare_workers
+        available = self.supabase.pool_size + self.supabase.max_overflow
+        if available < needed:
+            raise ValueError(
+                f"supabase pool_size + max_overflow must be >= {needed} "
+                f"({SYNC_FIXED_CONNECTIONS} + prepare_workers), got {available}"
+            )
+        return self
+
 
 class DbCredentials(BaseModel):
     host: str
@@ -117,3 +264,8 @@ class RuntimeConfig(BaseModel):
     def rejections_dir_path(self) -> Path:
         path = Path(self.app.rejections_dir)
         return path if path.is_absolute() else self.config_path.parent / path
+
+    @property
+    def audit_journal_dir_path(self) -> Path:
+        path = Path(self.app.audit_journal_dir)
+        return path if path.is_absolute() else self.config_path.parent / path
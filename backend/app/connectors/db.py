@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from contextlib import contextmanager
 from dataclasses import dataclass
+from typing import Iterator
 
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine, URL
@@ -9,7 +10,11 @@ from sqlalchemy.engine import Engine, URL
 from app.config.models import DbCredentials
 from app.utils.timezone import DB_TIMEZONE
 
-ADVISORY_LOCK_KEY = 90210077
+SYNC_LOCK_NAMESPACE = 90210077
+# Single-key lock older runners take exclusively for the whole sync. The (int, int) keys
+# above live in a different key space, so table_lock also takes this one, shared, until
+# no runner of the old version is left.
+LEGACY_SYNC_LOCK_KEY = 90210077
 
 
 @dataclass(frozen=True)
@@ -83,30 +88,39 @@ def run_healthcheck(engine: Engine) -> HealthcheckResult:
     return HealthcheckResult(ok=ok, details=details)
 
 
-def acquire_sync_lock(engine: Engine) -> bool:
-    with engine.begin() as conn:
-        return bool(
-            conn.execute(
-                text("select pg_try_advisory_lock(:lock_key)"),
-                {"lock_key": ADVISORY_LOCK_KEY},
-            ).scalar_one()
+@contextmanager
+def table_lock(engine: Engine, table_name: str, shared: bool = False) -> Iterator[None]:
+    # Session-level lock keyed by (namespace, hashtext(table)), so runs touching different
+    # tables never wait on each other. Acquire and release go through the same pooled
+    # connection, which stays checked out while the lock is held. cd_scope tables take it
+    # shared: sites loading disjoint CDs still run together (see cd_scope.lock_cds).
+    lock_fn, unlock_fn = (
+        ("pg_try_advisory_lock_shared", "pg_advisory_unlock_shared")
+        if shared
+        else ("pg_try_advisory_lock", "pg_advisory_unlock")
+    )
+    params = {"namespace": SYNC_LOCK_NAMESPACE, "table_name": table_name, "legacy_key": LEGACY_SYNC_LOCK_KEY}
+    with engine.connect() as conn:
+        legacy = bool(
+            conn.execute(text("select pg_try_advisory_lock_shared(:legacy_key)"), params).scalar_one()
         )
-
-
-def release_sync_lock(engine: Engine) -> None:
-    with engine.begin() as conn:
-        conn.execute(
-            text("select pg_advisory_unlock(:lock_key)"),
-            {"lock_key": ADVISORY_LOCK_KEY},
+        acquired = legacy and bool(
+            conn.execute(text(f"select {lock_fn}(:namespace, hashtext(:table_name))"), params).scalar_one()
         )
-
-
-@contextmanager
-def advisory_lock(engine: Engine):
-    lock_ok = acquire_sync_lock(engine)
-    if not lock_ok:
-        raise RuntimeError("Another sync process is already running (advisory lock in use)")
-    try:
-        yield
-    finally:
-        release_sync_lock(engine)
+        if legacy and not acquired:
+            conn.execute(text("select pg_advisory_unlock_shared(:legacy_key)"), params)
+        conn.commit()
+        if not legacy:
+            raise RuntimeError(f"[{table_name}] a sync from an older version is running (advisory lock in use)")
+        if not acquired:
+            raise RuntimeError(f"[{table_name}] another sync is loading this table (advisory lock in use)")
+        try:
+            yield
+        finally:
+            try:
+                conn.execute(text(f"select {unlock_fn}(:namespace, hashtext(:table_name))"), params)
+                conn.execute(text("select pg_advisory_unlock_shared(:legacy_key)"), params)
+                conn.commit()
+            except Exception:
+                # Closing the session is what guarantees the lock does not outlive the run.
+                conn.invalidate()
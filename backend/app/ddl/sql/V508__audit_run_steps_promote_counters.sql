@@ -0,0 +1,5 @@
+alter table audit.run_steps
+    add column if not exists rows_inserted bigint,
+    add column if not exists rows_updated bigint,
+    add column if not exists rows_deleted bigint,
+    add column if not exists rows_unchanged bigint;
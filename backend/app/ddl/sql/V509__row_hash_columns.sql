@@ -0,0 +1,70 @@
+-- row_hash mantido por trigger para as tabelas que comparam linhas por hash no promote.
+-- As listas de colunas seguem a ordem de TableSpec.business_columns (app/etl/table_specs.py).
+create or replace function app.install_row_hash(
+    p_table text,
+    p_columns text[],
+    p_with_index boolean default false
+)
+returns void
+language plpgsql
+set search_path = app, public
+as $$
+declare
+    v_new_row text;
+    v_table_row text;
+    v_function text;
+begin
+    select
+        string_agg(format('new.%I', c.col), ', ' order by c.ord),
+        string_agg(format('%I', c.col), ', ' order by c.ord)
+    into v_new_row, v_table_row
+    from unnest(p_columns) with ordinality as c(col, ord);
+
+    v_function := p_table || '_set_row_hash';
+
+    execute format('alter table app.%I add column if not exists row_hash text', p_table);
+
+    execute format(
+        'create or replace function app.%I() returns trigger language plpgsql as '
+        '$body$ begin new.row_hash := md5(row(%s)::text); return new; end; $body$',
+        v_function,
+        v_new_row
+    );
+
+    execute format('drop trigger if exists %I on app.%I', 'trg_' || v_function, p_table);
+    execute format(
+        'create trigger %I before insert or update on app.%I for each row execute function app.%I()',
+        'trg_' || v_function,
+        p_table,
+        v_function
+    );
+
+    execute format(
+        'update app.%I set row_hash = md5(row(%s)::text) where row_hash is null',
+        p_table,
+        v_table_row
+    );
+
+    if p_with_index then
+        execute format(
+            'create index if not exists %I on app.%I (row_hash)',
+            'idx_app_' || p_table || '_row_hash',
+            p_table
+        );
+    end if;
+end;
+$$;
+
+revoke all on function app.install_row_hash(text, text[], boolean) from public, anon, authenticated;
+
+select app.install_row_hash('db_log_end', array['cd', 'coddv', 'endereco', 'exclusao'], true);
+select app.install_row_hash('db_usuario', array['cd', 'mat', 'nome', 'dt_nasc', 'dt_adm', 'cargo', 'cd_nome']);
+select app.install_row_hash('db_barras', array['coddv', 'descricao', 'barras']);
+select app.install_row_hash('db_custo', array['coddv', 'custo']);
+select app.install_row_hash(
+    'db_conf_blitz',
+    array[
+        'cd', 'filial', 'pedido', 'seq', 'tt_un', 'conferente', 'dt_conf',
+        'tt_vol', 'qtd_avaria', 'qtd_vencido', 'qtd_falta', 'qtd_sobra'
+    ]
+);
@@ -0,0 +1,11 @@
+-- Registro por tabela do estado de sincronizacao; nesta versao guarda o high-water mark
+-- do modo incremental para o promote nao precisar de max() sobre a tabela app inteira.
+create table if not exists audit.table_state (
+    table_name text primary key,
+    watermark_column text,
+    high_water_mark timestamptz,
+    lookback_days integer,
+    watermark_reconciled_at timestamptz,
+    last_run_id uuid references audit.runs(run_id) on delete set null,
+    updated_at timestamptz not null default now()
+);
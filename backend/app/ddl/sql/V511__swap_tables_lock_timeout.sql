@@ -0,0 +1,47 @@
+-- Troca de tabelas sem enfileirar leitores: cada tentativa de ACCESS EXCLUSIVE desiste apos
+-- p_lock_timeout_ms e tenta de novo com espera crescente e jitter (mesmo protocolo do promote em Python).
+drop function if exists app.swap_tables(text, text);
+
+create or replace function app.swap_tables(
+    p_table text,
+    p_swap_table text,
+    p_lock_timeout_ms integer default 50,
+    p_max_attempts integer default 40
+)
+returns text
+language plpgsql
+security definer
+set search_path = app, public
+as $$
+declare
+    old_table text;
+    v_attempt integer := 0;
+begin
+    old_table := format('__old_%s_%s', p_table, to_char(clock_timestamp(), 'YYYYMMDDHH24MISSMS'));
+
+    loop
+        v_attempt := v_attempt + 1;
+        begin
+            perform set_config('lock_timeout', format('%sms', p_lock_timeout_ms), true);
+            execute format('lock table app.%I in access exclusive mode', p_table);
+            exit;
+        exception
+            when lock_not_available then
+                if v_attempt >= p_max_attempts then
+                    raise exception 'swap lock on app.% not acquired after % attempts', p_table, v_attempt
+                        using errcode = 'lock_not_available';
+                end if;
+                perform pg_sleep(0.25 * least(v_attempt, 8) * (0.5 + random()));
+        end;
+    end loop;
+
+    perform set_config('lock_timeout', '0', true);
+
+    execute format('alter table app.%I rename to %I', p_table, old_table);
+    execute format('alter table app.%I rename to %I', p_swap_table, p_table);
+
+    perform app.apply_runtime_security(p_table);
+
+    return old_table;
+end;
+$$;
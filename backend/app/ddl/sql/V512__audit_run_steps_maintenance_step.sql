@@ -0,0 +1,5 @@
+-- Passo "maintenance": ANALYZE/VACUUM decidido por tabela apos o promote.
+alter table audit.run_steps drop constraint if exists run_steps_step_name_check;
+alter table audit.run_steps
+    add constraint run_steps_step_name_check
+    check (step_name in ('refresh', 'load_staging', 'validate', 'promote', 'cleanup', 'maintenance'));
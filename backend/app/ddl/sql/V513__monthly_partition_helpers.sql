@@ -0,0 +1,104 @@
+-- Particionamento mensal (range) das tabelas de movimento usadas pelo modo partition_exchange.
+-- Particoes seguem o nome <tabela>_pYYYYMM; linhas com data nula ficam em <tabela>_pdefault.
+
+create or replace function app.create_month_partition(p_table text, p_month date)
+returns text
+language plpgsql
+security definer
+set search_path = app, public
+as $$
+declare
+    v_month date := date_trunc('month', p_month)::date;
+    v_partition text := format('%s_p%s', p_table, to_char(p_month, 'YYYYMM'));
+begin
+    execute format(
+        'create table if not exists app.%I partition of app.%I for values from (%L) to (%L)',
+        v_partition,
+        p_table,
+        v_month,
+        (v_month + interval '1 month')::date
+    );
+    -- Leitura sempre pela tabela pai, que carrega RLS e grants.
+    execute format('alter table app.%I enable row level security', v_partition);
+    execute format('revoke all on table app.%I from anon, authenticated', v_partition);
+    return v_partition;
+end;
+$$;
+
+create or replace function app.convert_to_monthly_partitions(p_table text, p_column text)
+returns integer
+language plpgsql
+security definer
+set search_path = app, public
+as $$
+declare
+    v_heap text := left(format('__heap_%s', p_table), 63);
+    v_default text := format('%s_pdefault', p_table);
+    v_index_defs text[];
+    v_index_def text;
+    v_month date;
+    v_partitions integer := 0;
+begin
+    if exists (
+        select 1
+        from pg_class c
+        join pg_namespace n on n.oid = c.relnamespace
+        where n.nspname = 'app'
+          and c.relname = p_table
+          and c.relkind = 'p'
+    ) then
+        return 0;
+    end if;
+
+    -- Indices unicos sem a coluna de particao nao podem existir na tabela pai e ficam de fora.
+    select array_agg(pg_get_indexdef(x.indexrelid))
+    into v_index_defs
+    from pg_index x
+    where x.indrelid = format('app.%I', p_table)::regclass
+      and (
+          not x.indisunique
+          or exists (
+              select 1
+              from pg_attribute a
+              where a.attrelid = x.indrelid
+                and a.attname = p_column
+                and a.attnum = any(x.indkey)
+          )
+      );
+
+    execute format('alter table app.%I rename to %I', p_table, v_heap);
+    execute format(
+        'create table app.%I (like app.%I including defaults including constraints including comments) partition by range (%I)',
+        p_table,
+        v_heap,
+        p_column
+    );
+    execute format('create table app.%I partition of app.%I default', v_default, p_table);
+    execute format('alter table app.%I enable row level security', v_default);
+    execute format('revoke all on table app.%I from anon, authenticated', v_default);
+
+    for v_month in execute format(
+        'select distinct date_trunc(''month'', %I)::date from app.%I where %I is not null',
+        p_column,
+        v_heap,
+        p_column
+    ) loop
+        perform app.create_month_partition(p_table, v_month);
+        v_partitions := v_partitions + 1;
+    end loop;
+
+    execute format('insert into app.%I select * from app.%I', p_table, v_heap);
+    execute format('drop table app.%I', v_heap);
+
+    foreach v_index_def in array coalesce(v_index_defs, array[]::text[]) loop
+        execute regexp_replace(
+            v_index_def,
+            ' ON \S+ USING ',
+            format(' ON app.%I USING ', p_table)
+        );
+    end loop;
+
+    perform app.apply_runtime_security(p_table);
+    return v_partitions;
+end;
+$$;
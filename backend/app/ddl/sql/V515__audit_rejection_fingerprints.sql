@@ -0,0 +1,34 @@
+-- Rejeicoes repetidas entre execucoes (mesma linha quebrada na planilha a cada 30 min) viram
+-- um contador: so a primeira ocorrencia de cada impressao digital grava o detalhe em
+-- audit.rejections_<tabela>; as repeticoes so atualizam last_seen_at/occurrences aqui.
+create table if not exists audit.rejection_fingerprints (
+    table_name text not null,
+    fingerprint text not null,
+    reason_code text not null,
+    first_seen_at timestamptz not null default now(),
+    first_run_id uuid references audit.runs(run_id) on delete set null,
+    last_seen_at timestamptz not null default now(),
+    last_run_id uuid references audit.runs(run_id) on delete set null,
+    occurrences bigint not null default 1,
+    primary key (table_name, fingerprint)
+);
+
+create index if not exists idx_rejection_fingerprints_last_seen
+    on audit.rejection_fingerprints (table_name, last_seen_at desc);
+
+do $$
+declare
+    v_table text;
+begin
+    for v_table in
+        select c.relname
+        from pg_class c
+        join pg_namespace n on n.oid = c.relnamespace
+        where n.nspname = 'audit'
+          and c.relkind in ('r', 'p')
+          and c.relname like 'rejections\_%'
+    loop
+        execute format('alter table audit.%I add column if not exists fingerprint text', v_table);
+    end loop;
+end;
+$$;
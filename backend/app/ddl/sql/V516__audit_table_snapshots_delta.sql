@@ -0,0 +1,14 @@
+-- Snapshots sem varrer a tabela: row_count passa a ser o snapshot anterior + inserted - deleted do promote,
+-- com reconciliacao exata periodica. "method" indica a origem (exact/delta); "reconciled_at" carrega a data
+-- da ultima contagem exata. O checksum exato agora e uma impressao digital do conteudo (hash das colunas
+-- de negocio, independente de ordem); snapshots delta so o herdam quando o promote nao alterou nada.
+alter table audit.table_snapshots
+    add column if not exists method text not null default 'exact',
+    add column if not exists reconciled_at timestamptz;
+
+alter table audit.table_snapshots drop constraint if exists table_snapshots_method_check;
+alter table audit.table_snapshots
+    add constraint table_snapshots_method_check check (method in ('exact', 'delta'));
+
+create index if not exists idx_table_snapshots_table_captured
+    on audit.table_snapshots (table_name, captured_at desc);
@@ -0,0 +1,28 @@
+-- audit.table_state vira o registro do ultimo estado por tabela: alem do high-water mark (V510) guarda a
+-- impressao digital da planilha do ultimo promote bem-sucedido e o row_count do snapshot, gravados na
+-- mesma transacao do snapshot. O startup le esta tabela (uma linha por tabela) em vez de varrer
+-- audit.runs_metadata + audit.runs, que crescem a cada execucao.
+alter table audit.table_state
+    add column if not exists source_fingerprint jsonb,
+    add column if not exists source_fingerprint_at timestamptz,
+    add column if not exists row_count bigint,
+    add column if not exists row_count_at timestamptz;
+
+-- Carga inicial a partir do historico (uma unica vez).
+insert into audit.table_state (table_name, source_fingerprint, source_fingerprint_at, last_run_id, updated_at)
+select distinct on (m.table_name)
+    m.table_name,
+    m.meta_value,
+    m.created_at,
+    m.run_id,
+    now()
+from audit.runs_metadata m
+join audit.runs r
+  on r.run_id = m.run_id
+where m.meta_key = 'source_fingerprint'
+  and r.triggered_by = 'sync'
+  and r.status in ('success', 'partial')
+order by m.table_name, r.started_at desc
+on conflict (table_name) do update set
+    source_fingerprint = coalesce(audit.table_state.source_fingerprint, excluded.source_fingerprint),
+    source_fingerprint_at = coalesce(audit.table_state.source_fingerprint_at, excluded.source_fingerprint_at);
@@ -0,0 +1,221 @@
+-- Retencao da auditoria por particao: run_steps, runs_metadata, table_snapshots e rejections_* passam
+-- a ser particionadas por faixa de run_id. O run_id agora e um UUIDv7 (os 48 bits iniciais sao o
+-- instante em ms, UTC), entao cada particao mensal <tabela>_pYYYYMM guarda exatamente as execucoes
+-- iniciadas naquele mes, e as chaves/"on conflict" existentes (que ja incluem run_id) continuam validas.
+--
+-- Decisoes deliberadas:
+-- * Os run_id antigos (UUIDv4) nao sao reescritos: app.*.source_run_id, table_state e
+--   rejection_fingerprints continuam apontando para eles. As linhas antigas ficam em <tabela>_pdefault.
+-- * audit.runs nao e particionada (uma linha por execucao) e mantem PK e FKs. O passo maintenance a
+--   apaga por started_at depois que as particoes mensais das filhas ja sairam; o "on delete cascade"
+--   das filhas limpa as linhas antigas da particao default.
+-- * As FKs das filhas (run_steps, runs_metadata, table_snapshots, rejections_*) sao recriadas nas
+--   tabelas particionadas. table_state e rejection_fingerprints mantem as FKs "on delete set null".
+-- * As FKs app.*.source_run_id saem: linhas inalteradas guardam o run_id da execucao que as gravou por
+--   tempo indeterminado, e o "set null" reescreveria essas linhas varrendo tabelas sem indice em
+--   source_run_id a cada execucao apagada. source_run_id vira referencia solta.
+-- * As FKs de staging.* saem na V519, junto com o heap, quando staging passa a ter particao por execucao.
+-- * A PK de run_steps passa a (step_id, run_id): a chave de particao precisa estar na PK. step_id
+--   continua unico pela sequencia.
+
+create or replace function audit.run_id_floor(p_month date)
+returns uuid
+language sql
+immutable
+as $$
+    select (
+        lpad(to_hex((extract(epoch from date_trunc('month', p_month::timestamp)) * 1000)::bigint), 12, '0')
+        || repeat('0', 20)
+    )::uuid;
+$$;
+
+-- Um UUIDv4 antigo na particao default pode cair na faixa de um mes novo; essas linhas saem da default
+-- antes do "partition of" (que falharia) e voltam pela tabela pai, ja para a particao nova.
+create or replace function audit.create_run_partition(p_table text, p_month date)
+returns text
+language plpgsql
+set search_path = audit, public
+as $$
+declare
+    v_month date := date_trunc('month', p_month::timestamp)::date;
+    v_partition text := format('%s_p%s', p_table, to_char(v_month, 'YYYYMM'));
+    v_default text := format('%s_pdefault', p_table);
+    v_from uuid := audit.run_id_floor(v_month);
+    v_to uuid := audit.run_id_floor((v_month + interval '1 month')::date);
+    v_collides boolean := false;
+begin
+    if to_regclass(format('audit.%I', v_partition)) is not null then
+        return v_partition;
+    end if;
+
+    if to_regclass(format('audit.%I', v_default)) is not null then
+        execute format(
+            'select exists (select 1 from audit.%I where run_id >= %L and run_id < %L)',
+            v_default,
+            v_from,
+            v_to
+        )
+        into v_collides;
+    end if;
+
+    if v_collides then
+        execute format('create temp table __moved_run_rows (like audit.%I)', v_default);
+        execute format(
+            'with moved as (delete from audit.%I where run_id >= %L and run_id < %L returning *) '
+            'insert into __moved_run_rows select * from moved',
+            v_default,
+            v_from,
+            v_to
+        );
+    end if;
+
+    execute format(
+        'create table audit.%I partition of audit.%I for values from (%L) to (%L)',
+        v_partition,
+        p_table,
+        v_from,
+        v_to
+    );
+
+    if v_collides then
+        execute format('insert into audit.%I select * from __moved_run_rows', p_table);
+        drop table __moved_run_rows;
+    end if;
+    return v_partition;
+end;
+$$;
+
+-- Converte uma tabela da auditoria (heap comum) em particionada por run_id, copiando as linhas com o
+-- run_id original. Indices, FKs e a sequencia de bigserial passam para a tabela nova.
+create or replace function audit.convert_to_run_partitions(p_table text, p_primary_key text[])
+returns integer
+language plpgsql
+set search_path = audit, public
+as $$
+declare
+    v_heap text := left(format('__heap_%s', p_table), 63);
+    v_index_defs text[];
+    v_foreign_keys text[];
+    v_definition text;
+    v_serial record;
+    v_month date;
+    v_partitions integer := 0;
+begin
+    if exists (
+        select 1
+        from pg_class c
+        join pg_namespace n on n.oid = c.relnamespace
+        where n.nspname = 'audit'
+          and c.relname = p_table
+          and c.relkind = 'p'
+    ) then
+        return 0;
+    end if;
+
+    -- Unicos sem run_id nao podem existir na tabela pai; a PK e recriada com run_id.
+    select array_agg(pg_get_indexdef(x.indexrelid))
+    into v_index_defs
+    from pg_index x
+    where x.indrelid = format('audit.%I', p_table)::regclass
+      and not x.indisunique;
+
+    select array_agg(format('alter table audit.%I add constraint %I %s', p_table, con.conname, pg_get_constraintdef(con.oid)))
+    into v_foreign_keys
+    from pg_constraint con
+    where con.conrelid = format('audit.%I', p_table)::regclass
+      and con.contype = 'f';
+
+    execute format('alter table audit.%I rename to %I', p_table, v_heap);
+    execute format(
+        'create table audit.%I (like audit.%I including defaults including constraints including comments) partition by range (run_id)',
+        p_table,
+        v_heap
+    );
+    execute format(
+        'alter table audit.%I add primary key (%s)',
+        p_table,
+        (select string_agg(format('%I', c), ', ') from unnest(p_primary_key) as c)
+    );
+    execute format('create table audit.%I partition of audit.%I default', format('%s_pdefault', p_table), p_table);
+
+    -- Mes corrente e seguinte existem antes da copia e das primeiras execucoes com UUIDv7.
+    foreach v_month in array array[
+        date_trunc('month', now() at time zone 'UTC')::date,
+        (date_trunc('month', now() at time zone 'UTC') + interval '1 month')::date
+    ] loop
+        perform audit.create_run_partition(p_table, v_month);
+        v_partitions := v_partitions + 1;
+    end loop;
+
+    -- Sequencias de bigserial passam para a tabela nova antes do drop do heap.
+    for v_serial in
+        select a.attname, pg_get_serial_sequence(format('audit.%I', v_heap), a.attname) as sequence_name
+        from pg_attribute a
+        where a.attrelid = format('audit.%I', v_heap)::regclass
+          and a.attnum > 0
+          and not a.attisdropped
+    loop
+        if v_serial.sequence_name is not null then
+            execute format('alter sequence %s owned by audit.%I.%I', v_serial.sequence_name, p_table, v_serial.attname);
+        end if;
+    end loop;
+
+    execute format('insert into audit.%I select * from audit.%I', p_table, v_heap);
+    execute format('drop table audit.%I', v_heap);
+
+    foreach v_definition in array coalesce(v_index_defs, array[]::text[]) loop
+        execute regexp_replace(v_definition, ' ON \S+ USING ', format(' ON audit.%I USING ', p_table));
+    end loop;
+    foreach v_definition in array coalesce(v_foreign_keys, array[]::text[]) loop
+        execute v_definition;
+    end loop;
+
+    -- O "on delete cascade" de audit.runs procura as linhas por run_id.
+    if not exists (
+        select 1
+        from pg_index x
+        join pg_attribute a on a.attrelid = x.indrelid and a.attnum = x.indkey[0]
+        where x.indrelid = format('audit.%I', p_table)::regclass
+          and a.attname = 'run_id'
+    ) then
+        execute format('create index if not exists %I on audit.%I (run_id)', left(format('idx_%s_run_id', p_table), 63), p_table);
+    end if;
+
+    return v_partitions;
+end;
+$$;
+
+do $$
+declare
+    v_constraint record;
+    v_table text;
+begin
+    for v_constraint in
+        select con.conname, con.conrelid::regclass as relation
+        from pg_constraint con
+        join pg_class c on c.oid = con.conrelid
+        join pg_namespace n on n.oid = c.relnamespace
+        where con.contype = 'f'
+          and con.confrelid = 'audit.runs'::regclass
+          and n.nspname = 'app'
+    loop
+        execute format('alter table %s drop constraint %I', v_constraint.relation, v_constraint.conname);
+    end loop;
+
+    perform audit.convert_to_run_partitions('run_steps', array['step_id', 'run_id']);
+    perform audit.convert_to_run_partitions('runs_metadata', array['run_id', 'table_name', 'meta_key']);
+    perform audit.convert_to_run_partitions('table_snapshots', array['run_id', 'table_name']);
+    for v_table in
+        select c.relname
+        from pg_class c
+        join pg_namespace n on n.oid = c.relnamespace
+        where n.nspname = 'audit'
+          and c.relkind = 'r'
+          and c.relname like 'rejections\_%'
+    loop
+        perform audit.convert_to_run_partitions(v_table, array['rejection_id', 'run_id']);
+    end loop;
+end;
+$$;
+
+create index if not exists idx_audit_runs_started_at on audit.runs (started_at desc);
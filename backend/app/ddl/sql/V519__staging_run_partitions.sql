@@ -0,0 +1,38 @@
+-- Staging por execucao: cada staging.<tabela> passa a ser particionada por lista de run_id. Cada
+-- execucao grava numa particao unlogged propria (<tabela>__r<sufixo do run_id>), anexada antes do COPY
+-- e removida com detach concurrently + drop no cleanup. Consultas existentes (todas filtram
+-- s.run_id) continuam iguais e podam para a particao da execucao; nao ha mais truncate da tabela
+-- inteira, entao execucoes simultaneas da mesma tabela (cd_scope) nao apagam as linhas umas das outras.
+-- Sem particao default: detach concurrently exige isso. Dados de staging sao transitorios e descartados.
+
+do $$
+declare
+    v_table text;
+    v_heap text;
+begin
+    for v_table in
+        select c.relname
+        from pg_class c
+        join pg_namespace n on n.oid = c.relnamespace
+        where n.nspname = 'staging'
+          and c.relkind = 'r'
+          and not c.relispartition
+          and exists (
+              select 1
+              from pg_attribute a
+              where a.attrelid = c.oid
+                and a.attname = 'run_id'
+                and not a.attisdropped
+          )
+    loop
+        v_heap := left(format('__heap_%s', v_table), 63);
+        execute format('alter table staging.%I rename to %I', v_table, v_heap);
+        execute format(
+            'create table staging.%I (like staging.%I including defaults including constraints) partition by list (run_id)',
+            v_table,
+            v_heap
+        );
+        execute format('drop table staging.%I', v_heap);
+    end loop;
+end;
+$$;
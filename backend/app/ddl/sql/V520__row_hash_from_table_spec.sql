@@ -0,0 +1,65 @@
+-- row_hash passa a ser instalado pelo bootstrap a partir de TableSpec.business_columns para toda
+-- tabela com row_hash: true no config.yml (as listas fixas da V509 ficam so como historico).
+-- Se a lista de colunas mudar, o trigger e recriado e os hashes divergentes sao recalculados.
+create or replace function app.install_row_hash(
+    p_table text,
+    p_columns text[],
+    p_with_index boolean default false
+)
+returns void
+language plpgsql
+set search_path = app, public
+as $$
+declare
+    v_new_row text;
+    v_table_row text;
+    v_function text;
+begin
+    if p_table !~ '^[a-z_][a-z0-9_]*$' then
+        raise exception 'invalid table name: %', p_table;
+    end if;
+
+    select
+        string_agg(format('new.%I', c.col), ', ' order by c.ord),
+        string_agg(format('%I', c.col), ', ' order by c.ord)
+    into v_new_row, v_table_row
+    from unnest(p_columns) with ordinality as c(col, ord);
+
+    v_function := p_table || '_set_row_hash';
+
+    execute format('alter table app.%I add column if not exists row_hash text', p_table);
+
+    execute format(
+        'create or replace function app.%I() returns trigger language plpgsql as '
+        '$body$ begin new.row_hash := md5(row(%s)::text); return new; end; $body$',
+        v_function,
+        v_new_row
+    );
+
+    execute format('drop trigger if exists %I on app.%I', 'trg_' || v_function, p_table);
+    execute format(
+        'create trigger %I before insert or update on app.%I for each row execute function app.%I()',
+        'trg_' || v_function,
+        p_table,
+        v_function
+    );
+
+    -- So reescreve as linhas cujo hash nao bate com a lista atual (nulas ou de uma lista anterior).
+    execute format(
+        'update app.%I set row_hash = md5(row(%s)::text) where row_hash is distinct from md5(row(%s)::text)',
+        p_table,
+        v_table_row,
+        v_table_row
+    );
+
+    if p_with_index then
+        execute format(
+            'create index if not exists %I on app.%I (row_hash)',
+            'idx_app_' || p_table || '_row_hash',
+            p_table
+        );
+    end if;
+end;
+$$;
+
+revoke all on function app.install_row_hash(text, text[], boolean) from public, anon, authenticated;
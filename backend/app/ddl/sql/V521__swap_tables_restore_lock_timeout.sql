@@ -0,0 +1,51 @@
+-- app.swap_tables (V511): depois de pegar o lock, o lock_timeout voltava para '0' em vez do valor da
+-- sessao. Agora o valor anterior e guardado com current_setting e restaurado. A assinatura nao muda,
+-- entao "create or replace" mantem os privilegios; mesmo assim eles ficam declarados aqui, porque o
+-- drop da V511 recriou a funcao com os privilegios padrao (execute para public).
+create or replace function app.swap_tables(
+    p_table text,
+    p_swap_table text,
+    p_lock_timeout_ms integer default 50,
+    p_max_attempts integer default 40
+)
+returns text
+language plpgsql
+security definer
+set search_path = app, public
+as $$
+declare
+    old_table text;
+    v_attempt integer := 0;
+    v_previous_lock_timeout text := current_setting('lock_timeout');
+begin
+    old_table := format('__old_%s_%s', p_table, to_char(clock_timestamp(), 'YYYYMMDDHH24MISSMS'));
+
+    loop
+        v_attempt := v_attempt + 1;
+        begin
+            perform set_config('lock_timeout', format('%sms', p_lock_timeout_ms), true);
+            execute format('lock table app.%I in access exclusive mode', p_table);
+            exit;
+        exception
+            when lock_not_available then
+                if v_attempt >= p_max_attempts then
+                    raise exception 'swap lock on app.% not acquired after % attempts', p_table, v_attempt
+                        using errcode = 'lock_not_available';
+                end if;
+                perform pg_sleep(0.25 * least(v_attempt, 8) * (0.5 + random()));
+        end;
+    end loop;
+
+    perform set_config('lock_timeout', v_previous_lock_timeout, true);
+
+    execute format('alter table app.%I rename to %I', p_table, old_table);
+    execute format('alter table app.%I rename to %I', p_swap_table, p_table);
+
+    perform app.apply_runtime_security(p_table);
+
+    return old_table;
+end;
+$$;
+
+-- Funcao security definer que renomeia tabelas: so o dono (papel do sync) executa.
+revoke all on function app.swap_tables(text, text, integer, integer) from public, anon, authenticated;
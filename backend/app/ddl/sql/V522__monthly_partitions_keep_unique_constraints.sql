@@ -0,0 +1,102 @@
+-- app.convert_to_monthly_partitions (V513) descartava em silencio os indices unicos sem a coluna de
+-- particao (ex.: uq_app_db_entrada_notas (cd, seq_entrada, nf, coddv)) e recriava PK/unique como
+-- indices simples. Agora a conversao recusa quando alguma unicidade seria perdida e recria as
+-- constraints como constraints. Ela tambem deixa de rodar dentro do promote: copia a tabela inteira,
+-- entao e executada uma vez, explicitamente, numa janela de manutencao:
+--     select app.convert_to_monthly_partitions('<tabela>', '<coluna>');
+create or replace function app.convert_to_monthly_partitions(p_table text, p_column text)
+returns integer
+language plpgsql
+security definer
+set search_path = app, public
+as $$
+declare
+    v_heap text := left(format('__heap_%s', p_table), 63);
+    v_default text := format('%s_pdefault', p_table);
+    v_lost text;
+    v_index_defs text[];
+    v_constraint_defs text[];
+    v_definition text;
+    v_month date;
+    v_partitions integer := 0;
+begin
+    if exists (
+        select 1
+        from pg_class c
+        join pg_namespace n on n.oid = c.relnamespace
+        where n.nspname = 'app'
+          and c.relname = p_table
+          and c.relkind = 'p'
+    ) then
+        return 0;
+    end if;
+
+    -- Unicidade sem a coluna de particao nao pode ser garantida na tabela pai.
+    select string_agg(i.relname, ', ' order by i.relname)
+    into v_lost
+    from pg_index x
+    join pg_class i on i.oid = x.indexrelid
+    where x.indrelid = format('app.%I', p_table)::regclass
+      and x.indisunique
+      and not exists (
+          select 1
+          from pg_attribute a
+          where a.attrelid = x.indrelid
+            and a.attname = p_column
+            and a.attnum = any(x.indkey)
+      );
+    if v_lost is not null then
+        raise exception 'app.% cannot be partitioned by %: unique index(es) % do not include it', p_table, p_column, v_lost;
+    end if;
+
+    select
+        array_agg(pg_get_indexdef(x.indexrelid)) filter (where con.oid is null),
+        array_agg(format('alter table app.%I add constraint %I %s', p_table, con.conname, pg_get_constraintdef(con.oid)))
+            filter (where con.oid is not null)
+    into v_index_defs, v_constraint_defs
+    from pg_index x
+    left join pg_constraint con
+      on con.conindid = x.indexrelid
+     and con.conrelid = x.indrelid
+     and con.contype in ('p', 'u')
+    where x.indrelid = format('app.%I', p_table)::regclass;
+
+    perform set_config('statement_timeout', '0', true);
+
+    execute format('alter table app.%I rename to %I', p_table, v_heap);
+    execute format(
+        'create table app.%I (like app.%I including defaults including constraints including comments) partition by range (%I)',
+        p_table,
+        v_heap,
+        p_column
+    );
+    execute format('create table app.%I partition of app.%I default', v_default, p_table);
+    execute format('alter table app.%I enable row level security', v_default);
+    execute format('revoke all on table app.%I from anon, authenticated', v_default);
+
+    for v_month in execute format(
+        'select distinct date_trunc(''month'', %I)::date from app.%I where %I is not null',
+        p_column,
+        v_heap,
+        p_column
+    ) loop
+        perform app.create_month_partition(p_table, v_month);
+        v_partitions := v_partitions + 1;
+    end loop;
+
+    execute format('insert into app.%I select * from app.%I', p_table, v_heap);
+    execute format('drop table app.%I', v_heap);
+
+    foreach v_definition in array coalesce(v_index_defs, array[]::text[]) loop
+        execute regexp_replace(v_definition, ' ON \S+ USING ', format(' ON app.%I USING ', p_table));
+    end loop;
+    foreach v_definition in array coalesce(v_constraint_defs, array[]::text[]) loop
+        execute v_definition;
+    end loop;
+
+    perform app.apply_runtime_security(p_table);
+    return v_partitions;
+end;
+$$;
+
+revoke all on function app.convert_to_monthly_partitions(text, text) from public, anon, authenticated;
@@ -0,0 +1,233 @@
+-- app.promote_full_replace_v1 (V514) com duas correcoes, mesma assinatura ("create or replace" mantem
+-- os privilegios):
+-- * o hash do carry-over converte as colunas de staging para os tipos da tabela app antes de comparar
+--   com as linhas atuais, como o row_hash do Python (app/etl/promote/row_hash.py);
+-- * as tentativas de lock respeitam o statement_timeout da sessao em vez de so contar 40 tentativas.
+
+create or replace function app.promote_full_replace_v1(
+    p_table text,
+    p_run_id uuid,
+    p_columns text[],
+    p_lock_timeout_ms integer default 50,
+    p_max_attempts integer default 40
+)
+returns jsonb
+language plpgsql
+set search_path = app, public
+as $$
+declare
+    v_token text := left(replace(p_run_id::text, '-', ''), 8);
+    v_swap text := app.bounded_name('__swap', p_table, v_token);
+    v_old text := app.bounded_name('__old', p_table, v_token);
+    v_cols text;
+    v_incoming_cols text;
+    v_hash_s text;
+    v_hash_a text;
+    v_deferred boolean;
+    v_index record;
+    v_position integer := 0;
+    v_temp text;
+    v_started timestamptz;
+    v_index_builds jsonb := '[]'::jsonb;
+    v_index_build_ms numeric := 0;
+    v_temp_names text[] := array[]::text[];
+    v_final_names text[] := array[]::text[];
+    v_is_constraint boolean[] := array[]::boolean[];
+    v_inserted bigint;
+    v_unchanged bigint;
+    v_deleted bigint;
+    v_attempt integer := 0;
+    v_lock_started timestamptz;
+    v_locked_at timestamptz;
+    v_lock_wait_ms numeric;
+    v_previous_lock_timeout text := current_setting('lock_timeout');
+    v_statement_timeout interval := current_setting('statement_timeout')::interval;
+    v_lock_deadline timestamptz;
+    v_sleep double precision;
+    i integer;
+begin
+    if p_table !~ '^[a-z_][a-z0-9_]*$' then
+        raise exception 'invalid table name: %', p_table;
+    end if;
+
+    -- As colunas de staging entram no hash convertidas para o tipo da coluna app, senao o texto da
+    -- linha difere (ex.: numeric vs integer, timestamp vs timestamptz) e nada e carregado adiante.
+    select
+        string_agg(format('%I', t.c), ', ' order by t.ord),
+        string_agg(format('i.%I', t.c), ', ' order by t.ord),
+        format(
+            'md5(row(%s)::text)',
+            string_agg(
+                case
+                    when a.attname is null then format('s.%I', t.c)
+                    else format('cast(s.%I as %s)', t.c, format_type(a.atttypid, a.atttypmod))
+                end,
+                ', ' order by t.ord
+            )
+        ),
+        format('md5(row(%s)::text)', string_agg(format('a.%I', t.c), ', ' order by t.ord))
+    into v_cols, v_incoming_cols, v_hash_s, v_hash_a
+    from unnest(p_columns) with ordinality as t(c, ord)
+    left join pg_attribute a
+      on a.attrelid = format('app.%I', p_table)::regclass
+     and a.attname = t.c
+     and a.attnum > 0
+     and not a.attisdropped;
+
+    -- Exclusion constraints nao aceitam "using index"; nesses casos mantem "including all".
+    select not exists (
+        select 1
+        from pg_constraint con
+        join pg_index x on x.indexrelid = con.conindid
+        where x.indrelid = format('app.%I', p_table)::regclass
+          and con.contype not in ('p', 'u')
+    ) into v_deferred;
+
+    execute format('drop table if exists app.%I', v_swap);
+    if v_deferred then
+        execute format('create table app.%I (like app.%I including all excluding indexes)', v_swap, p_table);
+    else
+        execute format('create table app.%I (like app.%I including all)', v_swap, p_table);
+    end if;
+
+    execute format(
+        $sql$
+        with incoming as (
+            select %1$s, %2$s as row_hash, row_number() over (partition by %2$s) as occurrence
+            from staging.%3$I s
+            where s.run_id = $1
+        ),
+        current_rows as (
+            select
+                %4$s as row_hash,
+                row_number() over (partition by %4$s order by a.updated_at) as occurrence,
+                a.source_run_id,
+                a.updated_at
+            from app.%5$I a
+        ),
+        inserted as (
+            insert into app.%6$I (%1$s, source_run_id, updated_at)
+            select
+                %7$s,
+                case when c.row_hash is null then $1 else c.source_run_id end,
+                case when c.row_hash is null then now() else c.updated_at end
+            from incoming i
+            left join current_rows c
+              on c.row_hash = i.row_hash
+             and c.occurrence = i.occurrence
+            returning source_run_id is distinct from $1 as carried_over
+        )
+        select
+            count(*) filter (where not carried_over),
+            count(*) filter (where carried_over),
+            (select count(*) from current_rows) - count(*) filter (where carried_over)
+        from inserted
+        $sql$,
+        v_cols, v_hash_s, p_table, v_hash_a, p_table, v_swap, v_incoming_cols
+    )
+    into v_inserted, v_unchanged, v_deleted
+    using p_run_id;
+
+    if v_deferred then
+        perform set_config('maintenance_work_mem', '512MB', true);
+        perform set_config('max_parallel_maintenance_workers', '4', true);
+
+        for v_index in
+            select i.relname as index_name, pg_get_indexdef(x.indexrelid) as definition, con.conname, con.contype
+            from pg_index x
+            join pg_class i on i.oid = x.indexrelid
+            left join pg_constraint con on con.conindid = x.indexrelid and con.conrelid = x.indrelid
+            where x.indrelid = format('app.%I', p_table)::regclass
+            order by i.relname
+        loop
+            v_temp := app.bounded_name(format('__ix%s', v_position), p_table, v_token);
+            v_started := clock_timestamp();
+            execute regexp_replace(
+                v_index.definition,
+                '^(CREATE (UNIQUE )?INDEX )\S+ ON (ONLY )?\S+ USING ',
+                format('\1%I ON app.%I USING ', v_temp, v_swap)
+            );
+            if v_index.contype is not null then
+                execute format(
+                    'alter table app.%I add constraint %I %s using index %I',
+                    v_swap,
+                    v_temp,
+                    case when v_index.contype = 'p' then 'primary key' else 'unique' end,
+                    v_temp
+                );
+            end if;
+
+            v_index_build_ms := v_index_build_ms + extract(epoch from clock_timestamp() - v_started) * 1000;
+            v_index_builds := v_index_builds || jsonb_build_object(
+                'index', v_index.index_name,
+                'elapsed_ms', round((extract(epoch from clock_timestamp() - v_started) * 1000)::numeric, 1)
+            );
+            v_temp_names := v_temp_names || v_temp;
+            v_final_names := v_final_names || coalesce(v_index.conname, v_index.index_name);
+            v_is_constraint := v_is_constraint || (v_index.contype is not null);
+            v_position := v_position + 1;
+        end loop;
+    end if;
+
+    -- Enquanto espera o ACCESS EXCLUSIVE, novos leitores enfileiram atras; cada tentativa desiste rapido.
+    -- A chamada inteira e um unico statement: as tentativas param antes do statement_timeout, deixando
+    -- 10% dele para a troca de nomes e a limpeza, e o erro sai como lock_not_available, nao como timeout.
+    v_lock_started := clock_timestamp();
+    if v_statement_timeout > interval '0' then
+        v_lock_deadline := statement_timestamp() + v_statement_timeout * 0.9;
+    end if;
+    loop
+        v_attempt := v_attempt + 1;
+        begin
+            perform set_config('lock_timeout', format('%sms', p_lock_timeout_ms), true);
+            execute format('lock table app.%I in access exclusive mode', p_table);
+            exit;
+        exception
+            when lock_not_available then
+                v_sleep := 0.25 * least(v_attempt, 8) * (0.5 + random());
+                if v_attempt >= p_max_attempts
+                   or clock_timestamp() + make_interval(secs => v_sleep + p_lock_timeout_ms / 1000.0)
+                      > coalesce(v_lock_deadline, 'infinity'::timestamptz) then
+                    raise exception '[%] swap lock not acquired after % attempts (% ms)',
+                        p_table,
+                        v_attempt,
+                        round((extract(epoch from clock_timestamp() - v_lock_started) * 1000)::numeric)
+                        using errcode = 'lock_not_available';
+                end if;
+                perform pg_sleep(v_sleep);
+        end;
+    end loop;
+    perform set_config('lock_timeout', v_previous_lock_timeout, true);
+    v_locked_at := clock_timestamp();
+    v_lock_wait_ms := extract(epoch from v_locked_at - v_lock_started) * 1000;
+
+    execute format('alter table app.%I rename to %I', p_table, v_old);
+    execute format('alter table app.%I rename to %I', v_swap, p_table);
+    perform app.apply_runtime_security(p_table);
+    execute format('drop table app.%I', v_old);
+
+    for i in 1 .. coalesce(array_length(v_temp_names, 1), 0) loop
+        if v_is_constraint[i] then
+            execute format('alter table app.%I rename constraint %I to %I', p_table, v_temp_names[i], v_final_names[i]);
+        else
+            execute format('alter index app.%I rename to %I', v_temp_names[i], v_final_names[i]);
+        end if;
+    end loop;
+
+    return jsonb_build_object(
+        'inserted', v_inserted,
+        'deleted', v_deleted,
+        'unchanged', v_unchanged,
+        'strategy', 'swap',
+        'server_side', true,
+        'deferred_indexes', v_deferred,
+        'index_build_ms', round(v_index_build_ms, 1),
+        'index_builds', v_index_builds,
+        'lock_attempts', v_attempt,
+        'lock_wait_ms', round(v_lock_wait_ms, 1),
+        'cutover_ms', round((extract(epoch from clock_timestamp() - v_locked_at) * 1000)::numeric, 1)
+    );
+end;
+$$;
+
+revoke all on function app.promote_full_replace_v1(text, uuid, text[], integer, integer) from public, anon, authenticated;
@@ -1,16 +1,22 @@
 from __future__ import annotations
 
+from datetime import datetime, timedelta, timezone
 from io import StringIO
+import re
 import time
+import uuid
 
 import pandas as pd
 from sqlalchemy import text
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Connection, Engine
 
+from app.audit.retention import run_id_started_at
 from app.utils.timezone import now_brasilia
 
 COPY_CHUNK_ROWS = 100_000
 COPY_MAX_ATTEMPTS = 2
+STALE_RUN_HOURS = 24
+PARTITION_BOUND_RE = re.compile(r"IN \('([0-9a-f-]{36})'\)")
 
 
 def _quoted(identifier: str) -> str:
@@ -33,15 +39,88 @@ def get_table_columns(engine: Engine, schema: str, table_name: str) -> list[str]
     return [row[0] for row in rows]
 
 
-def clear_staging_for_run(engine: Engine, table_name: str, run_id: str) -> None:
-    # Kept for compatibility with current sync flow; cleanup is table-wide now.
-    _ = run_id
-    clear_staging_for_table(engine, table_name)
+def run_staging_table(table_name: str, run_id: str) -> str:
+    # staging."<table>" is list-partitioned by run_id; each run loads its own unlogged
+    # partition, so concurrent runs of the same table never truncate each other's rows.
+    return f"{table_name[:40]}__r{uuid.UUID(run_id).hex[-16:]}"
+
 
+def _partition_state(conn: Connection, partition: str) -> bool | None:
+    # None: not attached; False: attached; True: a DETACH CONCURRENTLY was interrupted.
+    row = conn.execute(
+        text(
+            """
+            select i.inhdetachpending
+            from pg_inherits i
+            where i.inhrelid = to_regclass(:relation)
+            """
+        ),
+        {"relation": f'staging."{partition}"'},
+    ).fetchone()
+    return None if row is None else bool(row[0])
 
-def clear_staging_for_table(engine: Engine, table_name: str) -> None:
+
+def create_run_staging(engine: Engine, table_name: str, run_id: str) -> str:
+    partition = run_staging_table(table_name, run_id)
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                f'create unlogged table if not exists staging."{partition}" '
+                f'(like staging."{table_name}" including defaults including constraints)'
+            )
+        )
+        if _partition_state(conn, partition) is None:
+            # Attaching takes SHARE UPDATE EXCLUSIVE on the parent: readers of other runs'
+            # partitions are not blocked. run_id went through uuid.UUID, so the literal is safe.
+            conn.execute(
+                text(
+                    f'alter table staging."{table_name}" attach partition staging."{partition}" '
+                    f"for values in ('{uuid.UUID(run_id)}')"
+                )
+            )
+    return partition
+
+
+def drop_run_staging(engine: Engine, table_name: str, partition: str) -> None:
+    # DETACH ... CONCURRENTLY cannot run inside a transaction block, hence autocommit.
+    with engine.connect() as raw:
+        conn = raw.execution_options(isolation_level="AUTOCOMMIT")
+        state = _partition_state(conn, partition)
+        if state is True:
+            conn.execute(text(f'alter table staging."{table_name}" detach partition staging."{partition}" finalize'))
+        elif state is False:
+            conn.execute(text(f'alter table staging."{table_name}" detach partition staging."{partition}" concurrently'))
+        conn.execute(text(f'drop table if exists staging."{partition}"'))
+
+
+def drop_stale_run_staging(engine: Engine, table_name: str, max_age_hours: int = STALE_RUN_HOURS) -> list[str]:
+    # Partitions left behind by runs that died before cleanup.
     with engine.begin() as conn:
-        conn.execute(text(f'truncate table staging."{table_name}"'))
+        rows = conn.execute(
+            text(
+                """
+                select c.relname, pg_get_expr(c.relpartbound, c.oid)
+                from pg_inherits i
+                join pg_class c on c.oid = i.inhrelid
+                where i.inhparent = cast(:parent as regclass)
+                """
+            ),
+            {"parent": f'staging."{table_name}"'},
+        ).fetchall()
+
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=max_age_hours)
+    dropped: list[str] = []
+    for partition, bound in rows:
+        match = PARTITION_BOUND_RE.search(str(bound or ""))
+        started_at = run_id_started_at(match.group(1)) if match else None
+        if started_at is None or started_at < cutoff:
+            drop_run_staging(engine, table_name, str(partition))
+            dropped.append(str(partition))
+    return dropped
+
+
+def clear_staging_for_run(engine: Engine, table_name: str, run_id: str) -> None:
+    drop_run_staging(engine, table_name, run_staging_table(table_name, run_id))
 
 
 def _is_transient_copy_error(exc: Exception) -> bool:
@@ -87,9 +166,7 @@ def load_dataframe_to_staging(
     frame: pd.DataFrame,
     run_id: str,
 ) -> int:
-    # Staging is transient per load cycle; always start from a clean table.
-    clear_staging_for_table(engine, table_name)
-
+    drop_stale_run_staging(engine, table_name)
     if frame.empty:
         return 0
 
@@ -108,16 +185,18 @@ def load_dataframe_to_staging(
 
     data = data[columns]
 
+    partition = create_run_staging(engine, table_name, run_id)
     quoted_cols = ", ".join(_quoted(col) for col in columns)
     copy_sql = (
-        f'COPY staging."{table_name}" ({quoted_cols}) '
+        f'COPY staging."{partition}" ({quoted_cols}) '
         "FROM STDIN WITH (FORMAT CSV, NULL '\\N')"
     )
 
     last_exc: Exception | None = None
     for attempt in range(1, COPY_MAX_ATTEMPTS + 1):
         if attempt > 1:
-            clear_staging_for_table(engine, table_name)
+            with engine.begin() as conn:
+                conn.execute(text(f'truncate table staging."{partition}"'))
 
         raw_conn = engine.raw_connection()
         try:
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+import multiprocessing
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@contextmanager
+def prefetched(
+    items: Iterable[T],
+    prepare: Callable[[T], R],
+    ahead: int = 1,
+    workers: int = 1,
+) -> Iterator[Iterator[tuple[T, Future]]]:
+    # Two-stage pipeline: `workers` threads run `prepare` at most `ahead` items past the one
+    # the caller is consuming, so preparation overlaps the caller's I/O. Items come back in
+    # input order and each future carries its own exception. Leaving the block cancels
+    # whatever has not started yet.
+    executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="sync-prepare")
+    source = iter(items)
+    pending: deque[tuple[T, Future]] = deque()
+
+    def submit_next() -> bool:
+        try:
+            item = next(source)
+        except StopIteration:
+            return False
+        pending.append((item, executor.submit(prepare, item)))
+        return True
+
+    def iterate() -> Iterator[tuple[T, Future]]:
+        while pending or submit_next():
+            item, future = pending.popleft()
+            # The window is counted past the item being handed out: ahead=0 is strictly sequential.
+            while len(pending) < ahead and submit_next():
+                pass
+            yield item, future
+
+    try:
+        yield iterate()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+@contextmanager
+def process_pool(workers: int) -> Iterator[ProcessPoolExecutor | None]:
+    # CPU-bound prepare work runs in separate processes to get past the GIL. spawn (the
+    # Windows default) everywhere: forking would copy the audit flush thread and pooled
+    # connections into the children. One worker means no pool at all.
+    if workers <= 1:
+        yield None
+        return
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        yield pool
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pandas as pd
+
+from app.config.models import TableConfig
+from app.etl.extract.readers import read_source_dataframe
+from app.etl.table_specs import get_table_spec
+from app.etl.transform.cast import apply_type_casts
+from app.etl.transform.normalize import normalize_dataframe
+from app.etl.transform.table_rules import apply_table_specific_rules
+from app.etl.transform.validate import validate_frame
+
+
+@dataclass
+class PreparedFrames:
+    valid: pd.DataFrame
+    rejections: pd.DataFrame
+    rows_in: int
+    rows_out: int
+    dropped_headers: int
+    dropped_empty_rows: int
+    table_rule_stats: dict[str, object] = field(default_factory=dict)
+
+
+def drop_fully_empty_business_rows(table_name: str, frame: pd.DataFrame) -> tuple[pd.DataFrame, int]:
+    spec = get_table_spec(table_name)
+    business_columns = [col for col in spec.business_columns if col in frame.columns]
+    if not business_columns:
+        return frame, 0
+
+    empty_mask = frame[business_columns].isna().all(axis=1)
+    dropped_count = int(empty_mask.sum())
+    if dropped_count == 0:
+        return frame, 0
+
+    return frame.loc[~empty_mask].copy(), dropped_count
+
+
+def _matches_keys_by_equality(table_cfg: TableConfig) -> bool:
+    # The keyed diff joins on "a.key = i.key" to keep hash joins, so a NULL key never
+    # matches and its row would be deleted and reinserted on every run.
+    mode = table_cfg.mode
+    return bool(table_cfg.unique_keys) and (
+        mode == "full_replace_delta" or (table_cfg.cd_scope and mode == "full_replace")
+    )
+
+
+def prepare_table_frames(
+    table_name: str,
+    table_cfg: TableConfig,
+    data_dir: Path,
+    sql_types: dict[str, str],
+    required_columns: list[str],
+    unique_keys: list[str],
+    dedupe_order_by: list[str],
+) -> PreparedFrames:
+    # Read -> normalize -> cast -> table rules -> validate, with no database access, so it
+    # can run in a worker process; audit steps and rejections stay with the caller.
+    raw = read_source_dataframe(table_name, table_cfg, data_dir)
+    normalized, dropped_headers = normalize_dataframe(raw)
+
+    cast_result = apply_type_casts(normalized, table_name, sql_types)
+    prepared_frame, dropped_empty_rows = drop_fully_empty_business_rows(table_name, cast_result.frame)
+    prepared_frame, table_rule_stats = apply_table_specific_rules(table_name, prepared_frame)
+
+    validation = validate_frame(
+        table_name=table_name,
+        frame=prepared_frame,
+        required_columns=required_columns,
+        unique_keys=unique_keys,
+        dedupe_order_by=dedupe_order_by,
+        reject_null_keys=_matches_keys_by_equality(table_cfg),
+    )
+
+    rejections = pd.concat(
+        [
+            cast_result.rejections,
+            validation.rejections,
+        ],
+        ignore_index=True,
+    )
+
+    valid = validation.valid_frame.copy()
+    valid["source_file"] = raw["source_file"]
+    valid["source_row_number"] = raw["source_row_number"]
+
+    return PreparedFrames(
+        valid=valid,
+        rejections=rejections,
+        rows_in=validation.rows_in,
+        rows_out=validation.rows_out,
+        dropped_headers=dropped_headers,
+        dropped_empty_rows=dropped_empty_rows,
+        table_rule_stats=table_rule_stats,
+    )
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import re
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.etl.promote.counts import PromoteCounts
+from app.etl.promote.full_replace_delta import run_full_replace_delta
+from app.etl.promote.insert_new import run_insert_new
+from app.etl.promote.upsert import run_sweep, run_upsert
+
+IDENTIFIER_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+CD_SCOPE_FILTER_SQL = 'a."cd" = any(cast(:scope_cds as integer[]))'
+# A staged row without cd belongs to no site's scope: it would never match a scoped app row
+# and would be inserted again on every run, so scoped promotes leave it out.
+STAGED_CD_FILTER_SQL = 's."cd" is not null'
+CD_SCOPED_MODES = ("full_replace", "full_replace_delta", "upsert", "upsert_sweep", "insert_new")
+
+
+def _validate_identifier(value: str) -> None:
+    if not IDENTIFIER_RE.match(value):
+        raise ValueError(f"Invalid SQL identifier: {value}")
+
+
+def staged_scope(conn: Connection, table_name: str, run_id: str) -> tuple[list[int], int]:
+    row = conn.execute(
+        text(
+            f"""
+            select
+                coalesce(array_agg(distinct s."cd" order by s."cd") filter (where s."cd" is not null), '{{}}') as cds,
+                count(*) filter (where s."cd" is null) as null_cd_rows
+            from staging."{table_name}" s
+            where s.run_id = :run_id
+            """
+        ),
+        {"run_id": run_id},
+    ).mappings().one()
+    return [int(cd) for cd in row["cds"]], int(row["null_cd_rows"])
+
+
+def lock_cds(conn: Connection, table_name: str, cds: list[int]) -> None:
+    # Transaction-scoped and taken in cd order, so two site machines sharing a CD queue
+    # instead of deadlocking, while disjoint CDs never wait on each other.
+    conn.execute(
+        text(
+            """
+            select pg_advisory_xact_lock(hashtext(:namespace), cd)
+            from unnest(cast(:cds as integer[])) as cd
+            order by cd
+            """
+        ),
+        {"namespace": f"cd_scope:{table_name}", "cds": cds},
+    ).fetchall()
+
+
+def promote_cd_scoped(
+    engine: Engine,
+    table_name: str,
+    mode: str,
+    business_columns: list[str],
+    unique_keys: list[str],
+    run_id: str,
+    row_hash: bool = False,
+    lock: bool = False,
+) -> PromoteCounts:
+    _validate_identifier(table_name)
+    if mode not in CD_SCOPED_MODES:
+        raise ValueError(f"[{table_name}] cd_scope is not supported with {mode} mode")
+
+    with engine.begin() as conn:
+        cds, null_cd_rows = staged_scope(conn, table_name, run_id)
+        if lock and cds:
+            lock_cds(conn, table_name, cds)
+        scope_params = {"scope_cds": cds}
+
+        # full_replace is applied as a diff limited to the staged CDs: swapping the whole
+        # table would drop every other site's rows.
+        if mode in ("full_replace", "full_replace_delta"):
+            counts = run_full_replace_delta(
+                conn,
+                table_name=table_name,
+                business_columns=business_columns,
+                unique_keys=unique_keys,
+                run_id=run_id,
+                row_hash=row_hash,
+                source_filter_sql=STAGED_CD_FILTER_SQL,
+                app_filter_sql=CD_SCOPE_FILTER_SQL,
+                additional_params=scope_params,
+            )
+        elif mode == "insert_new":
+            counts = run_insert_new(
+                conn,
+                table_name=table_name,
+                business_columns=business_columns,
+                run_id=run_id,
+                row_hash=row_hash,
+                additional_filter_sql=STAGED_CD_FILTER_SQL,
+            )
+        else:
+            counts = run_upsert(
+                conn,
+                table_name=table_name,
+                business_columns=business_columns,
+                unique_keys=unique_keys,
+                run_id=run_id,
+                additional_filter_sql=STAGED_CD_FILTER_SQL,
+                row_hash=row_hash,
+            )
+            if mode == "upsert_sweep":
+                counts.deleted = run_sweep(
+                    conn,
+                    table_name,
+                    unique_keys,
+                    run_id,
+                    app_filter_sql=CD_SCOPE_FILTER_SQL,
+                    additional_params=scope_params,
+                )
+
+    counts.details.update({"cd_scope": cds, "cd_locks": bool(lock and cds), "null_cd_rows_skipped": null_cd_rows})
+    return counts
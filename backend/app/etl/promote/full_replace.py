@@ -1,11 +1,26 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
+from io import StringIO
+import random
 import re
+import time
 
+import pandas as pd
 from sqlalchemy import text
 from sqlalchemy.engine import Engine
 
+from app.etl.promote.counts import PromoteCounts
+
 IDENTIFIER_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+INDEX_DEF_RE = re.compile(r"^(CREATE (?:UNIQUE )?INDEX )\S+ ON (?:ONLY )?\S+( USING .*)$", re.DOTALL)
+INDEX_BUILD_MAINTENANCE_WORK_MEM = "512MB"
+INDEX_BUILD_PARALLEL_WORKERS = 4
+SWAP_LOCK_TIMEOUT_MS = 50
+SWAP_LOCK_MAX_ATTEMPTS = 40
+SWAP_LOCK_RETRY_SECONDS = 0.25
+LOCK_NOT_AVAILABLE = "55P03"
+FULL_REPLACE_PROCEDURE = "promote_full_replace_v1"
 
 
 def _validate_identifier(value: str) -> None:
@@ -13,7 +28,7 @@ def _validate_identifier(value: str) -> None:
         raise ValueError(f"Invalid SQL identifier: {value}")
 
 
-def _bounded_name(prefix: str, table_name: str, run_id: str) -> str:
+def bounded_name(prefix: str, table_name: str, run_id: str) -> str:
     token = run_id.replace("-", "")[:8]
     name = f"{prefix}_{table_name}_{token}"
     if len(name) <= 63:
@@ -23,56 +38,258 @@ def _bounded_name(prefix: str, table_name: str, run_id: str) -> str:
     return f"{prefix}_{table_name[:max_table_len]}{suffix}"
 
 
+@dataclass(frozen=True)
+class _SwapIndex:
+    name: str
+    definition: str
+    constraint_name: str | None
+    constraint_type: str | None
+
+
+def _fetch_swap_indexes(cursor, table_name: str) -> list[_SwapIndex] | None:
+    cursor.execute(
+        """
+        select i.relname, pg_get_indexdef(x.indexrelid), con.conname, con.contype
+        from pg_index x
+        join pg_class i on i.oid = x.indexrelid
+        left join pg_constraint con on con.conindid = x.indexrelid and con.conrelid = x.indrelid
+        where x.indrelid = %s::regclass
+        order by i.relname
+        """,
+        (f'app."{table_name}"',),
+    )
+    indexes = [_SwapIndex(*row) for row in cursor.fetchall()]
+    # Exclusion constraints cannot be attached to a prebuilt index; keep "including all" for them.
+    if any(idx.constraint_type not in (None, "p", "u") for idx in indexes):
+        return None
+    return indexes
+
+
+def _create_swap_table(cursor, table_name: str, swap_table: str) -> list[_SwapIndex] | None:
+    indexes = _fetch_swap_indexes(cursor, table_name)
+    cursor.execute(f'drop table if exists app."{swap_table}"')
+    if indexes is None:
+        cursor.execute(f'create table app."{swap_table}" (like app."{table_name}" including all)')
+    else:
+        # Indexes are built after the bulk load instead of being maintained row by row.
+        cursor.execute(
+            f'create table app."{swap_table}" (like app."{table_name}" including all excluding indexes)'
+        )
+    return indexes
+
+
+def swap_index_sql(definition: str, index_name: str, swap_table: str) -> str:
+    match = INDEX_DEF_RE.match(definition)
+    if match is None:
+        raise ValueError(f"Unexpected index definition: {definition}")
+    return f'{match.group(1)}"{index_name}" ON app."{swap_table}"{match.group(2)}'
+
+
+def _build_swap_indexes(
+    cursor,
+    table_name: str,
+    swap_table: str,
+    run_id: str,
+    indexes: list[_SwapIndex],
+) -> list[dict[str, object]]:
+    cursor.execute(f"set local maintenance_work_mem = '{INDEX_BUILD_MAINTENANCE_WORK_MEM}'")
+    cursor.execute(f"set local max_parallel_maintenance_workers = {INDEX_BUILD_PARALLEL_WORKERS}")
+
+    timings: list[dict[str, object]] = []
+    for position, index in enumerate(indexes):
+        temp_name = bounded_name(f"__ix{position}", table_name, run_id)
+
+        started = time.perf_counter()
+        cursor.execute(swap_index_sql(index.definition, temp_name, swap_table))
+        if index.constraint_type is not None:
+            constraint_kind = "primary key" if index.constraint_type == "p" else "unique"
+            cursor.execute(
+                f'alter table app."{swap_table}" add constraint "{temp_name}" {constraint_kind} using index "{temp_name}"'
+            )
+        timings.append(
+            {
+                "index": index.name,
+                "temp_name": temp_name,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+        )
+    return timings
+
+
+def _restore_index_names(cursor, table_name: str, indexes: list[_SwapIndex], timings: list[dict[str, object]]) -> None:
+    # Runs after the old table is dropped, so the original names are free again.
+    for index, timing in zip(indexes, timings):
+        temp_name = timing["temp_name"]
+        if index.constraint_name is not None:
+            cursor.execute(
+                f'alter table app."{table_name}" rename constraint "{temp_name}" to "{index.constraint_name}"'
+            )
+        else:
+            cursor.execute(f'alter index app."{temp_name}" rename to "{index.name}"')
+
+
+def acquire_swap_lock(cursor, table_name: str) -> dict[str, object]:
+    # While we wait for ACCESS EXCLUSIVE every new reader queues behind us, so each attempt
+    # gives up after a few milliseconds and retries later instead of stalling the frontend.
+    cursor.execute("show lock_timeout")
+    previous_timeout = cursor.fetchone()[0]
+    started = time.perf_counter()
+    for attempt in range(1, SWAP_LOCK_MAX_ATTEMPTS + 1):
+        cursor.execute("savepoint swap_lock")
+        cursor.execute(f"set local lock_timeout = '{SWAP_LOCK_TIMEOUT_MS}ms'")
+        try:
+            cursor.execute(f'lock table app."{table_name}" in access exclusive mode')
+        except Exception as exc:
+            if getattr(exc, "pgcode", None) != LOCK_NOT_AVAILABLE:
+                raise
+            cursor.execute("rollback to savepoint swap_lock")
+            if attempt == SWAP_LOCK_MAX_ATTEMPTS:
+                raise RuntimeError(
+                    f"[{table_name}] swap lock not acquired after {attempt} attempts"
+                ) from exc
+            time.sleep(SWAP_LOCK_RETRY_SECONDS * min(attempt, 8) * random.uniform(0.5, 1.5))
+            continue
+
+        cursor.execute("release savepoint swap_lock")
+        cursor.execute("select set_config('lock_timeout', %s, true)", (previous_timeout,))
+        return {
+            "lock_attempts": attempt,
+            "lock_wait_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+    raise RuntimeError(f"[{table_name}] swap lock not acquired")
+
+
+def _cutover(
+    cursor,
+    table_name: str,
+    swap_table: str,
+    old_table: str,
+    indexes: list[_SwapIndex] | None,
+    timings: list[dict[str, object]] | None,
+) -> dict[str, object]:
+    lock_stats = acquire_swap_lock(cursor, table_name)
+    locked_at = time.perf_counter()
+    cursor.execute(f'alter table app."{table_name}" rename to "{old_table}"')
+    cursor.execute(f'alter table app."{swap_table}" rename to "{table_name}"')
+    cursor.execute("select app.apply_runtime_security(%s)", (table_name,))
+    cursor.execute(f'drop table app."{old_table}"')
+    if indexes is not None and timings is not None:
+        _restore_index_names(cursor, table_name, indexes, timings)
+    return {**lock_stats, "cutover_ms": round((time.perf_counter() - locked_at) * 1000, 1)}
+
+
+def _index_build_details(timings: list[dict[str, object]] | None) -> dict[str, object]:
+    if timings is None:
+        return {"deferred_indexes": False}
+    return {
+        "deferred_indexes": True,
+        "index_build_ms": round(sum(float(t["elapsed_ms"]) for t in timings), 1),
+        "index_builds": [{"index": t["index"], "elapsed_ms": t["elapsed_ms"]} for t in timings],
+    }
+
+
 def promote_full_replace(
     engine: Engine,
     table_name: str,
     business_columns: list[str],
     run_id: str,
-) -> int:
+) -> PromoteCounts:
     _validate_identifier(table_name)
     for col in business_columns:
         _validate_identifier(col)
 
-    swap_table = _bounded_name("__swap", table_name, run_id)
-    old_table = _bounded_name("__old", table_name, run_id)
+    # The whole swap (load with carry-over, deferred index build, lock-aware cutover) runs
+    # server-side in one call; see V514__promote_full_replace_procedure.sql.
+    with engine.begin() as conn:
+        result = conn.execute(
+            text(f"select app.{FULL_REPLACE_PROCEDURE}(:table_name, cast(:run_id as uuid), :columns)"),
+            {"table_name": table_name, "run_id": run_id, "columns": business_columns},
+        ).scalar_one()
 
-    quoted_business = ", ".join(f'"{col}"' for col in business_columns)
-    quoted_target = ", ".join(
-        [quoted_business, '"source_run_id"', '"updated_at"']
+    details = dict(result)
+    return PromoteCounts(
+        inserted=int(details.pop("inserted")),
+        deleted=int(details.pop("deleted")),
+        unchanged=int(details.pop("unchanged")),
+        details=details,
     )
-    select_source = ", ".join(f's."{col}"' for col in business_columns)
 
-    with engine.begin() as conn:
-        conn.execute(text(f'drop table if exists app."{swap_table}"'))
-        conn.execute(
-            text(
-                f'create table app."{swap_table}" '
-                f'(like app."{table_name}" including all)'
-            )
-        )
 
-        conn.execute(
-            text(
-                f"""
-                insert into app."{swap_table}" ({quoted_target})
-                select {select_source}, :run_id, now()
-                from staging."{table_name}" s
-                where s.run_id = :run_id
-                """
-            ),
-            {"run_id": run_id},
-        )
+def _copy_frame(data: pd.DataFrame, copy_sql: str, cursor) -> None:
+    csv_buffer = StringIO()
+    data.to_csv(csv_buffer, index=False, header=False, na_rep="\\N")
+    csv_buffer.seek(0)
+    cursor.copy_expert(copy_sql, csv_buffer)
 
-        conn.execute(text(f'alter table app."{table_name}" rename to "{old_table}"'))
-        conn.execute(text(f'alter table app."{swap_table}" rename to "{table_name}"'))
-        conn.execute(text("select app.apply_runtime_security(:table_name)"), {"table_name": table_name})
-        conn.execute(text(f'drop table app."{old_table}"'))
 
-        rows_out = conn.execute(
-            text(f'select count(*) from app."{table_name}"')
-        ).scalar_one()
+def promote_full_replace_direct(
+    engine: Engine,
+    table_name: str,
+    business_columns: list[str],
+    frame: pd.DataFrame,
+    run_id: str,
+) -> PromoteCounts:
+    _validate_identifier(table_name)
+    for col in business_columns:
+        _validate_identifier(col)
 
-    with engine.begin() as conn:
-        conn.execute(text(f'analyze app."{table_name}"'))
+    swap_table = bounded_name("__swap", table_name, run_id)
+    old_table = bounded_name("__old", table_name, run_id)
 
-    return int(rows_out)
+    data = frame.copy()
+    for col in business_columns:
+        if col not in data.columns:
+            data[col] = None
+    data = data[business_columns]
+    data["source_run_id"] = run_id
+
+    # updated_at is filled by the column default copied with "like ... including all".
+    quoted_target = ", ".join(f'"{col}"' for col in [*business_columns, "source_run_id"])
+    copy_sql = (
+        f'COPY app."{swap_table}" ({quoted_target}) '
+        "FROM STDIN WITH (FORMAT CSV, NULL '\\N', FREEZE true)"
+    )
+
+    # FREEZE requires the swap table to be created in the same transaction as the COPY.
+    # Carrying over updated_at would need a second pass over the frozen rows, so this
+    # path stamps every row; tables that need stable timestamps should not enable it.
+    raw_conn = engine.raw_connection()
+    try:
+        with raw_conn.cursor() as cursor:
+            indexes = _create_swap_table(cursor, table_name, swap_table)
+            if not data.empty:
+                _copy_frame(data, copy_sql, cursor)
+            timings = None
+            if indexes is not None:
+                timings = _build_swap_indexes(cursor, table_name, swap_table, run_id, indexes)
+            # Planner estimate only: an exact count would scan the table being replaced.
+            cursor.execute(
+                "select greatest(c.reltuples, 0)::bigint from pg_class c where c.oid = %s::regclass",
+                (f'app."{table_name}"',),
+            )
+            previous_rows_estimate = int(cursor.fetchone()[0])
+            swap_stats = _cutover(cursor, table_name, swap_table, old_table, indexes, timings)
+        raw_conn.commit()
+    except Exception:
+        try:
+            if not getattr(raw_conn, "closed", False):
+                raw_conn.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        try:
+            raw_conn.close()
+        except Exception:
+            pass
+
+    return PromoteCounts(
+        inserted=len(data),
+        details={
+            "strategy": "direct_copy_freeze",
+            "staging_skipped": True,
+            "previous_rows_estimate": previous_rows_estimate,
+            **_index_build_details(timings),
+            **swap_stats,
+        },
+    )
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import re
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.etl.promote.counts import PromoteCounts
+from app.etl.promote.row_hash import (
+    ROW_HASH_COLUMN,
+    fetch_column_types,
+    row_hash_sql,
+    typed_columns_sql,
+    typed_row_hash_sql,
+)
+
+IDENTIFIER_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+def _validate_identifier(value: str) -> None:
+    if not IDENTIFIER_RE.match(value):
+        raise ValueError(f"Invalid SQL identifier: {value}")
+
+
+def _and_filter(base: str, extra: str) -> str:
+    return f"{base} and ({extra})" if extra else base
+
+
+def _hash_sources(
+    business_columns: list[str],
+    column_types: dict[str, str] | None,
+    stored_hash: bool,
+) -> tuple[str, str, str]:
+    if column_types is None:
+        quoted_business = ", ".join(f'"{col}"' for col in business_columns)
+        return quoted_business, row_hash_sql("s", business_columns), row_hash_sql("a", business_columns)
+
+    # Staging is cast to the app types so both sides hash the same text.
+    return (
+        typed_columns_sql("s", business_columns, column_types),
+        typed_row_hash_sql("s", business_columns, column_types),
+        f'a."{ROW_HASH_COLUMN}"' if stored_hash else row_hash_sql("a", business_columns),
+    )
+
+
+def build_keyed_diff_sql(
+    table_name: str,
+    business_columns: list[str],
+    unique_keys: list[str],
+    source_filter_sql: str = "",
+    app_filter_sql: str = "",
+    column_types: dict[str, str] | None = None,
+    stored_hash: bool = True,
+) -> str:
+    quoted_business = ", ".join(f'"{col}"' for col in business_columns)
+    quoted_insert_cols = ", ".join(f'"{col}"' for col in [*business_columns, "source_run_id", "updated_at"])
+    select_incoming = ", ".join(f'i."{col}"' for col in business_columns)
+    incoming_cols, incoming_hash, current_hash = _hash_sources(business_columns, column_types, stored_hash)
+    app_key_match = " and ".join(f'a."{col}" = i."{col}"' for col in unique_keys)
+
+    update_cols = [col for col in business_columns if col not in unique_keys]
+    set_assignments = [f'"{col}" = i."{col}"' for col in update_cols]
+    set_assignments.extend(['"source_run_id" = :run_id', '"updated_at" = now()'])
+    set_clause = ", ".join(set_assignments)
+
+    app_where = app_filter_sql or "true"
+
+    return f"""
+    with incoming as materialized (
+        select {incoming_cols}, {incoming_hash} as row_hash
+        from staging."{table_name}" s
+        where {_and_filter("s.run_id = :run_id", source_filter_sql)}
+    ),
+    deleted as (
+        delete from app."{table_name}" a
+        where {app_where}
+          and not exists (
+              select 1
+              from incoming i
+              where {app_key_match}
+          )
+        returning 1
+    ),
+    updated as (
+        update app."{table_name}" a
+        set {set_clause}
+        from incoming i
+        where {app_key_match}
+          and ({app_where})
+          and {current_hash} is distinct from i.row_hash
+        returning 1
+    ),
+    inserted as (
+        insert into app."{table_name}" ({quoted_insert_cols})
+        select {select_incoming}, :run_id, now()
+        from incoming i
+        where not exists (
+            select 1
+            from app."{table_name}" a
+            where {app_key_match}
+        )
+        returning 1
+    )
+    select
+        (select count(*) from inserted) as inserted,
+        (select count(*) from updated) as updated,
+        (select count(*) from deleted) as deleted,
+        (select count(*) from incoming)
+            - (select count(*) from inserted)
+            - (select count(*) from updated) as unchanged
+    """
+
+
+def build_multiset_diff_sql(
+    table_name: str,
+    business_columns: list[str],
+    source_filter_sql: str = "",
+    app_filter_sql: str = "",
+    column_types: dict[str, str] | None = None,
+    stored_hash: bool = True,
+) -> str:
+    quoted_insert_cols = ", ".join(f'"{col}"' for col in [*business_columns, "source_run_id", "updated_at"])
+    select_incoming = ", ".join(f'i."{col}"' for col in business_columns)
+    incoming_cols, incoming_hash, current_hash = _hash_sources(business_columns, column_types, stored_hash)
+
+    # Duplicated rows are matched by (row_hash, occurrence) so the multiset is preserved.
+    return f"""
+    with incoming as materialized (
+        select
+            {incoming_cols},
+            {incoming_hash} as row_hash,
+            row_number() over (partition by {incoming_hash}) as occurrence
+        from staging."{table_name}" s
+        where {_and_filter("s.run_id = :run_id", source_filter_sql)}
+    ),
+    current_rows as materialized (
+        select
+            a.ctid as row_ctid,
+            {current_hash} as row_hash,
+            row_number() over (partition by {current_hash} order by a."updated_at") as occurrence
+        from app."{table_name}" a
+        where {app_filter_sql or "true"}
+    ),
+    deleted as (
+        delete from app."{table_name}" a
+        using current_rows c
+        where a.ctid = c.row_ctid
+          and not exists (
+              select 1
+              from incoming i
+              where i.row_hash = c.row_hash
+                and i.occurrence = c.occurrence
+          )
+        returning 1
+    ),
+    inserted as (
+        insert into app."{table_name}" ({quoted_insert_cols})
+        select {select_incoming}, :run_id, now()
+        from incoming i
+        where not exists (
+            select 1
+            from current_rows c
+            where c.row_hash = i.row_hash
+              and c.occurrence = i.occurrence
+        )
+        returning 1
+    )
+    select
+        (select count(*) from inserted) as inserted,
+        0::bigint as updated,
+        (select count(*) from deleted) as deleted,
+        (select count(*) from incoming) - (select count(*) from inserted) as unchanged
+    """
+
+
+def run_full_replace_delta(
+    conn: Connection,
+    table_name: str,
+    business_columns: list[str],
+    unique_keys: list[str],
+    run_id: str,
+    row_hash: bool = False,
+    app_filter_sql: str = "",
+    additional_params: dict[str, Any] | None = None,
+    source_filter_sql: str = "",
+) -> PromoteCounts:
+    _validate_identifier(table_name)
+    for col in business_columns + unique_keys:
+        _validate_identifier(col)
+
+    column_types = fetch_column_types(conn, "app", table_name)
+    if unique_keys:
+        sql = build_keyed_diff_sql(
+            table_name,
+            business_columns,
+            unique_keys,
+            source_filter_sql=source_filter_sql,
+            app_filter_sql=app_filter_sql,
+            column_types=column_types,
+            stored_hash=row_hash,
+        )
+    else:
+        sql = build_multiset_diff_sql(
+            table_name,
+            business_columns,
+            source_filter_sql=source_filter_sql,
+            app_filter_sql=app_filter_sql,
+            column_types=column_types,
+            stored_hash=row_hash,
+        )
+    row = conn.execute(text(sql), {"run_id": run_id, **(additional_params or {})}).mappings().one()
+
+    return PromoteCounts(
+        inserted=int(row["inserted"]),
+        updated=int(row["updated"]),
+        deleted=int(row["deleted"]),
+        unchanged=int(row["unchanged"]),
+    )
+
+
+def promote_full_replace_delta(
+    engine: Engine,
+    table_name: str,
+    business_columns: list[str],
+    unique_keys: list[str],
+    run_id: str,
+    row_hash: bool = False,
+) -> PromoteCounts:
+    with engine.begin() as conn:
+        return run_full_replace_delta(
+            conn,
+            table_name=table_name,
+            business_columns=business_columns,
+            unique_keys=unique_keys,
+            run_id=run_id,
+            row_hash=row_hash,
+        )
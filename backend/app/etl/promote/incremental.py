@@ -1,12 +1,15 @@
 from __future__ import annotations
 
-from datetime import timedelta
+from datetime import datetime, timedelta
 import re
 
 from sqlalchemy import text
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Connection, Engine
 
-from app.etl.promote.upsert import promote_upsert
+from app.etl.promote.counts import PromoteCounts
+from app.etl.promote.full_replace_delta import build_multiset_diff_sql
+from app.etl.promote.row_hash import fetch_column_types
+from app.etl.promote.upsert import run_upsert
 
 IDENTIFIER_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
 
@@ -16,6 +19,94 @@ def _validate_identifier(value: str) -> None:
         raise ValueError(f"Invalid SQL identifier: {value}")
 
 
+def _read_watermark_state(conn: Connection, table_name: str, reconcile_interval_hours: int):
+    # "for update" locks nothing while the row does not exist, so the first promote of a
+    # table creates it up front; concurrent first runs then queue on the same row.
+    conn.execute(
+        text(
+            """
+            insert into audit.table_state (table_name)
+            values (:table_name)
+            on conflict (table_name) do nothing
+            """
+        ),
+        {"table_name": table_name},
+    )
+    return conn.execute(
+        text(
+            """
+            select
+                watermark_column,
+                high_water_mark,
+                coalesce(
+                    watermark_reconciled_at < now() - make_interval(hours => :reconcile_hours),
+                    true
+                ) as reconcile_due
+            from audit.table_state
+            where table_name = :table_name
+            for update
+            """
+        ),
+        {"table_name": table_name, "reconcile_hours": reconcile_interval_hours},
+    ).first()
+
+
+def _save_watermark_state(
+    conn: Connection,
+    table_name: str,
+    watermark_column: str,
+    high_water_mark: datetime | None,
+    lookback_days: int,
+    run_id: str,
+    reconciled: bool,
+) -> None:
+    conn.execute(
+        text(
+            """
+            insert into audit.table_state (
+                table_name,
+                watermark_column,
+                high_water_mark,
+                lookback_days,
+                watermark_reconciled_at,
+                last_run_id,
+                updated_at
+            )
+            values (
+                :table_name,
+                :watermark_column,
+                :high_water_mark,
+                :lookback_days,
+                case when :reconciled then now() end,
+                :run_id,
+                now()
+            )
+            on conflict (table_name) do update set
+                watermark_column = excluded.watermark_column,
+                high_water_mark = case
+                    when :reconciled then excluded.high_water_mark
+                    else greatest(audit.table_state.high_water_mark, excluded.high_water_mark)
+                end,
+                lookback_days = excluded.lookback_days,
+                watermark_reconciled_at = coalesce(
+                    excluded.watermark_reconciled_at,
+                    audit.table_state.watermark_reconciled_at
+                ),
+                last_run_id = excluded.last_run_id,
+                updated_at = excluded.updated_at
+            """
+        ),
+        {
+            "table_name": table_name,
+            "watermark_column": watermark_column,
+            "high_water_mark": high_water_mark,
+            "lookback_days": lookback_days,
+            "reconciled": reconciled,
+            "run_id": run_id,
+        },
+    )
+
+
 def promote_incremental(
     engine: Engine,
     table_name: str,
@@ -24,20 +115,35 @@ def promote_incremental(
     run_id: str,
     watermark_column: str,
     lookback_days: int,
-) -> tuple[int, str | None, str | None]:
+    row_hash: bool = False,
+    reconcile_interval_hours: int = 24,
+) -> tuple[PromoteCounts, str | None, str | None]:
     _validate_identifier(table_name)
     _validate_identifier(watermark_column)
     for col in business_columns + unique_keys:
         _validate_identifier(col)
 
+    # Registry row, DML and the new high-water mark share one transaction; the
+    # row lock also serializes concurrent promotes of the same table.
     with engine.begin() as conn:
-        current_max = conn.execute(
-            text(f'select max("{watermark_column}") from app."{table_name}"')
-        ).scalar_one()
+        state = _read_watermark_state(conn, table_name, reconcile_interval_hours)
+        reconciled = (
+            state is None
+            or state.high_water_mark is None
+            or state.watermark_column != watermark_column
+            or bool(state.reconcile_due)
+        )
+        if reconciled:
+            current_max = conn.execute(
+                text(f'select max("{watermark_column}")::timestamptz from app."{table_name}"')
+            ).scalar_one()
+        else:
+            current_max = state.high_water_mark
+
         incoming_max = conn.execute(
             text(
                 f"""
-                select max(s."{watermark_column}")
+                select max(s."{watermark_column}")::timestamptz
                 from staging."{table_name}" s
                 where s.run_id = :run_id
                 """
@@ -45,68 +151,120 @@ def promote_incremental(
             {"run_id": run_id},
         ).scalar_one()
 
-    cutoff_value = None
-    cutoff = None
-    if current_max is not None:
-        cutoff = current_max - timedelta(days=lookback_days)
-        cutoff_value = cutoff.isoformat()
+        cutoff_value = None
+        cutoff = None
+        if current_max is not None:
+            cutoff = current_max - timedelta(days=lookback_days)
+            cutoff_value = cutoff.isoformat()
 
-    if unique_keys:
-        if cutoff is not None:
-            promoted_rows = promote_upsert(
-                engine=engine,
+        if unique_keys:
+            if cutoff is not None:
+                counts = run_upsert(
+                    conn,
+                    table_name=table_name,
+                    business_columns=business_columns,
+                    unique_keys=unique_keys,
+                    run_id=run_id,
+                    additional_filter_sql=f's."{watermark_column}" >= :cutoff',
+                    additional_params={"cutoff": cutoff},
+                    row_hash=row_hash,
+                )
+            else:
+                counts = run_upsert(
+                    conn,
+                    table_name=table_name,
+                    business_columns=business_columns,
+                    unique_keys=unique_keys,
+                    run_id=run_id,
+                    row_hash=row_hash,
+                )
+        elif cutoff is not None:
+            # The window is diffed rather than deleted and reloaded, so unchanged rows are not
+            # rewritten.
+            counts = _diff_window(
+                conn,
                 table_name=table_name,
                 business_columns=business_columns,
-                unique_keys=unique_keys,
                 run_id=run_id,
-                additional_filter_sql=f's."{watermark_column}" >= :cutoff',
-                additional_params={"cutoff": cutoff},
+                watermark_column=watermark_column,
+                cutoff=cutoff,
+                row_hash=row_hash,
             )
         else:
-            promoted_rows = promote_upsert(
-                engine=engine,
+            counts = _load_all(
+                conn,
                 table_name=table_name,
                 business_columns=business_columns,
-                unique_keys=unique_keys,
                 run_id=run_id,
             )
-        incoming_max_iso = incoming_max.isoformat() if incoming_max is not None else None
-        return promoted_rows, cutoff_value, incoming_max_iso
 
-    # Incremental sem unique_keys: replace por janela para preservar todas as linhas do período.
-    quoted_insert_cols = ", ".join(f'"{col}"' for col in [*business_columns, "source_run_id", "updated_at"])
-    select_business_cols = ", ".join(f's."{col}"' for col in business_columns)
+        high_water_mark = max(
+            (value for value in (current_max, incoming_max) if value is not None),
+            default=None,
+        )
+        _save_watermark_state(
+            conn,
+            table_name=table_name,
+            watermark_column=watermark_column,
+            high_water_mark=high_water_mark,
+            lookback_days=lookback_days,
+            run_id=run_id,
+            reconciled=reconciled,
+        )
+
+    counts.details["watermark_reconciled"] = reconciled
+    incoming_max_iso = incoming_max.isoformat() if incoming_max is not None else None
+    return counts, cutoff_value, incoming_max_iso
 
-    where_clause = "s.run_id = :run_id"
-    params: dict[str, object] = {"run_id": run_id}
-    if cutoff is not None:
-        where_clause = f'{where_clause} and s."{watermark_column}" >= :cutoff'
-        params["cutoff"] = cutoff
 
-    insert_sql = text(
-        f"""
-        insert into app."{table_name}" ({quoted_insert_cols})
-        select {select_business_cols}, :run_id, now()
-        from staging."{table_name}" s
-        where {where_clause}
-        """
-    )
-    count_sql = text(
+def _load_all(
+    conn: Connection,
+    table_name: str,
+    business_columns: list[str],
+    run_id: str,
+) -> PromoteCounts:
+    # Sem high-water mark ainda nao ha janela a substituir: a carga inteira entra como nova.
+    quoted_insert_cols = ", ".join(f'"{col}"' for col in [*business_columns, "source_run_id", "updated_at"])
+    select_business_cols = ", ".join(f's."{col}"' for col in business_columns)
+    sql = text(
         f"""
-        select count(*)
-        from staging."{table_name}" s
-        where {where_clause}
+        with inserted as (
+            insert into app."{table_name}" ({quoted_insert_cols})
+            select {select_business_cols}, :run_id, now()
+            from staging."{table_name}" s
+            where s.run_id = :run_id
+            returning 1
+        )
+        select count(*) as inserted from inserted
         """
     )
+    row = conn.execute(sql, {"run_id": run_id}).mappings().one()
+    return PromoteCounts(inserted=int(row["inserted"]))
 
-    with engine.begin() as conn:
-        if cutoff is not None:
-            conn.execute(
-                text(f'delete from app."{table_name}" where "{watermark_column}" >= :cutoff'),
-                {"cutoff": cutoff},
-            )
-        conn.execute(insert_sql, params)
-        promoted_rows = conn.execute(count_sql, params).scalar_one()
 
-    incoming_max_iso = incoming_max.isoformat() if incoming_max is not None else None
-    return int(promoted_rows), cutoff_value, incoming_max_iso
+def _diff_window(
+    conn: Connection,
+    table_name: str,
+    business_columns: list[str],
+    run_id: str,
+    watermark_column: str,
+    cutoff: datetime,
+    row_hash: bool = False,
+) -> PromoteCounts:
+    # Incremental sem unique_keys: compara a janela por (hash, ocorrencia) e so apaga/insere as
+    # linhas que mudaram, preservando duplicadas; as inalteradas nem sao reescritas.
+    sql = build_multiset_diff_sql(
+        table_name,
+        business_columns,
+        source_filter_sql=f's."{watermark_column}" >= :cutoff',
+        app_filter_sql=f'a."{watermark_column}" >= :cutoff',
+        column_types=fetch_column_types(conn, "app", table_name),
+        stored_hash=row_hash,
+    )
+    row = conn.execute(text(sql), {"run_id": run_id, "cutoff": cutoff}).mappings().one()
+    return PromoteCounts(
+        inserted=int(row["inserted"]),
+        updated=int(row["updated"]),
+        deleted=int(row["deleted"]),
+        unchanged=int(row["unchanged"]),
+    )
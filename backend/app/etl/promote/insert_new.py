@@ -1,9 +1,19 @@
 from __future__ import annotations
 
 import re
+from typing import Any
 
 from sqlalchemy import text
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Connection, Engine
+
+from app.etl.promote.counts import PromoteCounts
+from app.etl.promote.row_hash import (
+    ROW_HASH_COLUMN,
+    fetch_column_types,
+    row_hash_sql,
+    typed_columns_sql,
+)
+from app.etl.promote.slicing import run_sliced
 
 IDENTIFIER_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
 
@@ -13,12 +23,15 @@ def _validate_identifier(value: str) -> None:
         raise ValueError(f"Invalid SQL identifier: {value}")
 
 
-def promote_insert_new(
-    engine: Engine,
+def run_insert_new(
+    conn: Connection,
     table_name: str,
     business_columns: list[str],
     run_id: str,
-) -> int:
+    row_hash: bool = False,
+    additional_filter_sql: str = "",
+    additional_params: dict[str, Any] | None = None,
+) -> PromoteCounts:
     _validate_identifier(table_name)
     for col in business_columns:
         _validate_identifier(col)
@@ -26,12 +39,20 @@ def promote_insert_new(
     quoted_insert_cols = ", ".join(f'"{col}"' for col in [*business_columns, "source_run_id", "updated_at"])
     quoted_business_cols = ", ".join(f'"{col}"' for col in business_columns)
 
+    where_clause = "s.run_id = :run_id"
+    if additional_filter_sql:
+        where_clause = f"{where_clause} and ({additional_filter_sql})"
+    params = {"run_id": run_id, **(additional_params or {})}
+
+    if row_hash:
+        return _insert_new_by_hash(conn, table_name, business_columns, where_clause, params)
+
     sql = text(
         f"""
         with incoming as (
             select distinct {quoted_business_cols}
             from staging."{table_name}" s
-            where s.run_id = :run_id
+            where {where_clause}
         ),
         to_insert as (
             select {quoted_business_cols}
@@ -46,11 +67,87 @@ def promote_insert_new(
             from to_insert
             returning 1
         )
-        select count(*) from inserted
+        select
+            (select count(*) from inserted) as inserted,
+            (select count(*) from incoming) - (select count(*) from inserted) as unchanged
         """
     )
 
+    row = conn.execute(sql, params).mappings().one()
+    return PromoteCounts(inserted=int(row["inserted"]), unchanged=int(row["unchanged"]))
+
+
+def promote_insert_new(
+    engine: Engine,
+    table_name: str,
+    business_columns: list[str],
+    run_id: str,
+    row_hash: bool = False,
+    batch_rows: int | None = None,
+) -> PromoteCounts:
+    if batch_rows:
+        _validate_identifier(table_name)
+
+        def _insert_new_slice(conn: Connection, slice_filter_sql: str, slice_params: dict[str, str]) -> PromoteCounts:
+            return run_insert_new(
+                conn,
+                table_name=table_name,
+                business_columns=business_columns,
+                run_id=run_id,
+                row_hash=row_hash,
+                additional_filter_sql=slice_filter_sql,
+                additional_params=slice_params,
+            )
+
+        return run_sliced(engine, table_name, run_id, batch_rows, _insert_new_slice)
+
     with engine.begin() as conn:
-        inserted_rows = conn.execute(sql, {"run_id": run_id}).scalar_one()
+        return run_insert_new(
+            conn,
+            table_name=table_name,
+            business_columns=business_columns,
+            run_id=run_id,
+            row_hash=row_hash,
+        )
+
 
-    return int(inserted_rows)
+def _insert_new_by_hash(
+    conn: Connection,
+    table_name: str,
+    business_columns: list[str],
+    where_clause: str,
+    params: dict[str, Any],
+) -> PromoteCounts:
+    quoted_insert_cols = ", ".join(f'"{col}"' for col in [*business_columns, "source_run_id", "updated_at"])
+    quoted_business_cols = ", ".join(f'"{col}"' for col in business_columns)
+    app_row = ", ".join(f'a."{col}"' for col in business_columns)
+    incoming_row = ", ".join(f'i."{col}"' for col in business_columns)
+
+    column_types = fetch_column_types(conn, "app", table_name)
+    # Indexed anti-join on row_hash; the row comparison only guards against hash collisions.
+    sql = text(
+        f"""
+        with incoming as (
+            select distinct {typed_columns_sql("s", business_columns, column_types)}
+            from staging."{table_name}" s
+            where {where_clause}
+        ),
+        inserted as (
+            insert into app."{table_name}" ({quoted_insert_cols})
+            select {quoted_business_cols}, :run_id, now()
+            from incoming i
+            where not exists (
+                select 1
+                from app."{table_name}" a
+                where a."{ROW_HASH_COLUMN}" = {row_hash_sql("i", business_columns)}
+                  and row({app_row}) is not distinct from row({incoming_row})
+            )
+            returning 1
+        )
+        select
+            (select count(*) from inserted) as inserted,
+            (select count(*) from incoming) - (select count(*) from inserted) as unchanged
+        """
+    )
+    row = conn.execute(sql, params).mappings().one()
+    return PromoteCounts(inserted=int(row["inserted"]), unchanged=int(row["unchanged"]))
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import re
+import time
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.etl.promote.counts import PromoteCounts
+
+IDENTIFIER_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+ANALYZE_CHANGE_RATIO = 0.05
+VACUUM_DEAD_RATIO = 0.10
+VACUUM_MIN_DEAD_TUPLES = 10_000
+NEW_HEAP_STRATEGIES = ("swap", "direct_copy_freeze")
+
+
+def _validate_identifier(value: str) -> None:
+    if not IDENTIFIER_RE.match(value):
+        raise ValueError(f"Invalid SQL identifier: {value}")
+
+
+@dataclass(frozen=True)
+class TableStats:
+    reltuples: float
+    live_tuples: int
+    dead_tuples: int
+    modified_since_analyze: int
+
+
+@dataclass(frozen=True)
+class MaintenancePlan:
+    action: str
+    reason: str
+    change_ratio: float
+    dead_ratio: float
+
+
+def plan_maintenance(counts: PromoteCounts, stats: TableStats) -> MaintenancePlan:
+    changed_rows = max(counts.rows_written, stats.modified_since_analyze)
+    change_ratio = changed_rows / max(stats.reltuples, 1.0)
+    dead_ratio = stats.dead_tuples / max(stats.live_tuples + stats.dead_tuples, 1)
+
+    if dead_ratio >= VACUUM_DEAD_RATIO and stats.dead_tuples >= VACUUM_MIN_DEAD_TUPLES:
+        return MaintenancePlan("vacuum_analyze", "dead_tuples", change_ratio, dead_ratio)
+    if counts.details.get("strategy") in NEW_HEAP_STRATEGIES:
+        # A swapped-in heap has no statistics of its own yet.
+        return MaintenancePlan("analyze", "new_heap", change_ratio, dead_ratio)
+    if changed_rows > 0 and (stats.reltuples <= 0 or change_ratio >= ANALYZE_CHANGE_RATIO):
+        return MaintenancePlan("analyze", "change_ratio", change_ratio, dead_ratio)
+    return MaintenancePlan("none", "below_thresholds", change_ratio, dead_ratio)
+
+
+def fetch_table_stats(engine: Engine, table_name: str) -> TableStats:
+    sql = text(
+        """
+        select
+            c.reltuples,
+            coalesce(s.n_live_tup, 0) as live_tuples,
+            coalesce(s.n_dead_tup, 0) as dead_tuples,
+            coalesce(s.n_mod_since_analyze, 0) as modified_since_analyze
+        from pg_class c
+        left join pg_stat_user_tables s on s.relid = c.oid
+        where c.oid = cast(:relation as regclass)
+        """
+    )
+    with engine.begin() as conn:
+        row = conn.execute(sql, {"relation": f'app."{table_name}"'}).mappings().one()
+    return TableStats(
+        reltuples=float(row["reltuples"]),
+        live_tuples=int(row["live_tuples"]),
+        dead_tuples=int(row["dead_tuples"]),
+        modified_since_analyze=int(row["modified_since_analyze"]),
+    )
+
+
+def run_post_promote_maintenance(engine: Engine, table_name: str, counts: PromoteCounts) -> dict[str, object]:
+    _validate_identifier(table_name)
+
+    stats = fetch_table_stats(engine, table_name)
+    plan = plan_maintenance(counts, stats)
+    details: dict[str, object] = {
+        "action": plan.action,
+        "reason": plan.reason,
+        "change_ratio": round(plan.change_ratio, 4),
+        "dead_ratio": round(plan.dead_ratio, 4),
+        "reltuples": stats.reltuples,
+        "dead_tuples": stats.dead_tuples,
+    }
+    if counts.details.get("strategy") == "partition_exchange":
+        return _maintain_partitions(engine, table_name, counts, details)
+    if plan.action == "none":
+        return details
+
+    statement = f'analyze app."{table_name}"'
+    if plan.action == "vacuum_analyze":
+        statement = f'vacuum (analyze) app."{table_name}"'
+
+    # VACUUM cannot run inside a transaction block.
+    started = time.perf_counter()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(statement))
+    details["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return details
+
+
+def _maintain_partitions(
+    engine: Engine,
+    table_name: str,
+    counts: PromoteCounts,
+    details: dict[str, object],
+) -> dict[str, object]:
+    # Closed months are frozen once after a rebuild so later vacuums skip them. The planner
+    # reads the parent's own statistics for queries across months, and ANALYZE on the parent
+    # also recurses into every partition, so one parent ANALYZE refreshes both.
+    rebuilt = [str(partition) for partition in counts.details.get("partitions_rebuilt") or []]
+    freeze = set(counts.details.get("freeze_partitions") or [])
+    statements = []
+    for partition in rebuilt:
+        _validate_identifier(partition)
+        if partition in freeze:
+            statements.append(f'vacuum (freeze) app."{partition}"')
+    if rebuilt:
+        statements.append(f'analyze app."{table_name}"')
+
+    details["action"] = "partitions" if statements else "none"
+    details["reason"] = "partition_exchange"
+    details["frozen_partitions"] = sorted(freeze)
+    started = time.perf_counter()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for statement in statements:
+            conn.execute(text(statement))
+    details["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return details
@@ -0,0 +1,349 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+import re
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.etl.promote.counts import PromoteCounts
+from app.etl.promote.full_replace import acquire_swap_lock, bounded_name, swap_index_sql
+from app.etl.promote.row_hash import fetch_column_types, row_hash_sql, typed_row_hash_sql
+from app.utils.timezone import now_brasilia
+
+IDENTIFIER_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+PARTITION_NAME_RE = re.compile(r"_p(\d{6}|default)$")
+
+
+def _validate_identifier(value: str) -> None:
+    if not IDENTIFIER_RE.match(value):
+        raise ValueError(f"Invalid SQL identifier: {value}")
+
+
+@dataclass(frozen=True)
+class MonthSlice:
+    month: date | None
+    row_count: int
+    fingerprint: str
+
+    @property
+    def suffix(self) -> str:
+        return self.month.strftime("%Y%m") if self.month is not None else "default"
+
+
+def partition_name(table_name: str, suffix: str) -> str:
+    return f"{table_name}_p{suffix}"
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + (month.month == 12), month.month % 12 + 1, 1)
+
+
+def _month_filter_sql(alias: str, partition_column: str, month: date | None) -> str:
+    if month is None:
+        return f'{alias}."{partition_column}" is null'
+    return f'{alias}."{partition_column}" >= :month_start and {alias}."{partition_column}" < :month_end'
+
+
+def _month_params(month: date | None) -> dict[str, object]:
+    if month is None:
+        return {}
+    # Untyped literals are coerced to the column type, which keeps the CHECK usable for ATTACH.
+    return {"month_start": month.isoformat(), "month_end": _next_month(month).isoformat()}
+
+
+def _staging_months(conn, table_name: str, business_columns: list[str], partition_column: str, run_id: str) -> list[MonthSlice]:
+    staging_hash = row_hash_sql("s", business_columns)
+    rows = conn.execute(
+        text(
+            f"""
+            select
+                date_trunc('month', s."{partition_column}")::date as month,
+                count(*) as row_count,
+                md5(string_agg({staging_hash}, ',' order by {staging_hash})) as fingerprint
+            from staging."{table_name}" s
+            where s.run_id = :run_id
+            group by 1
+            """
+        ),
+        {"run_id": run_id},
+    ).mappings().all()
+    return [MonthSlice(row["month"], int(row["row_count"]), row["fingerprint"]) for row in rows]
+
+
+def _current_partitions(conn, table_name: str) -> dict[str, str | None]:
+    # The staging fingerprint a partition was built from is kept as its table comment.
+    rows = conn.execute(
+        text(
+            """
+            select c.relname, obj_description(c.oid, 'pg_class') as fingerprint
+            from pg_inherits i
+            join pg_class c on c.oid = i.inhrelid
+            where i.inhparent = cast(:relation as regclass)
+            """
+        ),
+        {"relation": f'app."{table_name}"'},
+    ).mappings().all()
+    partitions: dict[str, str | None] = {}
+    for row in rows:
+        match = PARTITION_NAME_RE.search(row["relname"])
+        if match and row["relname"] == partition_name(table_name, match.group(1)):
+            partitions[match.group(1)] = row["fingerprint"]
+    return partitions
+
+
+def _is_partitioned(conn, table_name: str) -> bool:
+    return bool(
+        conn.execute(
+            text(
+                """
+                select exists (
+                    select 1
+                    from pg_partitioned_table p
+                    where p.partrelid = to_regclass(:relation)
+                )
+                """
+            ),
+            {"relation": f'app."{table_name}"'},
+        ).scalar_one()
+    )
+
+
+def _build_month(
+    conn,
+    table_name: str,
+    business_columns: list[str],
+    partition_column: str,
+    run_id: str,
+    month_slice: MonthSlice,
+    has_current: bool,
+) -> tuple[PromoteCounts, str]:
+    target = partition_name(table_name, month_slice.suffix)
+    build_table = bounded_name(f"__px{month_slice.suffix}", table_name, run_id)
+    quoted_business = ", ".join(f'"{col}"' for col in business_columns)
+    quoted_target = ", ".join([quoted_business, '"source_run_id"', '"updated_at"'])
+    select_incoming = ", ".join(f'i."{col}"' for col in business_columns)
+    # Staging is cast to the app types so unchanged rows hash the same on both sides.
+    incoming_hash = typed_row_hash_sql("s", business_columns, fetch_column_types(conn, "app", table_name))
+    current_hash = row_hash_sql("a", business_columns)
+    current_rows_sql = (
+        f"""
+        select
+            {current_hash} as row_hash,
+            row_number() over (partition by {current_hash} order by a."updated_at") as occurrence,
+            a."source_run_id",
+            a."updated_at"
+        from app."{target}" a
+        """
+        if has_current
+        else "select null::text as row_hash, null::bigint as occurrence, null::uuid as source_run_id, null::timestamptz as updated_at where false"
+    )
+    params = {"run_id": run_id, **_month_params(month_slice.month)}
+
+    with conn.connection.cursor() as cursor:
+        cursor.execute(f'drop table if exists app."{build_table}"')
+        cursor.execute(
+            f'create table app."{build_table}" (like app."{table_name}" including defaults including constraints)'
+        )
+
+    # Same carry-over as full_replace, scoped to one month.
+    row = conn.execute(
+        text(
+            f"""
+            with incoming as (
+                select
+                    {quoted_business},
+                    {incoming_hash} as row_hash,
+                    row_number() over (partition by {incoming_hash}) as occurrence
+                from staging."{table_name}" s
+                where s.run_id = :run_id and {_month_filter_sql("s", partition_column, month_slice.month)}
+            ),
+            current_rows as ({current_rows_sql}),
+            inserted as (
+                insert into app."{build_table}" ({quoted_target})
+                select
+                    {select_incoming},
+                    case when c.row_hash is null then cast(:run_id as uuid) else c."source_run_id" end,
+                    case when c.row_hash is null then now() else c."updated_at" end
+                from incoming i
+                left join current_rows c
+                  on c.row_hash = i.row_hash
+                 and c.occurrence = i.occurrence
+                returning "source_run_id" is distinct from cast(:run_id as uuid) as carried_over
+            )
+            select
+                count(*) filter (where not carried_over) as inserted,
+                count(*) filter (where carried_over) as unchanged,
+                (select count(*) from current_rows) - count(*) filter (where carried_over) as deleted
+            from inserted
+            """
+        ),
+        params,
+    ).mappings().one()
+
+    with conn.connection.cursor() as cursor:
+        if month_slice.month is not None:
+            # Lets ATTACH PARTITION skip the validation scan.
+            cursor.execute(
+                f'alter table app."{build_table}" add constraint "{build_table}_bounds" '
+                f'check ("{partition_column}" >= %(month_start)s and "{partition_column}" < %(month_end)s)',
+                params,
+            )
+
+        cursor.execute(
+            "select pg_get_indexdef(x.indexrelid) from pg_index x where x.indrelid = %s::regclass",
+            (f'app."{table_name}"',),
+        )
+        for position, (definition,) in enumerate(cursor.fetchall()):
+            index_name = bounded_name(f"__px{month_slice.suffix}_{position}", table_name, run_id)
+            cursor.execute(swap_index_sql(definition, index_name, build_table))
+
+    counts = PromoteCounts(
+        inserted=int(row["inserted"]),
+        deleted=int(row["deleted"]),
+        unchanged=int(row["unchanged"]),
+    )
+    return counts, build_table
+
+
+def _attach_month(
+    cursor,
+    table_name: str,
+    run_id: str,
+    month_slice: MonthSlice,
+    build_table: str,
+    has_current: bool,
+) -> str:
+    target = partition_name(table_name, month_slice.suffix)
+    params = {"run_id": run_id, **_month_params(month_slice.month)}
+    if has_current:
+        cursor.execute(f'alter table app."{table_name}" detach partition app."{target}"')
+        cursor.execute(f'drop table app."{target}"')
+    cursor.execute(f'alter table app."{build_table}" rename to "{target}"')
+    if month_slice.month is None:
+        cursor.execute(f'alter table app."{table_name}" attach partition app."{target}" default')
+    else:
+        cursor.execute(
+            f'alter table app."{table_name}" attach partition app."{target}" '
+            "for values from (%(month_start)s) to (%(month_end)s)",
+            params,
+        )
+    cursor.execute(f'alter table app."{target}" enable row level security')
+    cursor.execute(f'revoke all on table app."{target}" from anon, authenticated')
+    cursor.execute(f'comment on table app."{target}" is %s', (month_slice.fingerprint,))
+    return target
+
+
+def promote_partition_exchange(
+    engine: Engine,
+    table_name: str,
+    business_columns: list[str],
+    partition_column: str,
+    run_id: str,
+) -> PromoteCounts:
+    _validate_identifier(table_name)
+    _validate_identifier(partition_column)
+    for col in business_columns:
+        _validate_identifier(col)
+
+    current_month = now_brasilia().date().replace(day=1)
+    totals = PromoteCounts()
+    rebuilt: list[str] = []
+    freeze_partitions: list[str] = []
+    dropped: list[str] = []
+    skipped = 0
+    lock_stats: dict[str, object] = {}
+
+    # One transaction for the whole table: changed months are built first without touching
+    # the parent, then every detach/attach happens under a single swap lock, so readers see
+    # either the old table or the new one, never a mix of months.
+    with engine.begin() as conn:
+        if not _is_partitioned(conn, table_name):
+            raise ValueError(
+                f"[{table_name}] partition_exchange requires app.{table_name} to be partitioned by month; "
+                "run set statement_timeout = 0; "
+                f"select app.convert_to_monthly_partitions('{table_name}', '{partition_column}') once"
+            )
+        months = _staging_months(conn, table_name, business_columns, partition_column, run_id)
+        partitions = _current_partitions(conn, table_name)
+
+        builds: list[tuple[MonthSlice, str]] = []
+        # Months whose staging fingerprint matches the one recorded on the partition are left untouched.
+        for month_slice in sorted(months, key=lambda m: (m.month is None, m.month or date.min)):
+            if partitions.get(month_slice.suffix) == month_slice.fingerprint:
+                totals.unchanged += month_slice.row_count
+                skipped += 1
+                continue
+
+            counts, build_table = _build_month(
+                conn,
+                table_name=table_name,
+                business_columns=business_columns,
+                partition_column=partition_column,
+                run_id=run_id,
+                month_slice=month_slice,
+                has_current=month_slice.suffix in partitions,
+            )
+            totals.inserted += counts.inserted
+            totals.deleted += counts.deleted
+            totals.unchanged += counts.unchanged
+            builds.append((month_slice, build_table))
+
+        staged_suffixes = {month_slice.suffix for month_slice in months}
+        # The default partition stays attached (it takes null and out-of-range dates); when
+        # the load has none of those it is only emptied.
+        vanished = [
+            partition_name(table_name, suffix)
+            for suffix in sorted(set(partitions) - staged_suffixes - {"default"})
+        ]
+        stale_default = "default" in partitions and "default" not in staged_suffixes
+        default_rows = 0
+        if stale_default:
+            default_rows = int(
+                conn.execute(text(f'select count(*) from app."{partition_name(table_name, "default")}"')).scalar_one()
+            )
+            totals.deleted += default_rows
+        empty_default = stale_default and (default_rows > 0 or partitions["default"] is not None)
+
+        if builds or vanished or empty_default:
+            with conn.connection.cursor() as cursor:
+                for target in vanished:
+                    cursor.execute(f'select count(*) from app."{target}"')
+                    totals.deleted += int(cursor.fetchone()[0])
+
+                lock_stats = acquire_swap_lock(cursor, table_name)
+                for month_slice, build_table in builds:
+                    target = _attach_month(
+                        cursor,
+                        table_name,
+                        run_id,
+                        month_slice,
+                        build_table,
+                        has_current=month_slice.suffix in partitions,
+                    )
+                    rebuilt.append(target)
+                    if month_slice.month is not None and month_slice.month < current_month:
+                        freeze_partitions.append(target)
+                for target in vanished:
+                    cursor.execute(f'alter table app."{table_name}" detach partition app."{target}"')
+                    cursor.execute(f'drop table app."{target}"')
+                    dropped.append(target)
+                if empty_default:
+                    target = partition_name(table_name, "default")
+                    cursor.execute(f'truncate table app."{target}"')
+                    cursor.execute(f'comment on table app."{target}" is null')
+
+    totals.details.update(
+        {
+            "strategy": "partition_exchange",
+            "partition_column": partition_column,
+            "partitions_rebuilt": rebuilt,
+            "partitions_skipped": skipped,
+            "partitions_dropped": dropped,
+            "default_emptied": empty_default,
+            "freeze_partitions": freeze_partitions,
+            **lock_stats,
+        }
+    )
+    return totals
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+ROW_HASH_COLUMN = "row_hash"
+
+
+def row_hash_sql(alias: str, columns: list[str]) -> str:
+    quoted = ", ".join(f'{alias}."{col}"' for col in columns)
+    return f"md5(row({quoted})::text)"
+
+
+def _typed_column(alias: str, col: str, column_types: dict[str, str]) -> str:
+    if col not in column_types:
+        return f'{alias}."{col}"'
+    return f'cast({alias}."{col}" as {column_types[col]})'
+
+
+# Staging columns are cast to the app types so the hash text matches the one the
+# app.<table>_set_row_hash trigger computes (V509/V520).
+def typed_columns_sql(alias: str, columns: list[str], column_types: dict[str, str]) -> str:
+    return ", ".join(
+        f'{_typed_column(alias, col, column_types)} as "{col}"' for col in columns
+    )
+
+
+def typed_row_hash_sql(alias: str, columns: list[str], column_types: dict[str, str]) -> str:
+    typed = ", ".join(_typed_column(alias, col, column_types) for col in columns)
+    return f"md5(row({typed})::text)"
+
+
+def fetch_column_types(conn: Connection, schema: str, table_name: str) -> dict[str, str]:
+    rows = conn.execute(
+        text(
+            """
+            select a.attname, format_type(a.atttypid, a.atttypmod)
+            from pg_attribute a
+            where a.attrelid = to_regclass(:relation)
+              and a.attnum > 0
+              and not a.attisdropped
+            """
+        ),
+        {"relation": f'{schema}."{table_name}"'},
+    ).fetchall()
+    if not rows:
+        raise ValueError(f"Table not found: {schema}.{table_name}")
+    return {str(row[0]): str(row[1]) for row in rows}
+
+
+def install_row_hash(engine: Engine, table_name: str, columns: list[str], with_index: bool) -> None:
+    # The trigger column list comes from TableSpec.business_columns, the same list the
+    # promote hashes, so both sides always agree (V520).
+    with engine.begin() as conn:
+        conn.execute(
+            text("select app.install_row_hash(:table_name, :columns, :with_index)"),
+            {"table_name": table_name, "columns": columns, "with_index": with_index},
+        )
+
+
+def has_row_hash_column(conn: Connection, table_name: str) -> bool:
+    return bool(
+        conn.execute(
+            text(
+                """
+                select exists (
+                    select 1
+                    from pg_attribute a
+                    where a.attrelid = to_regclass(:relation)
+                      and a.attname = :column
+                      and not a.attisdropped
+                )
+                """
+            ),
+            {"relation": f'app."{table_name}"', "column": ROW_HASH_COLUMN},
+        ).scalar_one()
+    )
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import time
+from typing import Callable
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.etl.load.staging_loader import run_staging_table
+from app.etl.promote.counts import PromoteCounts
+
+CTID_SLICE_FILTER_SQL = "s.ctid >= cast(:slice_start as tid) and s.ctid < cast(:slice_end as tid)"
+
+
+@dataclass(frozen=True)
+class StagingSlice:
+    index: int
+    first_page: int
+    end_page: int
+
+    def params(self) -> dict[str, str]:
+        return {
+            "slice_start": f"({self.first_page},0)",
+            "slice_end": f"({self.end_page},0)",
+        }
+
+
+def plan_page_slices(total_pages: int, row_count: int, batch_rows: int) -> list[StagingSlice]:
+    if batch_rows <= 0:
+        raise ValueError("batch_rows must be > 0")
+    if row_count <= 0 or total_pages <= 0:
+        return []
+
+    pages_per_slice = max(1, (total_pages * batch_rows) // row_count)
+    slices: list[StagingSlice] = []
+    for index, first_page in enumerate(range(0, total_pages, pages_per_slice)):
+        slices.append(
+            StagingSlice(
+                index=index,
+                first_page=first_page,
+                end_page=min(first_page + pages_per_slice, total_pages),
+            )
+        )
+    return slices
+
+
+def staging_page_slices(engine: Engine, table_name: str, run_id: str, batch_rows: int) -> list[StagingSlice]:
+    # Each run loads its own staging partition, so that heap holds only this run and
+    # ctid page ranges split it into batches of roughly batch_rows rows.
+    partition = run_staging_table(table_name, run_id)
+    relation = f'staging."{partition}"'
+    with engine.begin() as conn:
+        # An empty load never creates its partition: nothing to slice.
+        if conn.execute(text("select to_regclass(:relation)"), {"relation": relation}).scalar_one() is None:
+            return []
+    sql = text(
+        f"""
+        select
+            (select count(*) from staging."{partition}") as row_count,
+            pg_relation_size(cast(:relation as regclass)) / current_setting('block_size')::bigint as total_pages
+        """
+    )
+    with engine.begin() as conn:
+        row = conn.execute(sql, {"relation": relation}).mappings().one()
+    return plan_page_slices(int(row["total_pages"]), int(row["row_count"]), batch_rows)
+
+
+def run_sliced(
+    engine: Engine,
+    table_name: str,
+    run_id: str,
+    batch_rows: int,
+    promote_slice: Callable[[Connection, str, dict[str, str]], PromoteCounts],
+) -> PromoteCounts:
+    slices = staging_page_slices(engine, table_name, run_id, batch_rows)
+    totals = PromoteCounts()
+    batches: list[dict[str, object]] = []
+
+    for staging_slice in slices:
+        started = time.perf_counter()
+        try:
+            # Each slice commits on its own so row locks and WAL stay bounded per batch.
+            with engine.begin() as conn:
+                counts = promote_slice(conn, CTID_SLICE_FILTER_SQL, staging_slice.params())
+        except Exception as exc:
+            # Rows already promoted carry source_run_id = run_id and can be traced back.
+            raise RuntimeError(
+                f"[{table_name}] sliced promote stopped at batch {staging_slice.index + 1}/{len(slices)} "
+                f"({staging_slice.index} committed, source_run_id={run_id}): {exc}"
+            ) from exc
+
+        totals.inserted += counts.inserted
+        totals.updated += counts.updated
+        totals.deleted += counts.deleted
+        totals.unchanged += counts.unchanged
+        batches.append(
+            {
+                "batch": staging_slice.index + 1,
+                "pages": [staging_slice.first_page, staging_slice.end_page],
+                "rows_written": counts.rows_written,
+                "rows_matched": counts.rows_matched,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+        )
+
+    totals.details.update(
+        {
+            "batch_rows": batch_rows,
+            "batches_total": len(slices),
+            "batches_committed": len(batches),
+            "batches": batches,
+        }
+    )
+    return totals
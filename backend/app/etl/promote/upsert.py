@@ -4,7 +4,11 @@ import re
 from typing import Any
 
 from sqlalchemy import text
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Connection, Engine
+
+from app.etl.promote.counts import PromoteCounts
+from app.etl.promote.row_hash import ROW_HASH_COLUMN, row_hash_sql
+from app.etl.promote.slicing import run_sliced
 
 IDENTIFIER_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
 
@@ -14,15 +18,16 @@ def _validate_identifier(value: str) -> None:
         raise ValueError(f"Invalid SQL identifier: {value}")
 
 
-def promote_upsert(
-    engine: Engine,
+def run_upsert(
+    conn: Connection,
     table_name: str,
     business_columns: list[str],
     unique_keys: list[str],
     run_id: str,
     additional_filter_sql: str = "",
     additional_params: dict[str, Any] | None = None,
-) -> int:
+    row_hash: bool = False,
+) -> PromoteCounts:
     _validate_identifier(table_name)
     for col in business_columns + unique_keys:
         _validate_identifier(col)
@@ -34,7 +39,7 @@ def promote_upsert(
 
     insert_cols = business_columns + ["source_run_id", "updated_at"]
     quoted_insert_cols = ", ".join(f'"{col}"' for col in insert_cols)
-    select_business_cols = ", ".join(f's."{col}"' for col in business_columns)
+    quoted_business_cols = ", ".join(f'"{col}"' for col in business_columns)
 
     where_clause = "s.run_id = :run_id"
     if additional_filter_sql:
@@ -52,34 +57,135 @@ def promote_upsert(
     )
     set_clause = ", ".join(set_assignments)
 
-    distinct_predicates = [
-        f'app."{table_name}"."{col}" is distinct from EXCLUDED."{col}"'
-        for col in update_cols
-    ]
-    distinct_clause = " or ".join(distinct_predicates) if distinct_predicates else "false"
+    if row_hash and update_cols:
+        # EXCLUDED already carries the app column types, so its hash matches the stored one.
+        distinct_clause = (
+            f'app."{table_name}"."{ROW_HASH_COLUMN}" is distinct from '
+            f'{row_hash_sql("EXCLUDED", business_columns)}'
+        )
+    else:
+        distinct_predicates = [
+            f'app."{table_name}"."{col}" is distinct from EXCLUDED."{col}"'
+            for col in update_cols
+        ]
+        distinct_clause = " or ".join(distinct_predicates) if distinct_predicates else "false"
 
+    # xmax = 0 only for freshly inserted tuples; rows skipped by the WHERE are not returned.
     sql = f"""
-    insert into app."{table_name}" ({quoted_insert_cols})
-    select {select_business_cols}, :run_id, now()
-    from staging."{table_name}" s
-    where {where_clause}
-    on conflict ({conflict_cols}) do update
-    set {set_clause}
-    where {distinct_clause}
+    with incoming as materialized (
+        select {quoted_business_cols}
+        from staging."{table_name}" s
+        where {where_clause}
+    ),
+    upserted as (
+        insert into app."{table_name}" ({quoted_insert_cols})
+        select {quoted_business_cols}, :run_id, now()
+        from incoming
+        on conflict ({conflict_cols}) do update
+        set {set_clause}
+        where {distinct_clause}
+        returning (xmax = 0) as was_inserted
+    )
+    select
+        count(*) filter (where was_inserted) as inserted,
+        count(*) filter (where not was_inserted) as updated,
+        (select count(*) from incoming) - count(*) as unchanged
+    from upserted
     """
 
     params = {"run_id": run_id, **extra_params}
+    row = conn.execute(text(sql), params).mappings().one()
+
+    return PromoteCounts(
+        inserted=int(row["inserted"]),
+        updated=int(row["updated"]),
+        unchanged=int(row["unchanged"]),
+    )
+
+
+def run_sweep(
+    conn: Connection,
+    table_name: str,
+    unique_keys: list[str],
+    run_id: str,
+    app_filter_sql: str = "",
+    additional_params: dict[str, Any] | None = None,
+) -> int:
+    _validate_identifier(table_name)
+    for col in unique_keys:
+        _validate_identifier(col)
+    if not unique_keys:
+        raise ValueError(f"[{table_name}] sweep requires unique_keys")
+
+    key_match = " and ".join(f's."{col}" = a."{col}"' for col in unique_keys)
+    # App rows whose key is absent from this run are removed. Rows this run wrote are always
+    # kept: a NULL key never matches with "=" and never conflicts in the upsert, so those rows
+    # are re-inserted each run and only their older copies go. Keeping "=" lets the planner
+    # hash the run's staging partition once (hash anti-join); no staging index is needed.
+    sql = f"""
+    with deleted as (
+        delete from app."{table_name}" a
+        where {app_filter_sql or "true"}
+          and a."source_run_id" is distinct from cast(:run_id as uuid)
+          and not exists (
+              select 1
+              from staging."{table_name}" s
+              where s.run_id = :run_id
+                and {key_match}
+          )
+        returning 1
+    )
+    select count(*) from deleted
+    """
+    params = {"run_id": run_id, **(additional_params or {})}
+    return int(conn.execute(text(sql), params).scalar_one())
+
+
+def promote_upsert(
+    engine: Engine,
+    table_name: str,
+    business_columns: list[str],
+    unique_keys: list[str],
+    run_id: str,
+    additional_filter_sql: str = "",
+    additional_params: dict[str, Any] | None = None,
+    row_hash: bool = False,
+    batch_rows: int | None = None,
+    sweep: bool = False,
+) -> PromoteCounts:
+    if batch_rows:
+        _validate_identifier(table_name)
+
+        def _upsert_slice(conn: Connection, slice_filter_sql: str, slice_params: dict[str, str]) -> PromoteCounts:
+            filter_sql = f"({additional_filter_sql}) and {slice_filter_sql}" if additional_filter_sql else slice_filter_sql
+            return run_upsert(
+                conn,
+                table_name=table_name,
+                business_columns=business_columns,
+                unique_keys=unique_keys,
+                run_id=run_id,
+                additional_filter_sql=filter_sql,
+                additional_params={**(additional_params or {}), **slice_params},
+                row_hash=row_hash,
+            )
+
+        counts = run_sliced(engine, table_name, run_id, batch_rows, _upsert_slice)
+        if sweep:
+            with engine.begin() as conn:
+                counts.deleted = run_sweep(conn, table_name, unique_keys, run_id)
+        return counts
+
     with engine.begin() as conn:
-        conn.execute(text(sql), params)
-        promoted_rows = conn.execute(
-            text(
-                f"""
-                select count(*)
-                from staging."{table_name}" s
-                where {where_clause}
-                """
-            ),
-            params,
-        ).scalar_one()
-
-    return int(promoted_rows)
+        counts = run_upsert(
+            conn,
+            table_name=table_name,
+            business_columns=business_columns,
+            unique_keys=unique_keys,
+            run_id=run_id,
+            additional_filter_sql=additional_filter_sql,
+            additional_params=additional_params,
+            row_hash=row_hash,
+        )
+        if sweep:
+            counts.deleted = run_sweep(conn, table_name, unique_keys, run_id)
+        return counts
@@ -108,6 +108,7 @@ def apply_type_casts(
                     "source_row_number": int(row.get("source_row_number") or 0),
                     "reason_code": "type_cast_error",
                     "reason_detail": f"Invalid value for column '{column}' as {desired_type}",
+                    "column_name": column,
                     "payload": _safe_payload(row),
                 }
             )
@@ -35,6 +35,7 @@ def validate_frame(
     required_columns: list[str],
     unique_keys: list[str],
     dedupe_order_by: list[str] | None = None,
+    reject_null_keys: bool = False,
 ) -> ValidationOutcome:
     for col in required_columns:
         if col not in frame.columns:
@@ -56,6 +57,7 @@ def validate_frame(
                     "source_row_number": int(row.get("source_row_number") or 0),
                     "reason_code": "required_null",
                     "reason_detail": f"Required columns null: {', '.join(missing_cols)}",
+                    "column_name": ",".join(missing_cols),
                     "payload": _safe_payload(row),
                 }
             )
@@ -68,6 +70,24 @@ def validate_frame(
             if key not in valid_frame.columns:
                 raise ValueError(f"[{table_name}] unique key column missing: {key}")
 
+    if unique_keys and reject_null_keys:
+        null_keys = valid_frame[unique_keys].isna()
+        null_any = null_keys.any(axis=1)
+        for idx in valid_frame.index[null_any]:
+            row = valid_frame.loc[idx]
+            null_cols = [col for col in unique_keys if bool(null_keys.loc[idx, col])]
+            rejection_records.append(
+                {
+                    "table_name": table_name,
+                    "source_row_number": int(row.get("source_row_number") or 0),
+                    "reason_code": "unique_key_null",
+                    "reason_detail": f"Unique key columns null: {', '.join(null_cols)}",
+                    "column_name": ",".join(null_cols),
+                    "payload": _safe_payload(row),
+                }
+            )
+        valid_frame = valid_frame.loc[~null_any].copy()
+
     dedupe_result = deduplicate_frame(valid_frame, unique_keys, dedupe_order_by)
     duplicates = dedupe_result.duplicates
     valid_frame = dedupe_result.frame
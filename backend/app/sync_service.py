@@ -1,27 +1,36 @@
 from __future__ import annotations
 
-from contextlib import nullcontext
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
 
 import pandas as pd
-from sqlalchemy import text
 from sqlalchemy.engine import Engine
 
+from app.audit.buffered import BufferedAuditWriter
+from app.audit.models import StepCounters
+from app.audit.reconcile import RECONCILABLE_MODES, reconcile_table
+from app.audit.retention import maintain_audit_partitions
+from app.audit.snapshots import load_source_fingerprints
 from app.audit.writer import AuditWriter
 from app.config.models import RuntimeConfig, TableConfig
+from app.connectors.db import table_lock
 from app.ddl.migrator import apply_migrations
-from app.etl.extract.readers import read_source_dataframe
 from app.etl.load.staging_loader import clear_staging_for_run, load_dataframe_to_staging
-from app.etl.promote.full_replace import promote_full_replace
+from app.etl.pipeline import prefetched, process_pool
+from app.etl.prepare import prepare_table_frames
+from app.etl.promote.cd_scope import CD_SCOPE_FILTER_SQL, promote_cd_scoped
+from app.etl.promote.counts import PromoteCounts
+from app.etl.promote.full_replace import promote_full_replace, promote_full_replace_direct
+from app.etl.promote.full_replace_delta import promote_full_replace_delta
 from app.etl.promote.incremental import promote_incremental
 from app.etl.promote.insert_new import promote_insert_new
+from app.etl.promote.maintenance import run_post_promote_maintenance
+from app.etl.promote.partition_exchange import promote_partition_exchange
+from app.etl.promote.row_hash import has_row_hash_column, install_row_hash
 from app.etl.promote.upsert import promote_upsert
 from app.etl.table_specs import get_table_spec
-from app.etl.transform.cast import apply_type_casts
-from app.etl.transform.normalize import normalize_dataframe, snake_case
-from app.etl.transform.table_rules import apply_table_specific_rules
-from app.etl.transform.validate import validate_frame
+from app.etl.transform.normalize import snake_case
 from app.refresh.excel_refresh import refresh_excel_file
 from app.utils.hashers import sha256_file
 from app.utils.machine_id import get_machine_id
@@ -37,11 +46,29 @@ class CommandResult:
     table_errors: dict[str, str] = field(default_factory=dict)
 
 
+@dataclass
+class PreparedTable:
+    table_name: str
+    table_cfg: TableConfig
+    source_fingerprint: dict[str, object] | None
+    skipped: bool = False
+    frame: pd.DataFrame | None = None
+    rows_in: int = 0
+    rejected_rows: int = 0
+
+
 class SyncService:
     def __init__(self, engine: Engine, config: RuntimeConfig, app_version: str = "1.0.0"):
         self.engine = engine
         self.config = config
-        self.audit = AuditWriter(engine)
+        if config.app.audit_mode == "buffered":
+            self.audit = BufferedAuditWriter(
+                engine,
+                journal_dir=config.audit_journal_dir_path,
+                flush_interval_seconds=config.app.audit_flush_seconds,
+            )
+        else:
+            self.audit = AuditWriter(engine)
         self.app_version = app_version
         self.logger = get_logger()
         self._last_source_fingerprints: dict[str, dict[str, object]] | None = None
@@ -76,6 +103,21 @@ class SyncService:
                     "skipped_versions": [item.version for item in migration_results if not item.applied],
                 }
 
+            row_hash_tables = [name for name, table_cfg in self.config.tables.items() if table_cfg.row_hash]
+            if row_hash_tables:
+                with self.audit.step(run_id, "maintenance", "row_hash") as counters:
+                    for table_name in row_hash_tables:
+                        # insert_new looks rows up by hash, so only that mode needs the index.
+                        install_row_hash(
+                            self.engine,
+                            table_name,
+                            get_table_spec(table_name).business_columns,
+                            with_index=self.config.tables[table_name].mode == "insert_new",
+                        )
+                    counters.rows_in = len(row_hash_tables)
+                    counters.rows_out = len(row_hash_tables)
+                    counters.details = {"tables": row_hash_tables}
+
             self.audit.finish_run(run_id, "success", notes="bootstrap completed")
             return CommandResult(run_id=run_id, status="success", message="bootstrap completed")
         except Exception as exc:
@@ -147,6 +189,93 @@ class SyncService:
             force_tables=force_tables,
         )
 
+    def reconcile(self, table_filter: list[str] | None = None) -> CommandResult:
+        selected_tables = self._normalize_table_names(table_filter)
+        if selected_tables:
+            unknown_tables = selected_tables - set(self.config.tables.keys())
+            if unknown_tables:
+                joined = ", ".join(sorted(unknown_tables))
+                raise ValueError(f"Unknown table(s) in table_filter: {joined}")
+
+        run_id = self.audit.start_run(
+            app_version=self.app_version,
+            machine_id=self._machine_id,
+            config_hash=self._config_hash,
+            notes="reconcile",
+            triggered_by="reconcile",
+        )
+
+        errors: list[str] = []
+        table_errors: dict[str, str] = {}
+        try:
+            for table_name, table_cfg in self.config.tables.items():
+                if selected_tables and table_name not in selected_tables:
+                    continue
+                try:
+                    result = self._reconcile_table(table_name, table_cfg)
+                    self.audit.write_metadata(run_id, table_name, "reconcile", result)
+                    self.logger.info(
+                        "table={} reconcile={} buckets={} rows_fetched={}",
+                        table_name,
+                        result["status"],
+                        result.get("buckets_compared", 0),
+                        result.get("rows_fetched", 0),
+                    )
+                    if result["status"] == "mismatch":
+                        summary = (
+                            f"mismatch missing={result['rows_missing']} extra={result['rows_extra']} "
+                            f"changed={result['keys_changed']}"
+                        )
+                        errors.append(f"{table_name}: {summary}")
+                        table_errors[table_name] = summary
+                except Exception as table_exc:
+                    summary = " ".join(str(table_exc).splitlines()).strip()
+                    errors.append(f"{table_name}: {summary}")
+                    table_errors[table_name] = summary
+                    self.logger.exception("table reconcile failed: {}", table_name)
+
+            status = "partial" if errors else "success"
+            notes = "; ".join(errors) if errors else "reconcile completed"
+            if len(notes) > 2000:
+                notes = f"{notes[:1997]}..."
+            self.audit.finish_run(run_id, status, notes=notes)
+            return CommandResult(
+                run_id=run_id,
+                status=status,
+                message=notes,
+                errors=errors,
+                table_errors=table_errors,
+            )
+        except Exception as exc:
+            self.audit.finish_run(run_id, "failed", notes=str(exc))
+            raise
+
+    def _reconcile_table(self, table_name: str, table_cfg: TableConfig) -> dict[str, object]:
+        mode = table_cfg.mode or self.config.app.default_sync_mode
+        if mode not in RECONCILABLE_MODES:
+            return {"status": "skipped", "reason": f"{mode} keeps rows the source no longer has"}
+
+        spec = get_table_spec(table_name)
+        # Read-only check: no validate step, rejections or fingerprints for this run.
+        valid_frame = prepare_table_frames(*self._prepare_args(table_name, table_cfg)).valid
+        scope_filter_sql = ""
+        scope_params: dict[str, object] = {}
+        if table_cfg.cd_scope:
+            # Only this machine's CDs are in its file.
+            scope_filter_sql = CD_SCOPE_FILTER_SQL
+            scope_params = {"scope_cds": sorted({int(cd) for cd in valid_frame["cd"].dropna()})}
+
+        return reconcile_table(
+            self.engine,
+            table_name=table_name,
+            frame=valid_frame,
+            business_columns=spec.business_columns,
+            key_columns=self._normalize_list(table_cfg.unique_keys) or spec.business_columns,
+            sql_types=self._effective_types(table_name, table_cfg),
+            scope_filter_sql=scope_filter_sql,
+            scope_params=scope_params,
+        )
+
     def _normalize_list(self, values: list[str]) -> list[str]:
         return [snake_case(value) for value in values]
 
@@ -168,91 +297,64 @@ class SyncService:
         merged.update({snake_case(k): v for k, v in table_cfg.types.items()})
         return merged
 
-    def _drop_fully_empty_business_rows(
-        self,
-        table_name: str,
-        frame: pd.DataFrame,
-    ) -> tuple[pd.DataFrame, int]:
-        spec = get_table_spec(table_name)
-        business_columns = [col for col in spec.business_columns if col in frame.columns]
-        if not business_columns:
-            return frame, 0
-
-        empty_mask = frame[business_columns].isna().all(axis=1)
-        dropped_count = int(empty_mask.sum())
-        if dropped_count == 0:
-            return frame, 0
-
-        return frame.loc[~empty_mask].copy(), dropped_count
+    def _prepare_args(self, table_name: str, table_cfg: TableConfig) -> tuple[object, ...]:
+        return (
+            table_name,
+            table_cfg,
+            self.config.data_dir_path,
+            self._effective_types(table_name, table_cfg),
+            self._normalize_list(table_cfg.required_columns),
+            self._normalize_list(table_cfg.unique_keys),
+            self._normalize_list(table_cfg.dedupe_order_by),
+        )
 
     def _prepare_table_dataset(
         self,
         run_id: str,
         table_name: str,
         table_cfg: TableConfig,
+        pool: Executor | None = None,
+        frames_future: Future | None = None,
+        record_fingerprints: bool = True,
     ) -> tuple[pd.DataFrame, int, int]:
         with self.audit.step(run_id, "validate", table_name) as counters:
-            raw = read_source_dataframe(table_name, table_cfg, self.config.data_dir_path)
-            normalized, dropped_headers = normalize_dataframe(raw)
-
-            cast_result = apply_type_casts(
-                normalized,
-                table_name,
-                self._effective_types(table_name, table_cfg),
-            )
-            prepared_frame, dropped_empty_rows = self._drop_fully_empty_business_rows(
-                table_name,
-                cast_result.frame,
-            )
-            prepared_frame, table_rule_stats = apply_table_specific_rules(
-                table_name,
-                prepared_frame,
-            )
-
             required = self._normalize_list(table_cfg.required_columns)
             unique_keys = self._normalize_list(table_cfg.unique_keys)
-            dedupe_order = self._normalize_list(table_cfg.dedupe_order_by)
-
-            validation = validate_frame(
-                table_name=table_name,
-                frame=prepared_frame,
-                required_columns=required,
-                unique_keys=unique_keys,
-                dedupe_order_by=dedupe_order,
-            )
-
-            rejections = pd.concat(
-                [
-                    cast_result.rejections,
-                    validation.rejections,
-                ],
-                ignore_index=True,
+            if frames_future is None and pool is not None:
+                frames_future = pool.submit(prepare_table_frames, *self._prepare_args(table_name, table_cfg))
+            frames = (
+                frames_future.result()
+                if frames_future is not None
+                else prepare_table_frames(*self._prepare_args(table_name, table_cfg))
             )
 
+            rejection_details: dict[str, object] = {}
             rejected_rows = self.audit.write_rejections(
                 run_id=run_id,
                 table_name=table_name,
-                rejections=rejections,
+                rejections=frames.rejections,
                 rejections_dir=self.config.rejections_dir_path,
                 retention_days=self.config.app.rejections_retention_days,
+                payload_sample=self.config.app.rejections_payload_sample,
+                dedupe=self.config.app.rejections_dedupe,
+                details=rejection_details,
+                record_fingerprints=record_fingerprints,
             )
 
-            valid = validation.valid_frame.copy()
-            valid["source_file"] = raw["source_file"]
-            valid["source_row_number"] = raw["source_row_number"]
-
-            counters.rows_in = validation.rows_in
-            counters.rows_out = validation.rows_out
+            counters.rows_in = frames.rows_in
+            counters.rows_out = frames.rows_out
             counters.rows_rejected = rejected_rows
             counters.details = {
-                "dropped_headers": dropped_headers,
-                "dropped_empty_rows": dropped_empty_rows,
-                "table_rule_stats": table_rule_stats,
+                "dropped_headers": frames.dropped_headers,
+                "dropped_empty_rows": frames.dropped_empty_rows,
+                "table_rule_stats": frames.table_rule_stats,
                 "required_columns": required,
                 "unique_keys": unique_keys,
+                "prepare_process": pool is not None,
+                **rejection_details,
             }
 
-            return valid, validation.rows_in, rejected_rows
+            return frames.valid, frames.rows_in, rejected_rows
 
     def _source_fingerprint(self, table_cfg: TableConfig) -> dict[str, object] | None:
         source_path = self.config.data_dir_path / table_cfg.file
@@ -268,36 +370,23 @@ class SyncService:
         }
 
     def _load_last_source_fingerprints(self) -> dict[str, dict[str, object]]:
-        sql = text(
-            """
-            select distinct on (m.table_name)
-                m.table_name,
-                m.meta_value
-            from audit.runs_metadata m
-            join audit.runs r
-              on r.run_id = m.run_id
-            where m.meta_key = 'source_fingerprint'
-              and r.triggered_by = 'sync'
-              and r.status in ('success', 'partial')
-            order by m.table_name, r.started_at desc
-            """
-        )
-
         with self.engine.begin() as conn:
-            rows = conn.execute(sql).mappings().all()
-
-        fingerprints: dict[str, dict[str, object]] = {}
-        for row in rows:
-            value = row["meta_value"]
-            if isinstance(value, dict):
-                fingerprints[str(row["table_name"])] = value
-        return fingerprints
+            return load_source_fingerprints(conn)
 
     def _get_last_source_fingerprint(self, table_name: str) -> dict[str, object] | None:
         if self._last_source_fingerprints is None:
             self._last_source_fingerprints = self._load_last_source_fingerprints()
         return self._last_source_fingerprints.get(table_name)
 
+    def _source_unchanged(self, table_name: str, source_fingerprint: dict[str, object] | None) -> bool:
+        if not source_fingerprint:
+            return False
+        previous_fingerprint = self._get_last_source_fingerprint(table_name)
+        return bool(previous_fingerprint) and self._same_source_fingerprint(
+            previous_fingerprint,
+            source_fingerprint,
+        )
+
     def _same_source_fingerprint(
         self,
         previous: dict[str, object],
@@ -315,39 +404,248 @@ class SyncService:
             and _as_int(previous.get("mtime_ns")) == _as_int(current.get("mtime_ns"))
         )
 
+    def _record_source_fingerprint(
+        self,
+        run_id: str,
+        table_name: str,
+        source_fingerprint: dict[str, object],
+    ) -> None:
+        self.audit.write_metadata(
+            run_id,
+            table_name,
+            "source_fingerprint",
+            source_fingerprint,
+        )
+        if self._last_source_fingerprints is not None:
+            self._last_source_fingerprints[table_name] = source_fingerprint
+
+    def _uses_direct_swap(self, table_cfg: TableConfig) -> bool:
+        mode = table_cfg.mode or self.config.app.default_sync_mode
+        return mode == "full_replace" and table_cfg.copy_freeze
+
+    def _apply_promote_counts(self, counters: StepCounters, counts: PromoteCounts) -> None:
+        counters.rows_out = counts.rows_written
+        counters.rows_inserted = counts.inserted
+        counters.rows_updated = counts.updated
+        counters.rows_deleted = counts.deleted
+        counters.rows_unchanged = counts.unchanged
+        counters.details = counts.as_details()
+
+    def _write_snapshot(
+        self,
+        run_id: str,
+        table_name: str,
+        promote_counts: PromoteCounts,
+        source_fingerprint: dict[str, object] | None,
+    ) -> None:
+        plan = self.audit.write_snapshot(
+            run_id,
+            table_name,
+            counts=promote_counts,
+            business_columns=get_table_spec(table_name).business_columns,
+            reconcile_interval_hours=self.config.app.snapshot_reconcile_hours,
+            source_fingerprint=source_fingerprint,
+        )
+        promote_counts.details["snapshot_method"] = plan.method
+
+    def _run_maintenance(self, run_id: str, table_name: str, promote_counts: PromoteCounts) -> None:
+        try:
+            with self.audit.step(run_id, "maintenance", table_name) as counters:
+                counters.rows_in = promote_counts.rows_written
+                counters.rows_out = 0
+                counters.details = run_post_promote_maintenance(self.engine, table_name, promote_counts)
+        except Exception:
+            # Maintenance is best-effort; the promoted data is already committed.
+            self.logger.exception("post-promote maintenance failed: {}", table_name)
+
+    def _run_audit_retention(self, run_id: str) -> None:
+        try:
+            with self.audit.step(run_id, "maintenance", "audit_partitions") as counters:
+                details = maintain_audit_partitions(
+                    self.engine,
+                    default_days=self.config.app.audit_retention_days,
+                    tables=self.config.app.audit_retention_tables,
+                )
+                counters.rows_in = int(details["tables"])
+                counters.rows_out = 0
+                counters.details = details
+        except Exception:
+            # Partition upkeep is best-effort; new runs fall back to the default partition.
+            self.logger.exception("audit partition maintenance failed")
+
+    def _prepare_stage(
+        self,
+        run_id: str,
+        table_name: str,
+        table_cfg: TableConfig,
+        skip_unchanged: bool,
+        pool: Executor | None = None,
+        frames_future: Future | None = None,
+        record_fingerprints: bool = True,
+    ) -> PreparedTable:
+        source_fingerprint = self._source_fingerprint(table_cfg)
+
+        if table_cfg.refresh_before_load:
+            source_path = self.config.data_dir_path / table_cfg.file
+            with self.audit.step(run_id, "refresh", table_name) as counters:
+                refresh_result = refresh_excel_file(
+                    source_path,
+                    timeout_seconds=self.config.app.refresh_timeout_seconds,
+                    poll_seconds=self.config.app.refresh_poll_seconds,
+                )
+                counters.details = {
+                    "file": table_cfg.file,
+                    "elapsed_seconds": round(refresh_result.elapsed_seconds, 3),
+                }
+                if not refresh_result.ok:
+                    counters.details["error"] = refresh_result.error
+                    raise RuntimeError(refresh_result.error)
+
+        if skip_unchanged and self._source_unchanged(table_name, source_fingerprint):
+            if frames_future is not None:
+                frames_future.cancel()
+            with self.audit.step(run_id, "validate", table_name) as counters:
+                counters.details = {
+                    "skipped": True,
+                    "reason": "source_unchanged",
+                    "source_fingerprint": source_fingerprint,
+                }
+            self.logger.info(
+                "table={} skipped reason=source_unchanged",
+                table_name,
+            )
+            return PreparedTable(table_name, table_cfg, source_fingerprint, skipped=True)
+
+        valid_frame, rows_in, rejected_rows = self._prepare_table_dataset(
+            run_id,
+            table_name,
+            table_cfg,
+            pool=pool,
+            frames_future=frames_future,
+            record_fingerprints=record_fingerprints,
+        )
+        return PreparedTable(
+            table_name,
+            table_cfg,
+            source_fingerprint,
+            frame=valid_frame,
+            rows_in=rows_in,
+            rejected_rows=rejected_rows,
+        )
+
+    def _load_and_promote(self, run_id: str, prepared: PreparedTable) -> PromoteCounts:
+        table_name = prepared.table_name
+        table_cfg = prepared.table_cfg
+        valid_frame = prepared.frame
+        rejected_rows = prepared.rejected_rows
+
+        if self._uses_direct_swap(table_cfg):
+            with self.audit.step(run_id, "promote", table_name) as counters:
+                promote_counts = promote_full_replace_direct(
+                    self.engine,
+                    table_name=table_name,
+                    business_columns=get_table_spec(table_name).business_columns,
+                    frame=valid_frame,
+                    run_id=run_id,
+                )
+                self._write_snapshot(run_id, table_name, promote_counts, prepared.source_fingerprint)
+                counters.rows_in = len(valid_frame)
+                counters.rows_rejected = rejected_rows
+                self._apply_promote_counts(counters, promote_counts)
+        else:
+            with self.audit.step(run_id, "load_staging", table_name) as counters:
+                rows_loaded = load_dataframe_to_staging(
+                    self.engine,
+                    table_name,
+                    valid_frame,
+                    run_id,
+                )
+                counters.rows_in = len(valid_frame)
+                counters.rows_out = rows_loaded
+                counters.rows_rejected = rejected_rows
+
+            with self.audit.step(run_id, "promote", table_name) as counters:
+                promote_counts = self._promote_table(run_id, table_name, table_cfg)
+                self._write_snapshot(run_id, table_name, promote_counts, prepared.source_fingerprint)
+                counters.rows_in = rows_loaded
+                counters.rows_rejected = rejected_rows
+                self._apply_promote_counts(counters, promote_counts)
+
+            with self.audit.step(run_id, "cleanup", table_name) as counters:
+                clear_staging_for_run(self.engine, table_name, run_id)
+                counters.rows_in = rows_loaded
+                counters.rows_out = 0
+
+        if prepared.source_fingerprint:
+            self._record_source_fingerprint(run_id, table_name, prepared.source_fingerprint)
+        return promote_counts
+
     def _promote_table(
         self,
         run_id: str,
         table_name: str,
         table_cfg: TableConfig,
-    ) -> int:
+    ) -> PromoteCounts:
         spec = get_table_spec(table_name)
         mode = table_cfg.mode or self.config.app.default_sync_mode
         unique_keys = self._normalize_list(table_cfg.unique_keys)
 
+        if table_cfg.row_hash:
+            with self.engine.connect() as conn:
+                if not has_row_hash_column(conn, table_name):
+                    raise ValueError(
+                        f"[{table_name}] row_hash is enabled but app.{table_name} has no row_hash column; run bootstrap"
+                    )
+
+        if table_cfg.cd_scope:
+            if not spec.has_cd:
+                raise ValueError(f"[{table_name}] cd_scope requires a table with a cd column")
+            return promote_cd_scoped(
+                self.engine,
+                table_name=table_name,
+                mode=mode,
+                business_columns=spec.business_columns,
+                unique_keys=unique_keys,
+                run_id=run_id,
+                row_hash=table_cfg.row_hash,
+                lock=table_cfg.cd_scope_lock,
+            )
+
         if mode == "full_replace":
-            rows_out = promote_full_replace(
+            return promote_full_replace(
                 self.engine,
                 table_name=table_name,
                 business_columns=spec.business_columns,
                 run_id=run_id,
             )
-            return rows_out
 
-        if mode == "upsert":
+        if mode == "full_replace_delta":
+            return promote_full_replace_delta(
+                self.engine,
+                table_name=table_name,
+                business_columns=spec.business_columns,
+                unique_keys=unique_keys,
+                run_id=run_id,
+                row_hash=table_cfg.row_hash,
+            )
+
+        if mode in ("upsert", "upsert_sweep"):
             return promote_upsert(
                 self.engine,
                 table_name=table_name,
                 business_columns=spec.business_columns,
                 unique_keys=unique_keys,
                 run_id=run_id,
+                row_hash=table_cfg.row_hash,
+                batch_rows=table_cfg.promote_batch_rows,
+                sweep=mode == "upsert_sweep",
             )
 
         if mode == "incremental":
             if not table_cfg.incremental:
                 raise ValueError(f"[{table_name}] incremental config is required")
 
-            promoted_rows, cutoff_value, incoming_max = promote_incremental(
+            counts, cutoff_value, incoming_max = promote_incremental(
                 self.engine,
                 table_name=table_name,
                 business_columns=spec.business_columns,
@@ -355,6 +653,8 @@ class SyncService:
                 run_id=run_id,
                 watermark_column=snake_case(table_cfg.incremental.watermark_column),
                 lookback_days=table_cfg.incremental.lookback_days,
+                row_hash=table_cfg.row_hash,
+                reconcile_interval_hours=table_cfg.incremental.reconcile_interval_hours,
             )
 
             self.audit.write_metadata(
@@ -366,9 +666,10 @@ class SyncService:
                     "lookback_days": table_cfg.incremental.lookback_days,
                     "cutoff": cutoff_value,
                     "incoming_max": incoming_max,
+                    "reconciled": counts.details.get("watermark_reconciled"),
                 },
             )
-            return promoted_rows
+            return counts
 
         if mode == "insert_new":
             return promote_insert_new(
@@ -376,6 +677,17 @@ class SyncService:
                 table_name=table_name,
                 business_columns=spec.business_columns,
                 run_id=run_id,
+                row_hash=table_cfg.row_hash,
+                batch_rows=table_cfg.promote_batch_rows,
+            )
+
+        if mode == "partition_exchange":
+            return promote_partition_exchange(
+                self.engine,
+                table_name=table_name,
+                business_columns=spec.business_columns,
+                partition_column=snake_case(table_cfg.partition_column or ""),
+                run_id=run_id,
             )
 
         raise ValueError(f"[{table_name}] unsupported sync mode: {mode}")
@@ -418,131 +730,111 @@ class SyncService:
         inventory_seed_source_tables = {"db_end", "db_estq_entr"}
         inventory_seed_tables_synced: set[str] = set()
 
-        from app.connectors.db import advisory_lock
-
         try:
-            lock_context = advisory_lock(self.engine) if not validate_only else nullcontext()
-            with lock_context:
-                for table_name, table_cfg in self.config.tables.items():
-                    if selected_tables and table_name not in selected_tables:
-                        continue
-                    try:
-                        source_fingerprint = self._source_fingerprint(table_cfg)
-
-                        if table_cfg.refresh_before_load:
-                            source_path = self.config.data_dir_path / table_cfg.file
-                            with self.audit.step(run_id, "refresh", table_name) as counters:
-                                refresh_result = refresh_excel_file(
-                                    source_path,
-                                    timeout_seconds=self.config.app.refresh_timeout_seconds,
-                                    poll_seconds=self.config.app.refresh_poll_seconds,
-                                )
-                                counters.details = {
-                                    "file": table_cfg.file,
-                                    "elapsed_seconds": round(refresh_result.elapsed_seconds, 3),
-                                }
-                                if not refresh_result.ok:
-                                    counters.details["error"] = refresh_result.error
-                                    raise RuntimeError(refresh_result.error)
-
-                        if (
-                            not (dry_run or validate_only)
-                            and source_fingerprint
-                            and table_name not in forced_tables
+            tables = [
+                (table_name, table_cfg)
+                for table_name, table_cfg in self.config.tables.items()
+                if not selected_tables or table_name in selected_tables
+            ]
+
+            workers = self.config.app.prepare_workers
+            # validate/dry-run have no load stage to wait for, so every table fans out at once.
+            ahead = len(tables) if dry_run or validate_only else max(self.config.app.prepare_ahead, workers - 1)
+
+            # One background thread runs each table's ANALYZE/VACUUM right after its promote, so it
+            # overlaps the next tables instead of running after all of them; leaving the block waits
+            # for it, so the run only finishes once maintenance has.
+            with process_pool(workers) as pool, ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix="sync-maintenance",
+            ) as maintenance:
+                # Every table's CPU-bound prepare goes to the process pool up front, so all its
+                # workers stay busy; the prefetch threads only wait on the futures. Tables that
+                # are refreshed first or will be skipped as unchanged are left out.
+                frames_futures: dict[str, Future] = {}
+                if pool is not None:
+                    for table_name, table_cfg in tables:
+                        skip_unchanged = not (dry_run or validate_only) and table_name not in forced_tables
+                        if table_cfg.refresh_before_load or (
+                            skip_unchanged
+                            and self._source_unchanged(table_name, self._source_fingerprint(table_cfg))
                         ):
-                            previous_fingerprint = self._get_last_source_fingerprint(table_name)
-                            if previous_fingerprint and self._same_source_fingerprint(
-                                previous_fingerprint,
-                                source_fingerprint,
-                            ):
-                                with self.audit.step(run_id, "validate", table_name) as counters:
-                                    counters.details = {
-                                        "skipped": True,
-                                        "reason": "source_unchanged",
-                                        "source_fingerprint": source_fingerprint,
-                                    }
-                                self.logger.info(
-                                    "table={} skipped reason=source_unchanged",
-                                    table_name,
-                                )
-                                continue
-
-                        valid_frame, rows_in, rejected_rows = self._prepare_table_dataset(
-                            run_id,
-                            table_name,
-                            table_cfg,
+                            continue
+                        frames_futures[table_name] = pool.submit(
+                            prepare_table_frames,
+                            *self._prepare_args(table_name, table_cfg),
                         )
 
-                        rows_loaded = 0
-                        if not (dry_run or validate_only):
-                            with self.audit.step(run_id, "load_staging", table_name) as counters:
-                                rows_loaded = load_dataframe_to_staging(
-                                    self.engine,
-                                    table_name,
-                                    valid_frame,
-                                    run_id,
-                                )
-                                counters.rows_in = len(valid_frame)
-                                counters.rows_out = rows_loaded
-                                counters.rows_rejected = rejected_rows
-
-                            with self.audit.step(run_id, "promote", table_name) as counters:
-                                rows_promoted = self._promote_table(run_id, table_name, table_cfg)
-                                self.audit.write_snapshot(run_id, table_name)
-                                counters.rows_in = rows_loaded
-                                counters.rows_out = rows_promoted
-                                counters.rows_rejected = rejected_rows
+                def prepare(item: tuple[str, TableConfig]) -> PreparedTable:
+                    return self._prepare_stage(
+                        run_id,
+                        item[0],
+                        item[1],
+                        skip_unchanged=not (dry_run or validate_only) and item[0] not in forced_tables,
+                        pool=pool,
+                        frames_future=frames_futures.get(item[0]),
+                        # Only a real sync records rejection fingerprints; validate/dry-run just read them.
+                        record_fingerprints=run_kind == "sync",
+                    )
+
+                # Upcoming tables are read/normalized/validated by prepare workers while table N
+                # is loaded and promoted here; each table's own steps keep their order.
+                with prefetched(
+                    tables,
+                    prepare,
+                    ahead=ahead,
+                    workers=max(1, min(workers, ahead + 1)),
+                ) as prepared_tables:
+                    for (table_name, _), future in prepared_tables:
+                        try:
+                            prepared = future.result()
+                            if prepared.skipped:
+                                continue
+
+                            if not (dry_run or validate_only):
+                                # Per-table lock: other runners keep syncing every other table.
+                                with table_lock(self.engine, table_name, shared=prepared.table_cfg.cd_scope):
+                                    promote_counts = self._load_and_promote(run_id, prepared)
+                                maintenance.submit(self._run_maintenance, run_id, table_name, promote_counts)
                                 if table_name in inventory_seed_source_tables:
                                     inventory_seed_tables_synced.add(table_name)
 
-                            with self.audit.step(run_id, "cleanup", table_name) as counters:
-                                clear_staging_for_run(self.engine, table_name, run_id)
-                                counters.rows_in = rows_loaded
-                                counters.rows_out = 0
-
-                            if source_fingerprint:
-                                self.audit.write_metadata(
-                                    run_id,
-                                    table_name,
-                                    "source_fingerprint",
-                                    source_fingerprint,
-                                )
-                                if self._last_source_fingerprints is not None:
-                                    self._last_source_fingerprints[table_name] = source_fingerprint
-
-                        self.logger.info(
-                            "table={} rows_in={} rows_valid={} rows_rejected={}",
-                            table_name,
-                            rows_in,
-                            len(valid_frame),
-                            rejected_rows,
-                        )
-
-                    except Exception as table_exc:
-                        summary = " ".join(str(table_exc).splitlines()).strip()
-                        if len(summary) > 320:
-                            summary = f"{summary[:317]}..."
-                        errors.append(f"{table_name}: {summary}")
-                        table_errors[table_name] = summary
-                        self.logger.exception("table sync failed: {}", table_name)
-                        if self.config.app.stop_on_error:
-                            raise
-                        status = "partial"
-                        continue
-
-                if (
-                    not (dry_run or validate_only)
-                    and inventory_seed_tables_synced
-                ):
-                    with self.audit.step(run_id, "cleanup", "conf_inventario_refresh_pending_from_seed_all") as counters:
-                        counters.rows_in = len(inventory_seed_tables_synced)
-                        counters.rows_out = 0
-                        counters.details = {
-                            "function_available": True,
-                            "triggered_by_tables": sorted(inventory_seed_tables_synced),
-                            "skipped": True,
-                            "reason": "disabled_auto_reseed_to_avoid_cross_day_base_rehydration",
-                        }
+                            self.logger.info(
+                                "table={} rows_in={} rows_valid={} rows_rejected={}",
+                                table_name,
+                                prepared.rows_in,
+                                len(prepared.frame),
+                                prepared.rejected_rows,
+                            )
+
+                        except Exception as table_exc:
+                            summary = " ".join(str(table_exc).splitlines()).strip()
+                            if len(summary) > 320:
+                                summary = f"{summary[:317]}..."
+                            errors.append(f"{table_name}: {summary}")
+                            table_errors[table_name] = summary
+                            self.logger.exception("table sync failed: {}", table_name)
+                            if self.config.app.stop_on_error:
+                                raise
+                            status = "partial"
+                            continue
+
+                if not (dry_run or validate_only):
+                    maintenance.submit(self._run_audit_retention, run_id)
+
+            if (
+                not (dry_run or validate_only)
+                and inventory_seed_tables_synced
+            ):
+                with self.audit.step(run_id, "cleanup", "conf_inventario_refresh_pending_from_seed_all") as counters:
+                    counters.rows_in = len(inventory_seed_tables_synced)
+                    counters.rows_out = 0
+                    counters.details = {
+                        "function_available": True,
+                        "triggered_by_tables": sorted(inventory_seed_tables_synced),
+                        "skipped": True,
+                        "reason": "disabled_auto_reseed_to_avoid_cross_day_base_rehydration",
+                    }
 
             if errors and status == "success":
                 status = "partial"
@@ -9,6 +9,7 @@ type SyncRequest = {
   mode?: SyncMode;
   unique_keys?: string[];
   replace_filter_column?: string | null;
+  scope_cds?: number[] | null;
   rows?: Array<Record<string, unknown>>;
   dry_run?: boolean;
   batch_index?: number;
@@ -58,16 +59,27 @@ async function replaceTableData(
   client: ReturnType<typeof createClient>,
   table: string,
   filterColumn: string | null,
+  scopeCds: number[] | null,
 ): Promise<void> {
   if (!filterColumn) {
     throw new Error(`replace_filter_column is required for full_replace table=${table}`);
   }
+  // cd_scope with no CD in this load: nothing to replace (an unfiltered delete would wipe every CD).
+  if (scopeCds !== null && !scopeCds.length) {
+    return;
+  }
 
-  const { error } = await client
+  let query = client
     .schema("app")
     .from(table)
     .delete()
     .not(filterColumn, "is", null);
+  // cd_scope: only the CDs present in this load are replaced.
+  if (scopeCds !== null) {
+    query = query.in("cd", scopeCds);
+  }
+
+  const { error } = await query;
 
   if (error) {
     throw new Error(`delete failed: ${error.message}`);
@@ -152,6 +164,9 @@ Deno.serve(async (request: Request): Promise<Response> => {
     const dryRun = Boolean(payload.dry_run);
     const resetTable = Boolean(payload.reset_table);
     const replaceFilterColumn = payload.replace_filter_column ? String(payload.replace_filter_column) : null;
+    const scopeCds = Array.isArray(payload.scope_cds)
+      ? payload.scope_cds.map((item) => Number(item)).filter((item) => Number.isInteger(item))
+      : null;
 
     if (dryRun) {
       return jsonResponse({
@@ -169,7 +184,7 @@ Deno.serve(async (request: Request): Promise<Response> => {
     });
 
     if (mode === "full_replace" && resetTable) {
-      await replaceTableData(client, table, replaceFilterColumn);
+      await replaceTableData(client, table, replaceFilterColumn, scopeCds);
     }
 
     if (mode === "upsert") {
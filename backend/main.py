@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import multiprocessing
 import os
 import sys
 from pathlib import Path
@@ -9,6 +10,8 @@ from app.gui.tk_app import launch_gui
 
 
 if __name__ == "__main__":
+    # Prepare workers are spawned processes; the frozen executable must hand them off here.
+    multiprocessing.freeze_support()
     runtime_dir = (
         Path(sys.executable).resolve().parent
         if getattr(sys, "frozen", False)
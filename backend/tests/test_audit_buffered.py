@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.audit.buffered import BufferedAuditWriter, _apply_events, _try_lock
+from app.audit.models import StepCounters
+
+
+def _statements(conn: mock.Mock) -> list[str]:
+    return [" ".join(str(call.args[0]).split()) for call in conn.execute.call_args_list]
+
+
+class BufferedAuditWriterTests(unittest.TestCase):
+    def test_step_events_are_journaled_and_queued(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = BufferedAuditWriter(mock.Mock(), journal_dir=Path(tmp))
+            writer._step_ids = [10, 11]
+
+            step_id = writer._start_step("run-1", "promote", "db_end")
+            writer._finish_step(step_id, "success", StepCounters(rows_in=5, details={"strategy": "swap"}))
+            writer.write_metadata("run-1", "db_end", "promote_details", {"strategy": "swap"})
+
+            self.assertEqual(step_id, 10)
+            self.assertEqual([event["kind"] for event in writer._events], ["step_start", "step_finish", "metadata"])
+            journal = (Path(tmp) / "audit_run-1.jsonl").read_text(encoding="utf-8").splitlines()
+            self.assertEqual([json.loads(line)["step_id"] for line in journal[:2]], [10, 10])
+            writer.engine.begin.assert_not_called()
+
+    def test_apply_events_inserts_starts_before_finishes(self) -> None:
+        conn = mock.Mock()
+        events = [
+            {"kind": "step_finish", "step_id": 1},
+            {"kind": "step_start", "step_id": 1},
+            {"kind": "metadata", "run_id": "r", "table_name": "t", "meta_key": "k", "meta_value": "1"},
+            {"kind": "metadata", "run_id": "r", "table_name": "t", "meta_key": "k", "meta_value": "2"},
+        ]
+
+        _apply_events(conn, events)
+
+        statements = _statements(conn)
+        self.assertTrue(statements[0].startswith("insert into audit.run_steps"))
+        self.assertTrue(statements[1].startswith("update audit.run_steps"))
+        self.assertIn("where step_id = :step_id and run_id = :run_id", statements[1])
+        self.assertTrue(statements[2].startswith("insert into audit.runs_metadata"))
+        self.assertEqual(conn.execute.call_args_list[2].args[1], [events[3]])
+
+    def test_replay_applies_and_removes_leftover_journals(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = Path(tmp) / "audit_run-9.jsonl"
+            journal.write_text(json.dumps({"kind": "step_start", "step_id": 3}) + "\n", encoding="utf-8")
+            engine = mock.MagicMock()
+            writer = BufferedAuditWriter(engine, journal_dir=Path(tmp))
+
+            self.assertEqual(writer.replay_journals(), 1)
+            self.assertFalse(journal.exists())
+            engine.begin.assert_called_once()
+
+
+    def test_replay_skips_runs_still_owned_by_a_live_process(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = Path(tmp) / "audit_run-7.jsonl"
+            journal.write_text(json.dumps({"kind": "step_start", "step_id": 3}) + "\n", encoding="utf-8")
+            engine = mock.MagicMock()
+            engine.connect.return_value.__enter__.return_value.execute.return_value.fetchall.return_value = [("run-7",)]
+            writer = BufferedAuditWriter(engine, journal_dir=Path(tmp))
+
+            with (Path(tmp) / "audit_run-7.lock").open("a+", encoding="utf-8") as owner:
+                self.assertTrue(_try_lock(owner))
+                self.assertEqual(writer.replay_journals(), 0)
+                self.assertTrue(journal.exists())
+
+            # The owner is gone: its lock is free even though the run was never finished.
+            self.assertEqual(writer.replay_journals(), 1)
+            self.assertFalse(journal.exists())
+            self.assertFalse((Path(tmp) / "audit_run-7.lock").exists())
+            statements = _statements(engine.begin.return_value.__enter__.return_value)
+            self.assertTrue(statements[-1].startswith("update audit.runs set finished_at = now(), status = 'failed'"))
+            self.assertIn("recovered from audit journal", statements[-1])
+
+    def test_replay_without_owner_file_waits_for_run_to_finish(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = Path(tmp) / "audit_run-8.jsonl"
+            journal.write_text(json.dumps({"kind": "step_start", "step_id": 3}) + "\n", encoding="utf-8")
+            engine = mock.MagicMock()
+            status = engine.connect.return_value.__enter__.return_value.execute.return_value.fetchall
+            status.return_value = [("run-8",)]
+            writer = BufferedAuditWriter(engine, journal_dir=Path(tmp))
+
+            self.assertEqual(writer.replay_journals(), 0)
+            self.assertTrue(journal.exists())
+
+            status.return_value = []
+            self.assertEqual(writer.replay_journals(), 1)
+            self.assertFalse(journal.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
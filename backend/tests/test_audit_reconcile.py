@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.audit.reconcile import (
+    _signed_prefix,
+    canonical_sql,
+    canonical_values,
+    diff_leaves,
+    local_buckets,
+    local_hashes,
+)
+
+TYPES = {"cd": "integer", "qtd": "numeric", "dt": "date", "dh": "timestamp", "nome": "text"}
+
+
+class CanonicalValueTests(unittest.TestCase):
+    def test_values_render_like_postgres(self) -> None:
+        self.assertEqual(canonical_values(pd.Series([1.50, 100.0, -0.0, None], dtype="Float64"), "numeric"), ["1.5", "100", "0", "\\N"])
+        self.assertEqual(canonical_values(pd.Series([7], dtype="Int64"), "integer"), ["7"])
+        self.assertEqual(canonical_values(pd.Series([date(2026, 1, 31)]), "date"), ["2026-01-31"])
+        self.assertEqual(
+            canonical_values(pd.Series(pd.to_datetime(["2024-01-01 10:00:00.5"], utc=True)), "timestamp"),
+            ["1704103200.5"],
+        )
+
+    def test_sql_uses_matching_renderings(self) -> None:
+        self.assertEqual(canonical_sql("a", "qtd", "numeric"), 'coalesce(trim_scale(a."qtd"::numeric)::text, \'\\N\')')
+        self.assertIn('extract(epoch from a."dh")', canonical_sql("a", "dh", "timestamp"))
+        self.assertIn("to_char(a.\"dt\", 'YYYY-MM-DD')", canonical_sql("a", "dt", "date"))
+
+    def test_signed_prefix_matches_bigint_cast(self) -> None:
+        self.assertEqual(_signed_prefix("7fffffffffffffff" + "0" * 16), (1 << 63) - 1)
+        self.assertEqual(_signed_prefix("ffffffffffffffff" + "0" * 16), -1)
+
+
+class BucketTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.frame = pd.DataFrame({"cd": pd.Series(range(200), dtype="Int64"), "nome": [f"n{i}" for i in range(200)]})
+
+    def test_bucket_digest_is_order_independent(self) -> None:
+        hashes = local_hashes(self.frame, ["cd"], ["cd", "nome"], TYPES)
+        shuffled = local_hashes(self.frame.iloc[::-1], ["cd"], ["cd", "nome"], TYPES)
+
+        self.assertEqual(local_buckets(hashes, 2), local_buckets(shuffled, 2))
+
+    def test_child_buckets_are_limited_to_parent_prefixes(self) -> None:
+        hashes = local_hashes(self.frame, ["cd"], ["cd", "nome"], TYPES)
+        parent = sorted(local_buckets(hashes, 1))[0]
+
+        children = local_buckets(hashes, 2, [parent])
+
+        self.assertTrue(all(prefix.startswith(parent) for prefix in children))
+        self.assertEqual(sum(bucket.rows for bucket in children.values()), local_buckets(hashes, 1)[parent].rows)
+
+    def test_diff_leaves_separates_missing_extra_and_changed(self) -> None:
+        source = local_hashes(self.frame.iloc[:3], ["cd"], ["cd", "nome"], TYPES)
+        app_frame = self.frame.iloc[1:4].copy()
+        app_frame.loc[1, "nome"] = "changed"
+        app = local_hashes(app_frame, ["cd"], ["cd", "nome"], TYPES)
+
+        diff = diff_leaves(source, app)
+
+        self.assertEqual((diff["rows_missing"], diff["rows_extra"], diff["keys_changed"]), (1, 1, 1))
+        self.assertEqual(diff["missing_sample"], ["0"])
+        self.assertEqual(diff["extra_sample"], ["3"])
+        self.assertEqual(diff["changed_sample"], ["1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import gzip
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.audit.rejections import REJECTION_COLUMNS, RejectionExporter, prepare_rejections, rejection_fingerprints
+from app.audit.writer import AuditWriter
+
+
+def _rejection(row_number: int, reason_code: str, column_name: str | None) -> dict[str, object]:
+    return {
+        "source_row_number": row_number,
+        "reason_code": reason_code,
+        "reason_detail": "detail",
+        "column_name": column_name,
+        "payload": {"row": row_number},
+    }
+
+
+class PrepareRejectionsTests(unittest.TestCase):
+    def test_payload_kept_only_for_sample_per_reason_and_column(self) -> None:
+        frame = pd.DataFrame(
+            [
+                _rejection(1, "type_cast_error", "qtd"),
+                _rejection(2, "type_cast_error", "qtd"),
+                _rejection(3, "type_cast_error", "qtd"),
+                _rejection(4, "type_cast_error", "cd"),
+                _rejection(5, "duplicate_unique_key", None),
+            ]
+        )
+
+        prepared = prepare_rejections(frame, "run-1", payload_sample=2)
+
+        self.assertEqual(list(prepared.rows.columns), REJECTION_COLUMNS)
+        self.assertEqual(prepared.rows["payload"].notna().tolist(), [True, True, False, True, True])
+        self.assertEqual(prepared.rows["payload"].iloc[0], '{"row": 1}')
+        self.assertEqual(
+            prepared.groups,
+            [
+                {"reason_code": "type_cast_error", "column": "qtd", "rows": 3, "payloads": 2},
+                {"reason_code": "type_cast_error", "column": "cd", "rows": 1, "payloads": 1},
+                {"reason_code": "duplicate_unique_key", "column": None, "rows": 1, "payloads": 1},
+            ],
+        )
+
+    def test_no_sample_limit_keeps_every_payload(self) -> None:
+        frame = pd.DataFrame([_rejection(1, "required_null", "cd"), {"reason_code": "x", "payload": "raw"}])
+
+        prepared = prepare_rejections(frame, "run-1", payload_sample=None)
+
+        self.assertEqual(prepared.rows["payload"].tolist(), ['{"row": 1}', '{"raw": "raw"}'])
+        self.assertEqual(prepared.rows["source_row_number"].tolist(), [1, 0])
+
+
+class RejectionFingerprintTests(unittest.TestCase):
+    def test_fingerprint_ignores_row_position(self) -> None:
+        first = {**_rejection(2, "type_cast_error", "qtd"), "payload": {"source_row_number": 2, "qtd": "x"}}
+        moved = {**_rejection(9, "type_cast_error", "qtd"), "payload": {"source_row_number": 9, "qtd": "x"}}
+        changed = {**_rejection(9, "type_cast_error", "qtd"), "payload": {"source_row_number": 9, "qtd": "y"}}
+
+        fingerprints = rejection_fingerprints("db_end", pd.DataFrame([first, moved, changed]))
+
+        self.assertEqual(fingerprints.iloc[0], fingerprints.iloc[1])
+        self.assertNotEqual(fingerprints.iloc[0], fingerprints.iloc[2])
+
+    def test_fingerprint_is_scoped_by_table_and_reason(self) -> None:
+        frame = pd.DataFrame([_rejection(1, "required_null", "cd"), _rejection(1, "type_cast_error", "cd")])
+
+        end = rejection_fingerprints("db_end", frame)
+        barras = rejection_fingerprints("db_barras", frame)
+
+        self.assertNotEqual(end.iloc[0], end.iloc[1])
+        self.assertNotEqual(end.iloc[0], barras.iloc[0])
+
+    def test_only_sync_runs_record_fingerprints(self) -> None:
+        frame = pd.DataFrame([_rejection(1, "required_null", "cd"), _rejection(2, "required_null", "cd")])
+        writer = AuditWriter(mock.MagicMock())
+        writer.rejection_exports = mock.Mock()
+        known = rejection_fingerprints("db_end", frame.iloc[:1]).iloc[0]
+        details: dict[str, object] = {}
+
+        with mock.patch("app.audit.writer.register_fingerprints") as register, mock.patch(
+            "app.audit.writer.unseen_fingerprints",
+            side_effect=lambda conn, table, fresh: set(fresh["fingerprint"]) - {known},
+        ), mock.patch("app.audit.writer.copy_rejections"), tempfile.TemporaryDirectory() as tmp:
+            writer.write_rejections(
+                "run", "db_end", frame, Path(tmp), dedupe=True, details=details, record_fingerprints=False
+            )
+
+        register.assert_not_called()
+        self.assertEqual((details["rejections_new"], details["rejections_repeated"]), (1, 1))
+
+
+class RejectionExporterTests(unittest.TestCase):
+    def test_export_is_gzip_compressed(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            exporter = RejectionExporter()
+            prepared = prepare_rejections(pd.DataFrame([_rejection(7, "required_null", "cd")]), "run-1", 1)
+
+            exporter.submit(prepared.rows, "db_end", "run-1", Path(tmp), retention_days=14)
+            exporter._executor.shutdown(wait=True)
+
+            exports = list(Path(tmp).glob("rejections_db_end_run-1_*.csv.gz"))
+            self.assertEqual(len(exports), 1)
+            with gzip.open(exports[0], "rt", encoding="utf-8") as handle:
+                self.assertTrue(handle.readline().startswith("run_id,source_row_number"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import sys
+import unittest
+import uuid
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.audit.retention import (
+    add_months,
+    expired_partitions,
+    new_run_id,
+    retention_days_for,
+    run_id_floor,
+    runs_cutoff,
+    runs_retention_days,
+)
+
+
+def _ms(value: datetime) -> int:
+    return int(value.timestamp() * 1000)
+
+
+class RunIdTests(unittest.TestCase):
+    def test_new_run_id_is_uuid_v7(self) -> None:
+        run_id = uuid.UUID(new_run_id())
+
+        self.assertEqual(run_id.version, 7)
+        self.assertEqual(run_id.variant, uuid.RFC_4122)
+
+    def test_run_ids_sort_by_start_time(self) -> None:
+        earlier = new_run_id(_ms(datetime(2026, 1, 31, 23, 59, tzinfo=timezone.utc)))
+        later = new_run_id(_ms(datetime(2026, 2, 1, 0, 0, tzinfo=timezone.utc)))
+
+        self.assertLess(earlier, later)
+
+    def test_run_id_falls_inside_its_month_bounds(self) -> None:
+        run_id = new_run_id(_ms(datetime(2026, 3, 15, 12, 0, tzinfo=timezone.utc)))
+
+        self.assertLessEqual(run_id_floor(date(2026, 3, 1)), run_id)
+        self.assertLess(run_id, run_id_floor(date(2026, 4, 1)))
+
+    def test_run_id_floor_matches_sql_layout(self) -> None:
+        self.assertEqual(run_id_floor(date(1970, 1, 1)), "00000000-0000-0000-0000-000000000000")
+        self.assertEqual(
+            run_id_floor(date(2026, 1, 1)),
+            f"{_ms(datetime(2026, 1, 1, tzinfo=timezone.utc)):012x}"[:8]
+            + "-"
+            + f"{_ms(datetime(2026, 1, 1, tzinfo=timezone.utc)):012x}"[8:]
+            + "-0000-0000-000000000000",
+        )
+
+
+class RetentionPlanTests(unittest.TestCase):
+    def test_rejections_key_applies_to_every_rejections_table(self) -> None:
+        tables = {"rejections": 30, "rejections_db_end": 7, "runs": 365}
+
+        self.assertEqual(retention_days_for("rejections_db_barras", 180, tables), 30)
+        self.assertEqual(retention_days_for("rejections_db_end", 180, tables), 7)
+        self.assertEqual(retention_days_for("runs", 180, tables), 365)
+        self.assertEqual(retention_days_for("run_steps", 180, tables), 180)
+
+    def test_expired_partitions_keep_months_inside_window(self) -> None:
+        partitions = {
+            "run_steps_p202603": date(2026, 3, 1),
+            "run_steps_p202604": date(2026, 4, 1),
+            "run_steps_p202605": date(2026, 5, 1),
+        }
+
+        self.assertEqual(expired_partitions(partitions, 30, date(2026, 5, 30)), ["run_steps_p202603"])
+        self.assertEqual(
+            expired_partitions(partitions, 30, date(2026, 5, 31)),
+            ["run_steps_p202603", "run_steps_p202604"],
+        )
+
+    def test_zero_retention_keeps_everything(self) -> None:
+        self.assertEqual(expired_partitions({"runs_p200001": date(2000, 1, 1)}, 0, date(2026, 1, 1)), [])
+
+    def test_runs_outlive_every_partitioned_table(self) -> None:
+        audit_tables = ["rejections_db_end", "run_steps", "runs_metadata"]
+
+        self.assertEqual(runs_retention_days(180, {"rejections": 30, "runs": 90}, audit_tables), 180)
+        self.assertEqual(runs_retention_days(180, {"rejections": 400}, audit_tables), 400)
+        self.assertEqual(runs_retention_days(180, {"run_steps": 0}, audit_tables), 0)
+
+    def test_runs_cutoff_waits_for_month_partitions(self) -> None:
+        today = date(2026, 5, 30)
+        cutoff = runs_cutoff(30, today)
+
+        self.assertEqual(cutoff, datetime(2026, 4, 1, tzinfo=timezone.utc))
+        # Every run older than the cutoff sits in a month expired_partitions already drops.
+        self.assertEqual(
+            expired_partitions({"run_steps_p202603": date(2026, 3, 1)}, 30, today),
+            ["run_steps_p202603"],
+        )
+        self.assertIsNone(runs_cutoff(0, today))
+
+    def test_add_months_crosses_year(self) -> None:
+        self.assertEqual(add_months(date(2026, 12, 1), 1), date(2027, 1, 1))
+        self.assertEqual(add_months(date(2026, 1, 1), -1), date(2025, 12, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
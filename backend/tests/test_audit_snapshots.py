@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.audit.snapshots import PreviousSnapshot, exact_snapshot_sql, load_source_fingerprints, plan_snapshot, save_table_state
+from app.etl.promote.counts import PromoteCounts
+
+NOW = datetime(2026, 3, 10, 12, 0, 0)
+
+
+class PlanSnapshotTests(unittest.TestCase):
+    def test_first_snapshot_is_exact(self) -> None:
+        plan = plan_snapshot(None, PromoteCounts(inserted=10), NOW, 24)
+
+        self.assertEqual(plan.method, "exact")
+
+    def test_delta_applies_promote_counts(self) -> None:
+        previous = PreviousSnapshot(row_count=100, checksum="abc", reconciled_at=NOW - timedelta(hours=1))
+
+        plan = plan_snapshot(previous, PromoteCounts(inserted=7, updated=3, deleted=2), NOW, 24)
+
+        self.assertEqual(plan.method, "delta")
+        self.assertEqual(plan.row_count, 105)
+        self.assertIsNone(plan.checksum)
+        self.assertEqual(plan.reconciled_at, previous.reconciled_at)
+
+    def test_unchanged_table_keeps_checksum(self) -> None:
+        previous = PreviousSnapshot(row_count=100, checksum="abc", reconciled_at=NOW - timedelta(hours=1))
+
+        plan = plan_snapshot(previous, PromoteCounts(unchanged=100), NOW, 24)
+
+        self.assertEqual((plan.row_count, plan.checksum), (100, "abc"))
+
+    def test_reconciles_when_interval_elapsed_or_counts_inconsistent(self) -> None:
+        stale = PreviousSnapshot(row_count=100, checksum="abc", reconciled_at=NOW - timedelta(hours=25))
+        fresh = PreviousSnapshot(row_count=1, checksum="abc", reconciled_at=NOW)
+
+        self.assertEqual(plan_snapshot(stale, PromoteCounts(), NOW, 24).method, "exact")
+        self.assertEqual(plan_snapshot(fresh, PromoteCounts(deleted=5), NOW, 24).method, "exact")
+        self.assertEqual(plan_snapshot(fresh, PromoteCounts(), NOW, 0).method, "exact")
+
+    def test_direct_swap_is_recounted(self) -> None:
+        previous = PreviousSnapshot(row_count=100, checksum="abc", reconciled_at=NOW - timedelta(hours=1))
+        swapped = PromoteCounts(inserted=100, details={"strategy": "direct_copy_freeze", "staging_skipped": True})
+
+        self.assertEqual(plan_snapshot(previous, swapped, NOW, 24).method, "exact")
+
+    def test_exact_checksum_hashes_business_columns(self) -> None:
+        sql = exact_snapshot_sql("db_end", ["cd", "coddv"])
+
+        self.assertIn('md5(row(a."cd", a."coddv")::text)', sql)
+        self.assertIn('from app."db_end" a', sql)
+        self.assertNotIn("order by", sql)
+
+
+class TableStateTests(unittest.TestCase):
+    def test_missing_fingerprint_keeps_previous_one(self) -> None:
+        conn = mock.Mock()
+
+        save_table_state(conn, "db_end", "run-1", 10, None)
+
+        sql = str(conn.execute.call_args.args[0])
+        self.assertIn("coalesce(excluded.source_fingerprint, audit.table_state.source_fingerprint)", sql)
+        self.assertEqual(conn.execute.call_args.args[1]["row_count"], 10)
+
+    def test_load_reads_registry_rows(self) -> None:
+        conn = mock.Mock()
+        conn.execute.return_value.mappings.return_value.all.return_value = [
+            {"table_name": "db_end", "source_fingerprint": {"file": "END.xlsx", "size": 1}},
+            {"table_name": "db_barras", "source_fingerprint": "invalid"},
+        ]
+
+        fingerprints = load_source_fingerprints(conn)
+
+        self.assertEqual(fingerprints, {"db_end": {"file": "END.xlsx", "size": 1}})
+        self.assertIn("from audit.table_state", str(conn.execute.call_args.args[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from pathlib import Path
+
+from pydantic import ValidationError
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.config.models import ConfigModel, TableConfig
+
+
+class TableConfigTests(unittest.TestCase):
+    def test_copy_freeze_accepts_full_replace(self) -> None:
+        cfg = TableConfig(file="DB_END.xlsx", mode="full_replace", copy_freeze=True)
+
+        self.assertTrue(cfg.copy_freeze)
+
+    def test_copy_freeze_rejects_other_modes(self) -> None:
+        with self.assertRaises(ValidationError):
+            TableConfig(file="DB_USUARIO.xlsx", mode="upsert", copy_freeze=True)
+
+    def test_promote_batch_rows_rejects_full_replace(self) -> None:
+        with self.assertRaises(ValidationError):
+            TableConfig(file="DB_END.xlsx", mode="full_replace", promote_batch_rows=50_000)
+
+    def test_partition_exchange_requires_partition_column(self) -> None:
+        with self.assertRaises(ValidationError):
+            TableConfig(file="DB_PROD_VOL.xlsx", mode="partition_exchange")
+
+    def test_promote_batch_rows_accepts_upsert_sweep(self) -> None:
+        cfg = TableConfig(file="DB_ROTAS.xlsx", mode="upsert_sweep", unique_keys=["cd", "filial"], promote_batch_rows=1000)
+
+        self.assertEqual(cfg.promote_batch_rows, 1000)
+
+    def test_cd_scope_rejects_incremental(self) -> None:
+        with self.assertRaises(ValidationError):
+            TableConfig(
+                file="DB_PROD_VOL.xlsx",
+                mode="incremental",
+                incremental={"watermark_column": "dt_ped"},
+                cd_scope=True,
+            )
+
+    def test_cd_scope_lock_requires_cd_scope(self) -> None:
+        with self.assertRaises(ValidationError):
+            TableConfig(file="DB_END.xlsx", mode="full_replace", cd_scope_lock=True)
+
+
+def _config(default_sync_mode: str, table_name: str = "db_end", **table: object) -> ConfigModel:
+    return ConfigModel.model_validate(
+        {
+            "app": {"default_sync_mode": default_sync_mode},
+            "supabase": {},
+            "tables": {table_name: {"file": "DB_END.xlsx", **table}},
+        }
+    )
+
+
+class ConfigModelTests(unittest.TestCase):
+    def test_mode_null_resolves_to_default_sync_mode(self) -> None:
+        model = _config("full_replace", copy_freeze=True)
+
+        self.assertEqual(model.tables["db_end"].mode, "full_replace")
+
+    def test_copy_freeze_checked_against_default_sync_mode(self) -> None:
+        with self.assertRaises(ValidationError):
+            _config("upsert", unique_keys=["cd"], copy_freeze=True)
+
+    def test_row_hash_rejected_when_default_is_full_replace(self) -> None:
+        with self.assertRaises(ValidationError):
+            _config("full_replace", row_hash=True)
+
+    def test_upsert_sweep_default_requires_unique_keys(self) -> None:
+        with self.assertRaises(ValidationError):
+            _config("upsert_sweep")
+
+    def test_row_hash_requires_table_spec(self) -> None:
+        self.assertTrue(_config("insert_new", row_hash=True).tables["db_end"].row_hash)
+        with self.assertRaises(ValidationError):
+            _config("insert_new", table_name="db_sem_spec", row_hash=True)
+
+
+    def test_pool_must_cover_sync_threads(self) -> None:
+        with self.assertRaises(ValidationError):
+            ConfigModel.model_validate(
+                {
+                    "app": {"prepare_workers": 2},
+                    "supabase": {"pool_size": 2, "max_overflow": 2},
+                    "tables": {},
+                }
+            )
+        model = ConfigModel.model_validate(
+            {"app": {"prepare_workers": 2}, "supabase": {"pool_size": 4, "max_overflow": 2}, "tables": {}}
+        )
+
+        self.assertEqual(model.supabase.pool_size, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,11 +4,13 @@ import os
 import sys
 import unittest
 from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import patch
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-from app.automation.edge_sync import _chunk_rows, is_edge_transport_enabled
+from app.automation.edge_sync import EdgeSyncSettings, _chunk_rows, is_edge_transport_enabled, sync_tables_via_edge
+from app.config.models import TableConfig
 
 
 class EdgeSyncTests(unittest.TestCase):
@@ -30,6 +32,21 @@ class EdgeSyncTests(unittest.TestCase):
         self.assertEqual(chunks[0], [{"id": 0}, {"id": 1}])
         self.assertEqual(chunks[2], [{"id": 4}])
 
+    def test_cd_scope_without_cds_does_not_reset_table(self) -> None:
+        runtime = SimpleNamespace(
+            tables={"db_end": TableConfig(file="DB_END.xlsx", mode="full_replace", cd_scope=True)},
+        )
+        settings = EdgeSyncSettings("https://example.test/fn", "", "", 30, 1000)
+        with patch("app.automation.edge_sync._read_edge_settings", return_value=settings), patch(
+            "app.automation.edge_sync._prepare_rows_for_table", return_value=([], "full_replace", [], "cd")
+        ), patch("app.automation.edge_sync._post_edge_json", return_value={"ok": True}) as post:
+            result = sync_tables_via_edge(runtime, ["db_end"], dry_run=False)
+
+        payload = post.call_args.args[1]
+        self.assertEqual(result.status, "success")
+        self.assertEqual(payload["scope_cds"], [])
+        self.assertFalse(payload["reset_table"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.etl.pipeline import prefetched
+
+
+class PrefetchedTests(unittest.TestCase):
+    def test_items_come_back_in_order(self) -> None:
+        with prefetched(["a", "b", "c"], str.upper, ahead=1) as prepared:
+            results = [(item, future.result()) for item, future in prepared]
+
+        self.assertEqual(results, [("a", "A"), ("b", "B"), ("c", "C")])
+
+    def test_next_item_is_prepared_while_current_is_consumed(self) -> None:
+        second_started = threading.Event()
+
+        def prepare(item: int) -> int:
+            if item == 2:
+                second_started.set()
+            return item
+
+        with prefetched([1, 2], prepare, ahead=1) as prepared:
+            _, first = next(prepared)
+            first.result()
+            self.assertTrue(second_started.wait(timeout=5))
+
+    def test_lookahead_is_bounded(self) -> None:
+        started: list[int] = []
+        release = threading.Event()
+
+        def prepare(item: int) -> int:
+            started.append(item)
+            release.wait(timeout=5)
+            return item
+
+        for ahead in (0, 2):
+            started.clear()
+            release.clear()
+            with prefetched(range(10), prepare, ahead=ahead, workers=4) as prepared:
+                next(prepared)
+                deadline = time.monotonic() + 5
+                while len(started) < ahead + 1 and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                time.sleep(0.05)
+                # The item handed out plus exactly `ahead` more; nothing else was submitted.
+                self.assertEqual(sorted(started), list(range(ahead + 1)))
+                release.set()
+
+    def test_prepare_errors_stay_with_their_item(self) -> None:
+        def prepare(item: str) -> str:
+            if item == "bad":
+                raise ValueError(item)
+            return item
+
+        with prefetched(["ok", "bad", "also_ok"], prepare) as prepared:
+            outcomes = [(item, future.exception() is None) for item, future in prepared]
+
+        self.assertEqual(outcomes, [("ok", True), ("bad", False), ("also_ok", True)])
+
+    def test_leaving_early_cancels_pending_items(self) -> None:
+        started: list[int] = []
+
+        with prefetched(range(5), started.append, ahead=1) as prepared:
+            next(prepared)
+
+        self.assertLessEqual(len(started), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
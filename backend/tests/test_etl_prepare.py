@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.config.models import TableConfig
+from app.etl.pipeline import process_pool
+from app.etl.prepare import prepare_table_frames
+from app.etl.table_specs import get_table_spec
+
+
+class PrepareTableFramesTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self.tmp.name)
+        pd.DataFrame(
+            {
+                "CD": ["1", "1", "2", None],
+                "MAT": ["10", "10", "20", None],
+                "NOME": ["Ana", "Ana B", None, None],
+                "DT_NASC": ["1990-01-02", "1990-01-02", "1985-05-06", None],
+            }
+        ).to_csv(self.data_dir / "DB_USUARIO.csv", index=False)
+        self.table_cfg = TableConfig(
+            file="DB_USUARIO.csv",
+            mode="upsert",
+            unique_keys=["cd", "mat"],
+            required_columns=["mat", "nome"],
+        )
+        self.args = (
+            "db_usuario",
+            self.table_cfg,
+            self.data_dir,
+            dict(get_table_spec("db_usuario").sql_types),
+            ["mat", "nome"],
+            ["cd", "mat"],
+            [],
+        )
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_drops_empty_rows_and_keeps_rejections(self) -> None:
+        frames = prepare_table_frames(*self.args)
+
+        self.assertEqual(frames.dropped_empty_rows, 1)
+        self.assertGreater(len(frames.rejections), 0)
+        self.assertEqual(frames.rows_out, len(frames.valid))
+        self.assertIn("source_row_number", frames.valid.columns)
+
+    def test_keyed_diff_rejects_null_keys(self) -> None:
+        # A nullable key would never match in the full_replace_delta keyed diff.
+        pd.DataFrame(
+            {"CD": ["1", None], "MAT": ["10", "11"], "NOME": ["Ana", "Bia"], "DT_NASC": [None, None]}
+        ).to_csv(self.data_dir / "DB_USUARIO.csv", index=False)
+        table_cfg = TableConfig(file="DB_USUARIO.csv", mode="full_replace_delta", unique_keys=["cd", "mat"])
+
+        frames = prepare_table_frames("db_usuario", table_cfg, *self.args[2:])
+
+        self.assertEqual(frames.valid["mat"].tolist(), ["10"])
+        self.assertEqual(frames.rejections["reason_code"].tolist(), ["unique_key_null"])
+
+        upsert = prepare_table_frames(*self.args)
+        self.assertEqual(sorted(upsert.valid["mat"].tolist()), ["10", "11"])
+
+    def test_process_pool_matches_in_process_result(self) -> None:
+        local = prepare_table_frames(*self.args)
+        with process_pool(2) as pool:
+            remote = pool.submit(prepare_table_frames, *self.args).result()
+
+        pd.testing.assert_frame_equal(local.valid, remote.valid)
+        pd.testing.assert_frame_equal(local.rejections, remote.rejections)
+        self.assertEqual(local.rows_in, remote.rows_in)
+
+    def test_single_worker_uses_no_pool(self) -> None:
+        with process_pool(1) as pool:
+            self.assertIsNone(pool)
+
+
+if __name__ == "__main__":
+    unittest.main()
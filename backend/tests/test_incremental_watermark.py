@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.etl.promote.incremental import promote_incremental
+
+COLUMNS = ["cd", "dt_mov", "qtd"]
+
+
+def _at(day: int) -> datetime:
+    return datetime(2026, 3, day, tzinfo=timezone.utc)
+
+
+class _FakeConn:
+    # Answers the statements promote_incremental issues, keyed on their text, and
+    # records the table_state writes.
+    def __init__(self, state: SimpleNamespace | None, app_max: datetime | None, incoming_max: datetime | None):
+        self.state = state
+        self.app_max = app_max
+        self.incoming_max = incoming_max
+        self.statements: list[str] = []
+        self.saved: dict[str, object] | None = None
+
+    def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        self.statements.append(sql)
+        result = mock.MagicMock()
+        if "on conflict (table_name) do nothing" in sql:
+            if self.state is None:
+                self.state = SimpleNamespace(watermark_column=None, high_water_mark=None, reconcile_due=True)
+        elif "for update" in sql:
+            result.first.return_value = self.state
+        elif sql.startswith("select max(") and 'from app."' in sql:
+            result.scalar_one.return_value = self.app_max
+        elif sql.startswith("select max(") and 'from staging."' in sql:
+            result.scalar_one.return_value = self.incoming_max
+        elif sql.startswith("insert into audit.table_state ( table_name, watermark_column"):
+            self.saved = dict(params)
+        else:
+            result.mappings.return_value.one.return_value = {
+                "inserted": 0,
+                "updated": 0,
+                "deleted": 0,
+                "unchanged": 0,
+            }
+        return result
+
+    def queried_app_max(self) -> bool:
+        return any(sql.startswith("select max(") and 'from app."' in sql for sql in self.statements)
+
+
+def _promote(conn: _FakeConn, **overrides: object):
+    engine = mock.MagicMock()
+    engine.begin.return_value.__enter__.return_value = conn
+    kwargs: dict[str, object] = {
+        "table_name": "db_mov",
+        "business_columns": COLUMNS,
+        "unique_keys": ["cd", "dt_mov"],
+        "run_id": "run",
+        "watermark_column": "dt_mov",
+        "lookback_days": 2,
+    }
+    kwargs.update(overrides)
+    return promote_incremental(engine, **kwargs)
+
+
+class WatermarkStateTests(unittest.TestCase):
+    def test_first_run_creates_row_before_locking_it(self) -> None:
+        conn = _FakeConn(None, app_max=_at(10), incoming_max=_at(12))
+
+        counts, cutoff, _ = _promote(conn)
+
+        create = next(i for i, sql in enumerate(conn.statements) if "do nothing" in sql)
+        lock = next(i for i, sql in enumerate(conn.statements) if "for update" in sql)
+        self.assertLess(create, lock)
+        self.assertTrue(conn.queried_app_max())
+        self.assertEqual(cutoff, (_at(10) - timedelta(days=2)).isoformat())
+        self.assertTrue(conn.saved["reconciled"])
+        self.assertEqual(conn.saved["high_water_mark"], _at(12))
+        self.assertTrue(counts.details["watermark_reconciled"])
+
+    def test_stored_watermark_skips_app_scan(self) -> None:
+        state = SimpleNamespace(watermark_column="dt_mov", high_water_mark=_at(20), reconcile_due=False)
+        conn = _FakeConn(state, app_max=_at(1), incoming_max=_at(18))
+
+        _, cutoff, incoming = _promote(conn)
+
+        self.assertFalse(conn.queried_app_max())
+        self.assertEqual(cutoff, (_at(20) - timedelta(days=2)).isoformat())
+        self.assertEqual(incoming, _at(18).isoformat())
+        self.assertFalse(conn.saved["reconciled"])
+        self.assertEqual(conn.saved["high_water_mark"], _at(20))
+
+    def test_due_reconcile_recomputes_from_app(self) -> None:
+        # Rows deleted upstream can move the real maximum backwards; reconcile lets it.
+        state = SimpleNamespace(watermark_column="dt_mov", high_water_mark=_at(20), reconcile_due=True)
+        conn = _FakeConn(state, app_max=_at(15), incoming_max=None)
+
+        _, cutoff, _ = _promote(conn)
+
+        self.assertTrue(conn.queried_app_max())
+        self.assertEqual(cutoff, (_at(15) - timedelta(days=2)).isoformat())
+        self.assertTrue(conn.saved["reconciled"])
+        self.assertEqual(conn.saved["high_water_mark"], _at(15))
+
+    def test_changed_watermark_column_forces_reconcile(self) -> None:
+        state = SimpleNamespace(watermark_column="dt_ped", high_water_mark=_at(20), reconcile_due=False)
+        conn = _FakeConn(state, app_max=_at(5), incoming_max=_at(6))
+
+        _promote(conn)
+
+        self.assertTrue(conn.queried_app_max())
+        self.assertEqual(conn.saved["watermark_column"], "dt_mov")
+        self.assertEqual(conn.saved["high_water_mark"], _at(6))
+
+    def test_keyless_window_only_touches_changed_rows(self) -> None:
+        state = SimpleNamespace(watermark_column="dt_mov", high_water_mark=_at(20), reconcile_due=False)
+        conn = _FakeConn(state, app_max=None, incoming_max=_at(21))
+
+        with mock.patch(
+            "app.etl.promote.incremental.fetch_column_types",
+            return_value={"cd": "integer", "dt_mov": "date", "qtd": "numeric"},
+        ):
+            _promote(conn, unique_keys=[])
+
+        window_sql = next(sql for sql in conn.statements if "current_rows" in sql)
+        self.assertIn('md5(row(cast(s."cd" as integer), cast(s."dt_mov" as date), cast(s."qtd" as numeric))::text)', window_sql)
+        self.assertIn('where a."dt_mov" >= :cutoff', window_sql)
+        self.assertFalse(any(sql.startswith("with removed as") for sql in conn.statements))
+
+    def test_empty_table_loads_without_cutoff(self) -> None:
+        conn = _FakeConn(None, app_max=None, incoming_max=None)
+
+        _, cutoff, incoming = _promote(conn, unique_keys=[])
+
+        self.assertIsNone(cutoff)
+        self.assertIsNone(incoming)
+        self.assertIsNone(conn.saved["high_water_mark"])
+        self.assertFalse(any(":cutoff" in sql for sql in conn.statements))
+
+
+if __name__ == "__main__":
+    unittest.main()
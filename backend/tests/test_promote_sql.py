@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from datetime import date
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.audit.retention import new_run_id
+from app.etl.promote.cd_scope import STAGED_CD_FILTER_SQL, promote_cd_scoped
+from app.etl.promote.counts import PromoteCounts
+from app.etl.promote.full_replace import acquire_swap_lock, promote_full_replace, swap_index_sql
+from app.etl.promote.full_replace_delta import build_keyed_diff_sql, build_multiset_diff_sql
+from app.etl.promote.partition_exchange import MonthSlice, _next_month, partition_name, promote_partition_exchange
+from app.etl.promote.maintenance import TableStats, plan_maintenance, run_post_promote_maintenance
+from app.etl.promote.row_hash import row_hash_sql, typed_columns_sql
+from app.etl.promote.slicing import plan_page_slices, staging_page_slices
+from app.etl.promote.upsert import run_sweep
+
+
+class RowHashSqlTests(unittest.TestCase):
+    def test_row_hash_sql_quotes_columns(self) -> None:
+        self.assertEqual(
+            row_hash_sql("s", ["cd", "coddv"]),
+            'md5(row(s."cd", s."coddv")::text)',
+        )
+
+    def test_typed_columns_cast_known_columns(self) -> None:
+        self.assertEqual(
+            typed_columns_sql("s", ["cd", "extra"], {"cd": "integer"}),
+            'cast(s."cd" as integer) as "cd", s."extra" as "extra"',
+        )
+
+
+class FullReplaceDeltaSqlTests(unittest.TestCase):
+    def test_keyed_diff_updates_only_changed_rows(self) -> None:
+        sql = build_keyed_diff_sql("db_usuario", ["cd", "mat", "nome"], ["cd", "mat"])
+
+        self.assertIn('update app."db_usuario" a', sql)
+        self.assertIn('"nome" = i."nome"', sql)
+        self.assertNotIn('"cd" = i."cd",', sql)
+        self.assertIn('md5(row(a."cd", a."mat", a."nome")::text) is distinct from i.row_hash', sql)
+
+    def test_keyed_diff_uses_stored_row_hash_with_column_types(self) -> None:
+        sql = build_keyed_diff_sql(
+            "db_usuario",
+            ["cd", "mat"],
+            ["cd"],
+            column_types={"cd": "integer", "mat": "text"},
+        )
+
+        self.assertIn('md5(row(cast(s."cd" as integer), cast(s."mat" as text))::text) as row_hash', sql)
+        self.assertIn('a."row_hash" is distinct from i.row_hash', sql)
+
+    def test_multiset_diff_matches_on_hash_and_occurrence(self) -> None:
+        sql = build_multiset_diff_sql("db_end", ["cd", "coddv", "endereco"])
+
+        self.assertIn("i.occurrence = c.occurrence", sql)
+        self.assertIn("0::bigint as updated", sql)
+        self.assertNotIn("update app.", sql)
+
+    def test_diff_sql_applies_filters(self) -> None:
+        sql = build_multiset_diff_sql(
+            "db_prod_vol",
+            ["cd", "dt_ped"],
+            source_filter_sql='s."dt_ped" >= :cutoff',
+            app_filter_sql='a."dt_ped" >= :cutoff',
+        )
+
+        self.assertIn('s.run_id = :run_id and (s."dt_ped" >= :cutoff)', sql)
+        self.assertIn('where a."dt_ped" >= :cutoff', sql)
+
+
+class SwapIndexSqlTests(unittest.TestCase):
+    def test_index_definition_is_retargeted_to_swap_table(self) -> None:
+        sql = swap_index_sql(
+            "CREATE INDEX idx_db_end_cd_coddv ON app.db_end USING btree (cd, coddv) INCLUDE (endereco) WHERE (cd > 0)",
+            "__ix0_db_end_1234abcd",
+            "__swap_db_end_1234abcd",
+        )
+
+        self.assertEqual(
+            sql,
+            'CREATE INDEX "__ix0_db_end_1234abcd" ON app."__swap_db_end_1234abcd" '
+            "USING btree (cd, coddv) INCLUDE (endereco) WHERE (cd > 0)",
+        )
+
+    def test_unique_index_keeps_uniqueness(self) -> None:
+        sql = swap_index_sql("CREATE UNIQUE INDEX db_usuario_pkey ON app.db_usuario USING btree (cd, mat)", "ix", "sw")
+
+        self.assertTrue(sql.startswith('CREATE UNIQUE INDEX "ix" ON app."sw"'))
+
+
+class _LockNotAvailable(Exception):
+    pgcode = "55P03"
+
+
+class _FakeCursor:
+    def __init__(self, lock_failures: int) -> None:
+        self.lock_failures = lock_failures
+        self.statements: list[str] = []
+
+    def execute(self, sql: str, params: tuple | None = None) -> None:
+        self.statements.append(sql)
+        if sql.startswith("lock table") and self.lock_failures:
+            self.lock_failures -= 1
+            raise _LockNotAvailable("canceling statement due to lock timeout")
+
+    def fetchone(self) -> tuple:
+        return ("0",)
+
+
+class SwapLockTests(unittest.TestCase):
+    def test_lock_is_retried_after_timeout(self) -> None:
+        cursor = _FakeCursor(lock_failures=2)
+
+        with mock.patch("app.etl.promote.full_replace.time.sleep"):
+            stats = acquire_swap_lock(cursor, "db_end")
+
+        self.assertEqual(stats["lock_attempts"], 3)
+        self.assertEqual(cursor.statements.count("rollback to savepoint swap_lock"), 2)
+        self.assertIn("release savepoint swap_lock", cursor.statements)
+
+
+class ServerSidePromoteTests(unittest.TestCase):
+    def test_full_replace_is_a_single_procedure_call(self) -> None:
+        engine = mock.MagicMock()
+        conn = engine.begin.return_value.__enter__.return_value
+        conn.execute.return_value.scalar_one.return_value = {
+            "inserted": 3,
+            "deleted": 1,
+            "unchanged": 7,
+            "strategy": "swap",
+            "lock_attempts": 1,
+        }
+
+        counts = promote_full_replace(engine, "db_end", ["cd", "coddv"], "6f1c2d3e-0000-0000-0000-000000000000")
+
+        self.assertEqual(conn.execute.call_count, 1)
+        self.assertIn("app.promote_full_replace_v1(", str(conn.execute.call_args.args[0]))
+        self.assertEqual((counts.inserted, counts.deleted, counts.unchanged), (3, 1, 7))
+        self.assertEqual(counts.details, {"strategy": "swap", "lock_attempts": 1})
+
+
+class SweepSqlTests(unittest.TestCase):
+    def test_sweep_deletes_keys_missing_from_run(self) -> None:
+        conn = mock.MagicMock()
+        conn.execute.return_value.scalar_one.return_value = 4
+
+        deleted = run_sweep(conn, "db_rotas", ["cd", "filial"], "run")
+
+        sql = str(conn.execute.call_args.args[0])
+        self.assertEqual(deleted, 4)
+        self.assertIn('delete from app."db_rotas" a', sql)
+        self.assertIn('s."cd" = a."cd" and s."filial" = a."filial"', sql)
+
+    def test_sweep_keeps_rows_written_by_the_run(self) -> None:
+        # NULL keys never match the anti-join; the rows the upsert just inserted must survive.
+        conn = mock.MagicMock()
+        conn.execute.return_value.scalar_one.return_value = 0
+
+        run_sweep(conn, "db_pedido_direto", ["cd", "pedido", "sq", "coddv"], "run")
+
+        self.assertIn('a."source_run_id" is distinct from cast(:run_id as uuid)', str(conn.execute.call_args.args[0]))
+
+    def test_sweep_requires_keys(self) -> None:
+        with self.assertRaises(ValueError):
+            run_sweep(mock.MagicMock(), "db_rotas", [], "run")
+
+
+class CdScopeTests(unittest.TestCase):
+    def test_staged_rows_without_cd_are_left_out(self) -> None:
+        # A NULL cd is outside every scope, so the diff would insert it again on every run.
+        engine = mock.MagicMock()
+        for mode, target in (
+            ("full_replace_delta", "run_full_replace_delta"),
+            ("insert_new", "run_insert_new"),
+            ("upsert", "run_upsert"),
+        ):
+            with self.subTest(mode=mode), mock.patch(
+                "app.etl.promote.cd_scope.staged_scope", return_value=([1, 2], 3)
+            ), mock.patch(f"app.etl.promote.cd_scope.{target}", return_value=PromoteCounts()) as promote:
+                counts = promote_cd_scoped(engine, "db_end", mode, ["cd", "coddv"], ["cd", "coddv"], "run")
+
+            filters = promote.call_args.kwargs
+            self.assertEqual(
+                filters.get("source_filter_sql", filters.get("additional_filter_sql")),
+                STAGED_CD_FILTER_SQL,
+            )
+            self.assertEqual(counts.details["null_cd_rows_skipped"], 3)
+            self.assertEqual(counts.details["cd_scope"], [1, 2])
+
+
+class MaintenancePlanTests(unittest.TestCase):
+    def test_small_change_skips_maintenance(self) -> None:
+        plan = plan_maintenance(
+            PromoteCounts(updated=10, unchanged=99_990),
+            TableStats(reltuples=100_000, live_tuples=100_000, dead_tuples=10, modified_since_analyze=10),
+        )
+
+        self.assertEqual(plan.action, "none")
+
+    def test_large_change_triggers_analyze(self) -> None:
+        plan = plan_maintenance(
+            PromoteCounts(inserted=8_000),
+            TableStats(reltuples=100_000, live_tuples=108_000, dead_tuples=0, modified_since_analyze=8_000),
+        )
+
+        self.assertEqual((plan.action, plan.reason), ("analyze", "change_ratio"))
+
+    def test_dead_tuples_trigger_vacuum(self) -> None:
+        plan = plan_maintenance(
+            PromoteCounts(updated=30_000),
+            TableStats(reltuples=100_000, live_tuples=100_000, dead_tuples=30_000, modified_since_analyze=30_000),
+        )
+
+        self.assertEqual(plan.action, "vacuum_analyze")
+
+    def test_swapped_heap_is_always_analyzed(self) -> None:
+        plan = plan_maintenance(
+            PromoteCounts(unchanged=500, details={"strategy": "swap"}),
+            TableStats(reltuples=500, live_tuples=0, dead_tuples=0, modified_since_analyze=0),
+        )
+
+        self.assertEqual((plan.action, plan.reason), ("analyze", "new_heap"))
+
+    def test_partition_exchange_analyzes_parent(self) -> None:
+        engine = mock.MagicMock()
+        conn = engine.connect.return_value.execution_options.return_value.__enter__.return_value
+        counts = PromoteCounts(
+            details={
+                "strategy": "partition_exchange",
+                "partitions_rebuilt": ["db_prod_vol_p202602", "db_prod_vol_p202603"],
+                "freeze_partitions": ["db_prod_vol_p202602"],
+            }
+        )
+
+        with mock.patch(
+            "app.etl.promote.maintenance.fetch_table_stats",
+            return_value=TableStats(reltuples=10, live_tuples=10, dead_tuples=0, modified_since_analyze=0),
+        ):
+            run_post_promote_maintenance(engine, "db_prod_vol", counts)
+
+        self.assertEqual(
+            [str(call.args[0]) for call in conn.execute.call_args_list],
+            ['vacuum (freeze) app."db_prod_vol_p202602"', 'analyze app."db_prod_vol"'],
+        )
+
+
+class PartitionExchangeTests(unittest.TestCase):
+    def test_partition_names_follow_month_suffix(self) -> None:
+        self.assertEqual(MonthSlice(date(2026, 3, 1), 10, "x").suffix, "202603")
+        self.assertEqual(MonthSlice(None, 1, "x").suffix, "default")
+        self.assertEqual(partition_name("db_prod_vol", "202603"), "db_prod_vol_p202603")
+
+    def test_next_month_rolls_over_year(self) -> None:
+        self.assertEqual(_next_month(date(2025, 12, 1)), date(2026, 1, 1))
+
+    def test_unpartitioned_table_is_not_converted_by_promote(self) -> None:
+        engine = mock.MagicMock()
+        conn = engine.begin.return_value.__enter__.return_value
+        conn.execute.return_value.scalar_one.return_value = False
+
+        with self.assertRaisesRegex(ValueError, "convert_to_monthly_partitions"):
+            promote_partition_exchange(engine, "db_prod_vol", ["cd", "dt_ped"], "dt_ped", "run")
+
+        self.assertEqual(engine.begin.call_count, 1)
+        self.assertNotIn("convert_to_monthly_partitions", str(conn.execute.call_args_list))
+
+    def test_default_partition_is_emptied_not_dropped(self) -> None:
+        engine = mock.MagicMock()
+        conn = engine.begin.return_value.__enter__.return_value
+        conn.execute.return_value.scalar_one.return_value = 2
+        cursor = conn.connection.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = (5,)
+        march = MonthSlice(date(2026, 3, 1), 4, "fp")
+
+        with mock.patch("app.etl.promote.partition_exchange._is_partitioned", return_value=True), mock.patch(
+            "app.etl.promote.partition_exchange._staging_months", return_value=[march]
+        ), mock.patch(
+            "app.etl.promote.partition_exchange._current_partitions",
+            return_value={"202603": "fp", "202602": "old", "default": "nulls"},
+        ), mock.patch("app.etl.promote.partition_exchange.acquire_swap_lock", return_value={}):
+            counts = promote_partition_exchange(engine, "db_prod_vol", ["cd", "dt_ped"], "dt_ped", "run")
+
+        statements = [call.args[0] for call in cursor.execute.call_args_list]
+        self.assertIn('drop table app."db_prod_vol_p202602"', statements)
+        self.assertNotIn('drop table app."db_prod_vol_pdefault"', statements)
+        self.assertIn('truncate table app."db_prod_vol_pdefault"', statements)
+        self.assertEqual(counts.details["partitions_dropped"], ["db_prod_vol_p202602"])
+        self.assertEqual((counts.deleted, counts.unchanged), (7, 4))
+
+class PromoteCountsTests(unittest.TestCase):
+    def test_counts_totals(self) -> None:
+        counts = PromoteCounts(inserted=2, updated=3, deleted=1, unchanged=10)
+
+        self.assertEqual(counts.rows_written, 6)
+        self.assertEqual(counts.rows_matched, 15)
+        self.assertEqual(
+            counts.as_details(),
+            {"inserted": 2, "updated": 3, "deleted": 1, "unchanged": 10},
+        )
+
+
+class PageSliceTests(unittest.TestCase):
+    def test_slices_cover_every_page(self) -> None:
+        slices = plan_page_slices(total_pages=10, row_count=1000, batch_rows=300)
+
+        self.assertEqual([(s.first_page, s.end_page) for s in slices], [(0, 3), (3, 6), (6, 9), (9, 10)])
+        self.assertEqual(slices[1].params(), {"slice_start": "(3,0)", "slice_end": "(6,0)"})
+
+    def test_empty_staging_has_no_slices(self) -> None:
+        self.assertEqual(plan_page_slices(total_pages=0, row_count=0, batch_rows=500), [])
+
+    def test_missing_run_partition_has_no_slices(self) -> None:
+        # An empty frame returns before the run's staging partition is created.
+        engine = mock.MagicMock()
+        conn = engine.begin.return_value.__enter__.return_value
+        conn.execute.return_value.scalar_one.return_value = None
+
+        self.assertEqual(staging_page_slices(engine, "db_usuario", new_run_id(), 500), [])
+        self.assertEqual(conn.execute.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
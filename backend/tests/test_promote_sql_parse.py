@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import re
+import sys
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+try:
+    import pglast
+except ImportError:  # optional test dependency (pip install .[test])
+    pglast = None
+
+from app.etl.promote.full_replace_delta import build_keyed_diff_sql, build_multiset_diff_sql
+from app.etl.promote.incremental import _diff_window, _load_all
+from app.etl.promote.insert_new import run_insert_new
+from app.etl.promote.upsert import run_sweep, run_upsert
+
+SQL_DIR = Path(__file__).resolve().parents[1] / "app" / "ddl" / "sql"
+BIND_RE = re.compile(r"(?<![:\w]):([a-z_][a-z0-9_]*)")
+FORMAT_ARG_RE = re.compile(r"%(\d+)\$([sI])")
+COLUMNS = ["cd", "coddv", "dt_mov"]
+CUTOFF = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _parse(sql: str) -> None:
+    # SQLAlchemy binds (:name) become positional parameters so the real Postgres parser
+    # sees exactly what the server would.
+    names: list[str] = []
+
+    def positional(match: re.Match[str]) -> str:
+        if match.group(1) not in names:
+            names.append(match.group(1))
+        return f"${names.index(match.group(1)) + 1}"
+
+    pglast.parse_sql(BIND_RE.sub(positional, sql))
+
+
+def _captured_sql(call) -> list[str]:
+    conn = mock.MagicMock()
+    conn.execute.return_value.mappings.return_value.one.return_value = {
+        "inserted": 0,
+        "updated": 0,
+        "deleted": 0,
+        "unchanged": 0,
+    }
+    conn.execute.return_value.scalar_one.return_value = 0
+    call(conn)
+    return [str(args[0]) for args, _ in conn.execute.call_args_list]
+
+
+def _latest_migration(marker: str) -> Path:
+    return [path for path in sorted(SQL_DIR.glob("V*.sql")) if marker in path.read_text(encoding="utf-8")][-1]
+
+
+@unittest.skipIf(pglast is None, "pglast not installed")
+class PromoteSqlParseTests(unittest.TestCase):
+    def assertParses(self, statements: list[str]) -> None:
+        self.assertTrue(statements)
+        for sql in statements:
+            with self.subTest(sql=sql[:80]):
+                _parse(sql)
+
+    def test_upsert_parses(self) -> None:
+        for row_hash in (False, True):
+            self.assertParses(
+                _captured_sql(
+                    lambda conn: run_upsert(
+                        conn,
+                        "db_estq",
+                        COLUMNS,
+                        ["cd", "coddv"],
+                        "run",
+                        additional_filter_sql='s."dt_mov" >= :cutoff',
+                        additional_params={"cutoff": CUTOFF},
+                        row_hash=row_hash,
+                    )
+                )
+            )
+
+    def test_sweep_parses(self) -> None:
+        self.assertParses(
+            _captured_sql(lambda conn: run_sweep(conn, "db_estq", ["cd", "coddv"], "run", 'a."cd" = any(:cds)'))
+        )
+
+    def test_insert_new_parses(self) -> None:
+        self.assertParses(_captured_sql(lambda conn: run_insert_new(conn, "db_end", COLUMNS, "run")))
+        with mock.patch(
+            "app.etl.promote.insert_new.fetch_column_types",
+            return_value={"cd": "integer", "dt_mov": "date"},
+        ):
+            self.assertParses(_captured_sql(lambda conn: run_insert_new(conn, "db_end", COLUMNS, "run", row_hash=True)))
+
+    def test_incremental_windows_parse(self) -> None:
+        self.assertParses(_captured_sql(lambda conn: _load_all(conn, "db_mov", COLUMNS, "run")))
+        for row_hash in (False, True):
+            self.assertParses(
+                _captured_sql(lambda conn: _diff_window(conn, "db_mov", COLUMNS, "run", "dt_mov", CUTOFF, row_hash))
+            )
+
+    def test_diff_builders_parse(self) -> None:
+        self.assertParses(
+            [
+                build_keyed_diff_sql("db_usuario", COLUMNS, ["cd", "coddv"]),
+                build_keyed_diff_sql("db_usuario", COLUMNS, ["cd"], column_types={"cd": "integer"}),
+                build_multiset_diff_sql("db_end", COLUMNS),
+                build_multiset_diff_sql("db_end", COLUMNS, column_types={"cd": "integer"}, stored_hash=False),
+                build_multiset_diff_sql(
+                    "db_end",
+                    COLUMNS,
+                    source_filter_sql='s."cd" = any(:cds)',
+                    app_filter_sql='a."cd" = any(:cds)',
+                ),
+            ]
+        )
+
+    def test_full_replace_carry_over_parses(self) -> None:
+        # The load statement is built with format() inside the procedure; render it the same
+        # way so a broken CTE list fails here instead of on the first promote.
+        source = _latest_migration("function app.promote_full_replace_v1").read_text(encoding="utf-8")
+        template, arguments = re.search(r"\$sql\$(.*?)\$sql\$,(.*?)\)\s*into", source, re.DOTALL).groups()
+        samples = {
+            "v_cols": '"cd", "coddv"',
+            "v_incoming_cols": 'i."cd", i."coddv"',
+            "v_hash_s": 'md5(row(s."cd", s."coddv")::text)',
+            "v_hash_a": 'md5(row(a."cd", a."coddv")::text)',
+            "p_table": "db_estq",
+            "v_swap": "__swap_db_estq_0000",
+        }
+        values = [samples[name.strip()] for name in arguments.split(",")]
+        rendered = FORMAT_ARG_RE.sub(
+            lambda match: (
+                f'"{values[int(match.group(1)) - 1]}"'
+                if match.group(2) == "I"
+                else values[int(match.group(1)) - 1]
+            ),
+            template,
+        )
+
+        _parse(rendered)
+
+    def test_migrations_parse(self) -> None:
+        for path in sorted(SQL_DIR.glob("V5*.sql")):
+            source = path.read_text(encoding="utf-8")
+            with self.subTest(migration=path.name):
+                for raw in pglast.parse_sql(source):
+                    if type(raw.stmt).__name__ in ("CreateFunctionStmt", "DoStmt"):
+                        body = source[raw.stmt_location : raw.stmt_location + raw.stmt_len]
+                        if "language plpgsql" in body.lower() or type(raw.stmt).__name__ == "DoStmt":
+                            pglast.parse_plpgsql(body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.audit.retention import new_run_id, run_id_started_at
+from app.etl.load.staging_loader import PARTITION_BOUND_RE, run_staging_table
+
+
+class RunStagingTableTests(unittest.TestCase):
+    def test_each_run_gets_its_own_partition(self) -> None:
+        first = run_staging_table("db_usuario", new_run_id())
+        second = run_staging_table("db_usuario", new_run_id())
+
+        self.assertTrue(first.startswith("db_usuario__r"))
+        self.assertNotEqual(first, second)
+
+    def test_partition_name_fits_postgres_identifier(self) -> None:
+        name = run_staging_table("indicadores_gestao_estq_performance_dimensoes_extra", new_run_id())
+
+        self.assertLessEqual(len(name), 63)
+
+    def test_partition_bound_yields_run_id(self) -> None:
+        run_id = new_run_id()
+        match = PARTITION_BOUND_RE.search(f"FOR VALUES IN ('{run_id}')")
+
+        self.assertIsNotNone(match)
+        self.assertEqual(match.group(1), run_id)
+
+    def test_run_start_is_read_back_from_run_id(self) -> None:
+        started = datetime(2026, 10, 19, 8, 30, tzinfo=timezone.utc)
+        run_id = new_run_id(int(started.timestamp() * 1000))
+
+        self.assertEqual(run_id_started_at(run_id), started)
+        self.assertIsNone(run_id_started_at("6f1c1a4e-8a3b-4c2d-9e5f-0a1b2c3d4e5f"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.connectors.db import table_lock
+
+
+def _engine(*acquired: bool) -> tuple[mock.MagicMock, mock.MagicMock]:
+    engine = mock.MagicMock()
+    conn = engine.connect.return_value.__enter__.return_value
+    results = iter(acquired)
+
+    def execute(statement, params=None):
+        result = mock.MagicMock()
+        if "pg_try_advisory" in str(statement):
+            result.scalar_one.return_value = next(results)
+        return result
+
+    conn.execute.side_effect = execute
+    return engine, conn
+
+
+def _statements(conn: mock.MagicMock) -> list[str]:
+    return [str(call.args[0]) for call in conn.execute.call_args_list]
+
+
+class TableLockTests(unittest.TestCase):
+    def test_takes_legacy_key_shared_and_releases_both(self) -> None:
+        engine, conn = _engine(True, True)
+
+        with table_lock(engine, "db_end"):
+            pass
+
+        statements = _statements(conn)
+        self.assertEqual(statements[0], "select pg_try_advisory_lock_shared(:legacy_key)")
+        self.assertIn("pg_try_advisory_lock(:namespace, hashtext(:table_name))", statements[1])
+        self.assertIn("pg_advisory_unlock(:namespace", statements[2])
+        self.assertEqual(statements[3], "select pg_advisory_unlock_shared(:legacy_key)")
+
+    def test_old_runner_holding_legacy_key_blocks_every_table(self) -> None:
+        engine, conn = _engine(False)
+
+        with self.assertRaisesRegex(RuntimeError, "older version"):
+            with table_lock(engine, "db_end"):
+                pass
+
+        self.assertEqual(len(_statements(conn)), 1)
+
+    def test_busy_table_gives_back_legacy_key(self) -> None:
+        engine, conn = _engine(True, False)
+
+        with self.assertRaisesRegex(RuntimeError, "another sync"):
+            with table_lock(engine, "db_end", shared=True):
+                pass
+
+        self.assertEqual(_statements(conn)[-1], "select pg_advisory_unlock_shared(:legacy_key)")
+
+
+if __name__ == "__main__":
+    unittest.main()